@@ -1,7 +1,9 @@
+import json
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 import random
-from matplotlib.animation import FuncAnimation, PillowWriter
+from matplotlib.animation import FuncAnimation
 from matplotlib.colors import ListedColormap
 import matplotlib.patches as mpatches
 
@@ -16,7 +18,12 @@ EVAPORATION_RATE = 0.3
 ALPHA = 1.0  # Influencia de la feromona
 BETA = 2.0   # Influencia de la distancia (heurística)
 INITIAL_PHEROMONE = 0.1
-DYNAMIC_CHANGE_STEP = 150  # Paso para añadir nuevos obstáculos
+MIN_PHEROMONE = 0.01  # Nivel mínimo de feromona tras la evaporación
+DIFFUSION_RATE = 0.0  # Fracción que se reparte a los 4 vecinos por paso (0 = sin difusión)
+PHEROMONE_TRAIL_LENGTH = 20  # Últimas posiciones de cada dron que reciben feromona
+DYNAMIC_CHANGE_STEP = 150  # Paso para añadir nuevos obstáculos (mapas aleatorios)
+SCENARIO_PATH = None  # Directorio de un escenario guardado (None = mapa aleatorio)
+SENSOR_RADIUS = 0  # Radio del sensor de cada dron en celdas (0 = solo la celda que ocupa, como antes)
 
 # Estados de las celdas
 EMPTY = 0
@@ -26,6 +33,46 @@ OBSTACLE = 3
 DRONE = 4
 RESCUED = 5
 
+# Canales de feromona: exploración (según el fitness) y rastros de descubrimiento
+# de supervivientes y de recursos (según los objetivos encontrados en el paso)
+EXPLORATION_CHANNEL = 0
+SURVIVOR_CHANNEL = 1
+RESOURCE_CHANNEL = 2
+NUM_CHANNELS = 3
+CHANNEL_EVAPORATION = (EVAPORATION_RATE, 0.1, 0.15)  # Los rastros de descubrimiento duran más
+DISCOVERY_DEPOSIT = 5.0  # Feromona por objetivo encontrado en su canal de descubrimiento
+
+# Modo de actualización del canal de exploración: 'classic' (todos los drones
+# depositan según su fitness) o 'mmas' (MAX-MIN Ant System: solo deposita la mejor
+# ruta del paso o la mejor global, con límites tau_min/tau_max y reinicio al estancarse)
+PHEROMONE_MODE = 'classic'
+MMAS_QUALITY_WINDOW = 20    # Pasos sobre los que se mide la ganancia de fitness de cada dron
+MMAS_GLOBAL_BEST_EVERY = 5  # Cada cuántos pasos deposita la mejor ruta global
+MMAS_MIN_RATIO = 0.05       # tau_min = tau_max * MMAS_MIN_RATIO
+MMAS_STAGNATION_STEPS = 25  # Pasos sin mejora ni cobertura nueva antes de reiniciar los rastros
+
+# Comunicación local entre drones: los drones a menos de COMMUNICATION_RADIUS celdas
+# intercambian cada paso un resumen de las regiones que ya barrieron y las regiones
+# donde encontraron objetivos
+COMMUNICATION_RADIUS = 0    # Radio de comunicación en celdas (0 = sin comunicación)
+REGION_SIZE = 5             # Lado de las regiones de los resúmenes
+REGION_SWEPT_VISITS = 8     # Visitas propias para considerar una región barrida
+SWEPT_REGION_BONUS = 0.5    # Preferencia por celdas no visitadas de regiones ya barridas
+REPORT_BONUS = 1.5          # Preferencia por regiones donde un compañero encontró objetivos
+
+# Preferencia de movimiento hacia celdas con objetivos
+OBJECTIVE_BONUS = {
+    SURVIVOR: 10.0,
+    RESOURCE: 8.0   # Aumentado para priorizar recursos
+}
+
+# Peso de cada canal al elegir el siguiente paso; los drones se reparten los perfiles
+# de forma alterna, unos siguen rastros de supervivientes y otros de recursos
+DRONE_CHANNEL_PROFILES = [
+    (1.0, 1.0, 0.3),
+    (1.0, 0.3, 1.0)
+]
+
 # Colores para visualización
 COLORS = {
     EMPTY: [1, 1, 1],      # Blanco
@@ -36,15 +83,150 @@ COLORS = {
     RESCUED: [1, 0.8, 0]   # Amarillo (supervivientes rescatados)
 }
 
+_DISK_STENCILS = {}
+
+def disk_stencil(radius):
+    # Desplazamientos (dr, dc) de un disco del radio dado, calculados una sola vez
+    if radius not in _DISK_STENCILS:
+        offsets = np.arange(-radius, radius + 1)
+        dr, dc = np.meshgrid(offsets, offsets, indexing='ij')
+        inside = dr ** 2 + dc ** 2 <= radius ** 2
+        _DISK_STENCILS[radius] = np.column_stack([dr[inside], dc[inside]])
+    return _DISK_STENCILS[radius]
+
+def sensor_footprint(positions, size, radius=SENSOR_RADIUS, row_start=0, row_end=None):
+    # Celdas de la huella circular del sensor de cada posición, recortadas a los
+    # bordes del mapa (o a las filas [row_start, row_end)). Devuelve el índice de la
+    # posición dueña de cada celda y sus filas y columnas, en orden de posición.
+    if row_end is None:
+        row_end = size
+    positions = np.asarray(positions, dtype=int).reshape(-1, 2)
+    cells = positions[:, None, :] + disk_stencil(radius)[None, :, :]
+    inside = ((cells[..., 0] >= row_start) & (cells[..., 0] < row_end)
+              & (cells[..., 1] >= 0) & (cells[..., 1] < size))
+    owners = np.broadcast_to(np.arange(len(positions))[:, None], inside.shape)[inside]
+    rows, cols = cells[inside].T
+    return owners, rows, cols
+
+def pheromone_pass(src, dst, row_start=0, row_end=None,
+                   evaporation=CHANNEL_EVAPORATION, diffusion=DIFFUSION_RATE):
+    # Evaporación, difusión con plantilla de 5 puntos y mínimo de feromona en una
+    # sola pasada sobre las filas [row_start, row_end) de todos los canales
+    # (arreglos (canales, filas, columnas)), escribiendo en dst solo con operaciones
+    # in-place (sin arreglos temporales del tamaño del mapa). La evaporación puede
+    # ser distinta por canal. Sin difusión, src y dst pueden ser el mismo arreglo.
+    # Los bordes del mapa reflejan (no hay flujo hacia fuera).
+    size = src.shape[-2]
+    if row_end is None:
+        row_end = size
+    out = dst[..., row_start:row_end, :]
+    center = src[..., row_start:row_end, :]
+    evaporation = np.asarray(evaporation, dtype=float).reshape(-1, 1, 1)[:src.shape[0]] \
+        if src.ndim == 3 else float(evaporation)
+    keep = (1 - evaporation) * (1 - diffusion)
+    spread = (1 - evaporation) * diffusion / 4
+
+    if diffusion == 0:
+        np.multiply(center, keep, out=out)
+    else:
+        # Norte y sur
+        if row_start == 0:
+            out[..., 0, :] = src[..., 0, :]
+            out[..., 1:, :] = src[..., 0:row_end - 1, :]
+        else:
+            np.copyto(out, src[..., row_start - 1:row_end - 1, :])
+        if row_end == size:
+            out[..., :-1, :] += src[..., row_start + 1:row_end, :]
+            out[..., -1, :] += src[..., size - 1, :]
+        else:
+            out += src[..., row_start + 1:row_end + 1, :]
+        # Oeste y este
+        out[..., 1:] += center[..., :-1]
+        out[..., 0] += center[..., 0]
+        out[..., :-1] += center[..., 1:]
+        out[..., -1] += center[..., -1]
+        # out = keep * centro + spread * (suma de vecinos)
+        if np.all(keep == 0):
+            out *= spread
+        else:
+            out *= spread / keep
+            out += center
+            out *= keep
+    np.maximum(out, MIN_PHEROMONE, out=out)
+
+class MaxMinAntSystem:
+    # Estado del modo MAX-MIN Ant System para el canal de exploración. La calidad de
+    # cada dron es su ganancia de fitness en las últimas MMAS_QUALITY_WINDOW
+    # iteraciones (no el fitness acumulado, que solo crece y favorece a los drones
+    # más antiguos); se guarda en un anillo (drones, ventana)
+    def __init__(self, num_drones):
+        self.fitness_window = np.zeros((num_drones, MMAS_QUALITY_WINDOW))
+        self.step = 0
+        self.best_quality = 0.0
+        self.best_trail = np.empty((0, 2), dtype=int)
+        self.tau_max = INITIAL_PHEROMONE
+        self.tau_min = INITIAL_PHEROMONE * MMAS_MIN_RATIO
+        self.stagnant_steps = 0
+        self.last_covered = 0
+        self.restarts = 0
+
+    def update(self, field, paths, fitness_values, covered_count):
+        # Depósito elitista, límites y detección de estancamiento sobre field (filas, columnas)
+        fitness = np.asarray(fitness_values, dtype=float)
+        slot = self.step % MMAS_QUALITY_WINDOW
+        quality = fitness - self.fitness_window[:, slot]
+        self.fitness_window[:, slot] = fitness
+        self.step += 1
+
+        best = int(np.argmax(quality))
+        trail = np.unique(np.asarray(paths[best][-PHEROMONE_TRAIL_LENGTH:]).reshape(-1, 2), axis=0)
+        improved = quality[best] > self.best_quality
+        if improved:
+            self.best_quality = float(quality[best])
+            self.best_trail = trail
+
+        # Solo deposita la mejor ruta del paso, o periódicamente la mejor global
+        if self.step % MMAS_GLOBAL_BEST_EVERY == 0:
+            trail, amount = self.best_trail, self.best_quality
+        else:
+            amount = float(quality[best])
+        if amount > 0 and len(trail):
+            field[trail[:, 0], trail[:, 1]] += amount * 0.1
+
+        # Límites: tau_max según la mejor calidad global, tau_min proporcional
+        evaporation = CHANNEL_EVAPORATION[EXPLORATION_CHANNEL]
+        self.tau_max = max(self.best_quality * 0.1 / evaporation, INITIAL_PHEROMONE)
+        self.tau_min = self.tau_max * MMAS_MIN_RATIO
+        np.clip(field, self.tau_min, self.tau_max, out=field)
+
+        # Estancamiento: sin mejora global ni cobertura nueva durante varios pasos
+        if improved or covered_count > self.last_covered:
+            self.stagnant_steps = 0
+        else:
+            self.stagnant_steps += 1
+        self.last_covered = covered_count
+        if self.stagnant_steps >= MMAS_STAGNATION_STEPS:
+            field.fill(self.tau_max)
+            self.best_quality = 0.0
+            self.best_trail = np.empty((0, 2), dtype=int)
+            self.stagnant_steps = 0
+            self.restarts += 1
+
 class DisasterMap:
     def __init__(self, size):
         self.size = size
         self.grid = np.zeros((size, size), dtype=int)
-        self.pheromone = np.ones((size, size)) * INITIAL_PHEROMONE
+        self.pheromone = np.ones((NUM_CHANNELS, size, size)) * INITIAL_PHEROMONE
+        self._pheromone_next = np.empty_like(self.pheromone)  # Búfer para la difusión
         self.covered = np.zeros((size, size), dtype=bool)
         self.base_position = (size//2, size//2)  # Base en el centro
         self.initial_survivors = 0
         self.initial_resources = 0
+        # Línea de tiempo de obstáculos dinámicos: celdas concretas (paso, fila, columna)
+        # y obstáculos en celdas vacías al azar (paso, cantidad)
+        self.obstacle_events = np.empty((0, 3), dtype=np.int32)
+        self.random_obstacle_events = np.array([[DYNAMIC_CHANGE_STEP, 3]], dtype=np.int32)
+        self.mmas = None  # Estado de MaxMinAntSystem si PHEROMONE_MODE == 'mmas'
         
     def add_entities(self, num_survivors, num_resources, num_obstacles):
         # Añadir supervivientes, recursos y obstáculos aleatoriamente
@@ -70,7 +252,7 @@ class DisasterMap:
             if positions:
                 r, c = positions.pop()
                 self.grid[r, c] = OBSTACLE
-                self.pheromone[r, c] = 0  # Sin feromona en obstáculos
+                self.pheromone[:, r, c] = 0  # Sin feromona en obstáculos
                 
     def add_dynamic_obstacles(self, num_obstacles):
         # Añadir nuevos obstáculos dinámicamente
@@ -80,20 +262,61 @@ class DisasterMap:
         for i in range(min(num_obstacles, len(positions))):
             r, c = positions[i]
             self.grid[r, c] = OBSTACLE
-            self.pheromone[r, c] = 0  # Reiniciar feromona en obstáculos
+            self.pheromone[:, r, c] = 0  # Reiniciar feromona en obstáculos
+
+    def apply_timeline(self, step):
+        # Aplica los obstáculos programados para este paso; devuelve si hubo cambios
+        cells = self.obstacle_events[self.obstacle_events[:, 0] == step, 1:]
+        self.grid[cells[:, 0], cells[:, 1]] = OBSTACLE
+        self.pheromone[:, cells[:, 0], cells[:, 1]] = 0
+        counts = self.random_obstacle_events[self.random_obstacle_events[:, 0] == step, 1]
+        for count in counts:
+            self.add_dynamic_obstacles(int(count))
+        return len(cells) > 0 or len(counts) > 0
 
     def evaporate_pheromone(self):
-        self.pheromone *= (1 - EVAPORATION_RATE)
-        # Mantener un nivel mínimo de feromona
-        self.pheromone = np.maximum(self.pheromone, 0.01)
-
-    def update_pheromone(self, paths, fitness_values):
-        for path, fitness in zip(paths, fitness_values):
-            if fitness > 0:
-                # Aumentar feromona en la ruta proporcional al fitness
-                pheromone_deposit = fitness * 0.1
-                for (r, c) in set(path[-20:]):  # Solo las últimas 20 posiciones
-                    self.pheromone[r, c] += pheromone_deposit
+        # Evaporación (y difusión opcional) manteniendo un nivel mínimo de feromona
+        if DIFFUSION_RATE == 0:
+            pheromone_pass(self.pheromone, self.pheromone)
+        else:
+            pheromone_pass(self.pheromone, self._pheromone_next)
+            self.pheromone, self._pheromone_next = self._pheromone_next, self.pheromone
+
+    def update_pheromone(self, paths, deposits):
+        # Depósito de las rutas de todos los drones en todos los canales con una
+        # sola suma dispersa. deposits es (drones, canales): cantidad que cada dron
+        # deja en cada canal; cada celda cuenta una vez por dron
+        deposits = np.asarray(deposits, dtype=float).reshape(len(paths), NUM_CHANNELS)
+        active = np.flatnonzero(np.any(deposits > 0, axis=1))
+        if len(active) == 0:
+            return
+        trails = [np.asarray(paths[i][-PHEROMONE_TRAIL_LENGTH:]) for i in active]
+        cells = np.concatenate(trails)
+        owners = np.repeat(np.arange(len(active)), [len(trail) for trail in trails])
+        total_cells = self.size * self.size
+        keys = np.unique(owners * total_cells + cells[:, 0] * self.size + cells[:, 1])
+        owners, flat = np.divmod(keys, total_cells)
+        amounts = deposits[active][owners]  # (celdas, canales)
+        channels, cells_with_deposit = np.nonzero(amounts.T > 0)
+        np.add.at(self.pheromone.reshape(-1),
+                  channels * total_cells + flat[cells_with_deposit],
+                  amounts[cells_with_deposit, channels])
+
+    def sense(self, positions, radius=SENSOR_RADIUS):
+        # Estampa la huella circular del sensor de todos los drones en el mapa de
+        # cobertura (recortada en los bordes) y recoge los supervivientes y recursos
+        # que quedan dentro. Devuelve (índice del dron, tipo de celda) de cada
+        # detección; si varios drones ven el mismo objetivo, cuenta para el primero.
+        owners, rows, cols = sensor_footprint(positions, self.size, radius)
+        self.covered[rows, cols] = True
+
+        found = np.isin(self.grid[rows, cols], (SURVIVOR, RESOURCE))
+        flat, first = np.unique(rows[found] * self.size + cols[found], return_index=True)
+        owners = owners[found][first]
+        rows, cols = np.divmod(flat, self.size)
+        kinds = self.grid[rows, cols]
+        self.grid[rows, cols] = np.where(kinds == SURVIVOR, RESCUED, EMPTY)
+        return owners, kinds
 
     def get_neighbors(self, position):
         r, c = position
@@ -115,6 +338,12 @@ class Drone:
         self.found_resources = 0
         self.energy_used = 0
         self.stuck_count = 0
+        self.channel_weights = np.array(DRONE_CHANNEL_PROFILES[drone_id % len(DRONE_CHANNEL_PROFILES)])
+        # Conocimiento compartido (solo con comunicación): visitas propias por región,
+        # regiones que se saben barridas y regiones con objetivos reportados
+        self.region_visits = None
+        self.known_swept = None
+        self.reported_regions = set()
         # Todos los drones del mismo color rojo
         self.color = np.array([1, 0, 0])  # Rojo
         
@@ -138,17 +367,19 @@ class Drone:
         # Calcular probabilidades de movimiento
         probabilities = []
         for nr, nc in unexplored_neighbors:
-            pheromone = disaster_map.pheromone[nr, nc]
+            pheromone = float(self.channel_weights @ disaster_map.pheromone[:, nr, nc])
             # Preferir celdas no visitadas
             visited_bonus = 3.0 if (nr, nc) not in self.visited else 0.3
             # Preferir objetivos (supervivientes o recursos)
-            cell_type = disaster_map.grid[nr, nc]
-            if cell_type == SURVIVOR:
-                objective_bonus = 10.0
-            elif cell_type == RESOURCE:
-                objective_bonus = 8.0  # Aumentado para priorizar recursos
-            else:
-                objective_bonus = 1.0
+            objective_bonus = OBJECTIVE_BONUS.get(disaster_map.grid[nr, nc], 1.0)
+            # Con comunicación: evitar regiones que un compañero ya barrió y preferir
+            # regiones donde se reportaron objetivos
+            if self.known_swept is not None:
+                region = (nr // REGION_SIZE, nc // REGION_SIZE)
+                if self.known_swept[region]:
+                    visited_bonus = min(visited_bonus, SWEPT_REGION_BONUS)
+                elif region in self.reported_regions:
+                    objective_bonus *= REPORT_BONUS
             
             probability = (pheromone ** ALPHA) * visited_bonus * objective_bonus
             probabilities.append(probability)
@@ -198,103 +429,102 @@ def calculate_fitness(drone, disaster_map):
     fitness = survivors_score + resources_score + coverage_score - distance_penalty - stuck_penalty
     return max(fitness, 0)
 
-# Configuración de la figura
-fig = plt.figure(figsize=(14, 10))
-gs = fig.add_gridspec(3, 2)
-
-# Subplots
-ax1 = fig.add_subplot(gs[0:2, 0])  # Mapa (2 filas, columna 0)
-ax2 = fig.add_subplot(gs[0, 1])    # Cobertura
-ax3 = fig.add_subplot(gs[1, 1])    # Energía
-ax4 = fig.add_subplot(gs[2, :])    # Objetivos (fila completa abajo)
-
-# Inicializar mapa y drones
-disaster_map = DisasterMap(MAP_SIZE)
-disaster_map.add_entities(NUM_SURVIVORS, NUM_RESOURCES, NUM_OBSTACLES)
-drones = [Drone(i, disaster_map.base_position) for i in range(NUM_DRONES)]
-
-# Métricas
-total_covered_history = []
-energy_consumed_history = []
-survivors_found_history = []
-resources_found_history = []
-steps_history = []
-
-# Elementos de la animación - Mapa
-map_display = ax1.imshow(np.zeros((MAP_SIZE, MAP_SIZE, 3)))
-ax1.set_title('Exploración en Tiempo Real - Rescate con Drones')
-ax1.set_xticks([])
-ax1.set_yticks([])
-
-# Leyenda fuera del mapa
-legend_elements = [
-    mpatches.Patch(color='green', label='Supervivientes'),
-    mpatches.Patch(color='cyan', label='Recursos'),
-    mpatches.Patch(color='gray', label='Obstáculos'),
-    mpatches.Patch(color='yellow', label='Rescatados'),
-    mpatches.Patch(color='red', label='Drones')
-]
-ax1.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(0, 1))
-
-# Puntos para los drones (todos rojos)
-drone_positions = np.empty((0, 2))
-drone_dots = ax1.scatter([], [], c='red', s=100, edgecolors='darkred', linewidths=2)
-
-# Texto informativo (fuera del área del mapa)
-info_text = fig.text(0.02, 0.95, '', fontsize=10, 
-                    bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
-
-# Gráficos de métricas
-coverage_line, = ax2.plot([], [], 'b-', linewidth=2)
-ax2.set_xlim(0, MAX_STEPS)
-ax2.set_ylim(0, 100)
-ax2.set_xlabel('Pasos')
-ax2.set_ylabel('Cobertura (%)')
-ax2.set_title('Cobertura del Área')
-ax2.grid(True, alpha=0.3)
-
-energy_line, = ax3.plot([], [], 'r-', linewidth=2)
-ax3.set_xlim(0, MAX_STEPS)
-ax3.set_ylim(0, 2000)
-ax3.set_xlabel('Pasos')
-ax3.set_ylabel('Energía')
-ax3.set_title('Energía Consumida')
-ax3.grid(True, alpha=0.3)
-
-survivors_line, = ax4.plot([], [], 'g-', label='Supervivientes', linewidth=2)
-resources_line, = ax4.plot([], [], 'c-', label='Recursos', linewidth=2)
-ax4.set_xlim(0, MAX_STEPS)
-ax4.set_ylim(0, max(NUM_SURVIVORS, NUM_RESOURCES) + 2)
-ax4.set_xlabel('Pasos')
-ax4.set_ylabel('Encontrados')
-ax4.set_title('Objetivos Encontrados')
-ax4.legend()
-ax4.grid(True, alpha=0.3)
-
-# Variables para guardar la animación
-frames_data = []
-
-def init_animation():
-    map_display.set_array(np.zeros((MAP_SIZE, MAP_SIZE, 3)))
-    drone_dots.set_offsets(np.empty((0, 2)))
-    coverage_line.set_data([], [])
-    energy_line.set_data([], [])
-    survivors_line.set_data([], [])
-    resources_line.set_data([], [])
-    info_text.set_text('Iniciando simulación...')
-    return map_display, drone_dots, coverage_line, energy_line, survivors_line, resources_line, info_text
-
-def update_animation(frame):
-    global drones, disaster_map
-    
-    # Añadir obstáculos dinámicos en un paso específico
-    if frame == DYNAMIC_CHANGE_STEP:
-        disaster_map.add_dynamic_obstacles(3)
+def find_neighbor_pairs(positions, radius):
+    # Pares (i, j), i < j, de posiciones a distancia <= radius. Usa una tabla hash
+    # espacial con cubetas de lado radius, así que cada posición solo se compara
+    # con las de las 9 cubetas vecinas y el costo es lineal en el número de drones
+    buckets = {}
+    for index, (r, c) in enumerate(positions):
+        buckets.setdefault((r // radius, c // radius), []).append(index)
+    pairs = []
+    for (br, bc), members in buckets.items():
+        for dr in (-1, 0, 1):
+            for dc in (-1, 0, 1):
+                others = buckets.get((br + dr, bc + dc))
+                if not others:
+                    continue
+                for i in members:
+                    ri, ci = positions[i]
+                    for j in others:
+                        if i < j:
+                            rj, cj = positions[j]
+                            if (ri - rj) ** 2 + (ci - cj) ** 2 <= radius ** 2:
+                                pairs.append((i, j))
+    return pairs
+
+def exchange_information(disaster_map, drones, found_counts):
+    # Actualiza el conocimiento propio de cada dron y lo difunde a los drones dentro
+    # del radio de comunicación. found_counts indica cuántos objetivos encontró
+    # cada dron en este paso. Devuelve el número de enlaces activos
+    regions = -(-disaster_map.size // REGION_SIZE)
+    for drone, found in zip(drones, found_counts):
+        if drone.region_visits is None:
+            drone.region_visits = np.zeros((regions, regions), dtype=np.int32)
+            drone.known_swept = np.zeros((regions, regions), dtype=bool)
+        region = (drone.position[0] // REGION_SIZE, drone.position[1] // REGION_SIZE)
+        drone.region_visits[region] += 1
+        if drone.region_visits[region] >= REGION_SWEPT_VISITS:
+            drone.known_swept[region] = True
+        if found:
+            drone.reported_regions.add(region)
+
+    # Los resúmenes se toman antes de intercambiar, así el orden de los pares no importa
+    swept = [drone.known_swept.copy() for drone in drones]
+    reports = [set(drone.reported_regions) for drone in drones]
+    pairs = find_neighbor_pairs([drone.position for drone in drones], COMMUNICATION_RADIUS)
+    for i, j in pairs:
+        drones[i].known_swept |= swept[j]
+        drones[j].known_swept |= swept[i]
+        drones[i].reported_regions |= reports[j]
+        drones[j].reported_regions |= reports[i]
+    return len(pairs)
+
+def save_scenario(disaster_map, path):
+    # Guarda el estado inicial de un mapa como escenario reutilizable: un directorio
+    # con el mapa (grid.npy, int8), la línea de tiempo de obstáculos y meta.json
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'grid.npy'), disaster_map.grid.astype(np.int8))
+    np.save(os.path.join(path, 'obstacle_events.npy'), disaster_map.obstacle_events.astype(np.int32))
+    np.save(os.path.join(path, 'random_obstacle_events.npy'),
+            disaster_map.random_obstacle_events.astype(np.int32))
+    meta = {
+        'version': 1,
+        'size': disaster_map.size,
+        'base_position': [int(x) for x in disaster_map.base_position],
+        'initial_survivors': int(np.count_nonzero(disaster_map.grid == SURVIVOR)),
+        'initial_resources': int(np.count_nonzero(disaster_map.grid == RESOURCE)),
+    }
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+def load_scenario(path):
+    # Carga un escenario guardado con save_scenario. El mapa se abre como memoria
+    # mapeada en copia-en-escritura: muchas ejecuciones del mismo escenario
+    # comparten las páginas del archivo y solo copian las celdas que modifican
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    disaster_map = DisasterMap(meta['size'])
+    disaster_map.grid = np.load(os.path.join(path, 'grid.npy'), mmap_mode='c')
+    disaster_map.pheromone[:, disaster_map.grid == OBSTACLE] = 0  # Sin feromona en obstáculos
+    disaster_map.base_position = tuple(meta['base_position'])
+    disaster_map.initial_survivors = meta['initial_survivors']
+    disaster_map.initial_resources = meta['initial_resources']
+    disaster_map.obstacle_events = np.load(os.path.join(path, 'obstacle_events.npy'))
+    disaster_map.random_obstacle_events = np.load(os.path.join(path, 'random_obstacle_events.npy'))
+    return disaster_map
+
+def simulation_step(disaster_map, drones, frame):
+    # Ejecuta un paso completo de la simulación y devuelve los eventos ocurridos
+    # como tuplas (id del dron, tipo de evento)
+    # Añadir los obstáculos dinámicos programados en la línea de tiempo
+    if disaster_map.apply_timeline(frame):
         print("¡Obstáculos dinámicos añadidos!")
             
     paths = []
     fitness_values = []
     events_this_step = []
+    found_before = np.array([(drone.found_survivors, drone.found_resources) for drone in drones])
     
     for drone in drones:
         # Mover el dron
@@ -309,11 +539,26 @@ def update_animation(frame):
                 drone.path.append(drone.position)
                 drone.visited.add(drone.position)
                 drone.stuck_count = 0
-                events_this_step.append(f"Dron {drone.id} reposicionado")
+                events_this_step.append((drone.id, "repositioned"))
                 
         # Registrar eventos
         if event and event != "stuck":
-            events_this_step.append(f"Dron {drone.id} encontró {event}")
+            events_this_step.append((drone.id, event))
+
+    # Actualizar cobertura con la huella del sensor y detectar objetivos dentro de ella
+    owners, kinds = disaster_map.sense([drone.position for drone in drones])
+    for index, kind in zip(owners, kinds):
+        drone = drones[index]
+        if kind == SURVIVOR:
+            drone.found_survivors += 1
+            events_this_step.append((drone.id, "survivor"))
+        else:
+            drone.found_resources += 1
+            events_this_step.append((drone.id, "resource"))
+
+    found_now = np.array([(drone.found_survivors, drone.found_resources) for drone in drones])
+    if COMMUNICATION_RADIUS > 0:
+        exchange_information(disaster_map, drones, (found_now - found_before).sum(axis=1))
                 
     # Calcular fitness para cada dron
     for drone in drones:
@@ -321,185 +566,366 @@ def update_animation(frame):
         fitness_values.append(fitness)
         paths.append(drone.path)
             
+    # Depósitos por canal: exploración según el fitness y rastros de descubrimiento
+    # según los objetivos encontrados en este paso
+    deposits = np.zeros((len(drones), NUM_CHANNELS))
+    deposits[:, EXPLORATION_CHANNEL] = np.array(fitness_values) * 0.1
+    deposits[:, [SURVIVOR_CHANNEL, RESOURCE_CHANNEL]] = (found_now - found_before) * DISCOVERY_DEPOSIT
+
     # Actualizar feromonas
     disaster_map.evaporate_pheromone()
-    disaster_map.update_pheromone(paths, fitness_values)
-        
-    # Actualizar cobertura
-    for drone in drones:
-        for pos in drone.visited:
-            disaster_map.covered[pos] = True
-                
-    # Calcular métricas
-    total_covered = np.sum(disaster_map.covered)
-    total_energy = sum(drone.energy_used for drone in drones)
-    total_survivors_found = sum(drone.found_survivors for drone in drones)
-    total_resources_found = sum(drone.found_resources for drone in drones)
+    if PHEROMONE_MODE == 'mmas':
+        # El canal de exploración lo gestiona el MAX-MIN Ant System
+        if disaster_map.mmas is None:
+            disaster_map.mmas = MaxMinAntSystem(len(drones))
+        deposits[:, EXPLORATION_CHANNEL] = 0
+        disaster_map.mmas.update(disaster_map.pheromone[EXPLORATION_CHANNEL], paths,
+                                 fitness_values, np.count_nonzero(disaster_map.covered))
+    disaster_map.update_pheromone(paths, deposits)
+
+    return events_this_step
+
+def describe_event(drone_id, event):
+    # Texto legible de un evento devuelto por simulation_step
+    if event == "repositioned":
+        return f"Dron {drone_id} reposicionado"
+    return f"Dron {drone_id} encontró {event}"
+
+# Códigos numéricos de los eventos para los formatos binarios
+EVENT_CODES = {"survivor": 0, "resource": 1, "repositioned": 2}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+
+class ReplayRecorder:
+    # Graba la simulación en un formato compacto: posiciones int16 de los drones
+    # por paso, cambios dispersos de celdas, eventos y métricas acumuladas
+    def __init__(self, disaster_map, drones):
+        self.disaster_map = disaster_map
+        self.drones = drones
+        self.initial_grid = disaster_map.grid.astype(np.int8)
+        self.previous_grid = disaster_map.grid.copy()
+        self.positions = []
+        self.change_steps, self.change_cells, self.change_states = [], [], []
+        self.event_steps, self.event_drones, self.event_codes = [], [], []
+        self.metrics = []
+
+    @property
+    def steps(self):
+        return len(self.positions)
+
+    def record(self, events):
+        step = self.steps
+        grid = self.disaster_map.grid
+        rows, cols = np.nonzero(grid != self.previous_grid)
+        if len(rows):
+            self.change_steps.append(np.full(len(rows), step, dtype=np.int32))
+            self.change_cells.append(np.column_stack([rows, cols]).astype(np.int16))
+            self.change_states.append(grid[rows, cols].astype(np.int8))
+            self.previous_grid[rows, cols] = grid[rows, cols]
+        self.positions.append(np.array([drone.position for drone in self.drones], dtype=np.int16))
+        for drone_id, event in events:
+            self.event_steps.append(step)
+            self.event_drones.append(drone_id)
+            self.event_codes.append(EVENT_CODES[event])
+        self.metrics.append((np.sum(self.disaster_map.covered),
+                             sum(drone.energy_used for drone in self.drones),
+                             sum(drone.found_survivors for drone in self.drones),
+                             sum(drone.found_resources for drone in self.drones)))
+
+    def save(self, path):
+        num_drones = len(self.drones)
+        np.savez_compressed(
+            path,
+            meta=np.array([self.disaster_map.size, *self.disaster_map.base_position,
+                           self.disaster_map.initial_survivors,
+                           self.disaster_map.initial_resources], dtype=np.int32),
+            initial_grid=self.initial_grid,
+            positions=np.array(self.positions, dtype=np.int16).reshape(-1, num_drones, 2),
+            change_steps=np.concatenate(self.change_steps) if self.change_steps else np.empty(0, np.int32),
+            change_cells=np.concatenate(self.change_cells) if self.change_cells else np.empty((0, 2), np.int16),
+            change_states=np.concatenate(self.change_states) if self.change_states else np.empty(0, np.int8),
+            event_steps=np.array(self.event_steps, dtype=np.int32),
+            event_drones=np.array(self.event_drones, dtype=np.int16),
+            event_codes=np.array(self.event_codes, dtype=np.int8),
+            metrics=np.array(self.metrics, dtype=np.int32).reshape(-1, 4))
+        return path
+
+if __name__ == "__main__":
+    # Configuración de la figura
+    fig = plt.figure(figsize=(14, 10))
+    gs = fig.add_gridspec(3, 2)
+
+    # Subplots
+    ax1 = fig.add_subplot(gs[0:2, 0])  # Mapa (2 filas, columna 0)
+    ax2 = fig.add_subplot(gs[0, 1])    # Cobertura
+    ax3 = fig.add_subplot(gs[1, 1])    # Energía
+    ax4 = fig.add_subplot(gs[2, :])    # Objetivos (fila completa abajo)
+
+    # Inicializar mapa (aleatorio o desde un escenario guardado) y drones
+    if SCENARIO_PATH:
+        disaster_map = load_scenario(SCENARIO_PATH)
+    else:
+        disaster_map = DisasterMap(MAP_SIZE)
+        disaster_map.add_entities(NUM_SURVIVORS, NUM_RESOURCES, NUM_OBSTACLES)
+    map_size = disaster_map.size
+    drones = [Drone(i, disaster_map.base_position) for i in range(NUM_DRONES)]
+    recorder = ReplayRecorder(disaster_map, drones)
+    simulation_finished = False
+
+    # Métricas
+    total_covered_history = []
+    energy_consumed_history = []
+    survivors_found_history = []
+    resources_found_history = []
+    steps_history = []
+
+    # Elementos de la animación - Mapa
+    map_display = ax1.imshow(np.zeros((map_size, map_size, 3)))
+    ax1.set_title('Exploración en Tiempo Real - Rescate con Drones')
+    ax1.set_xticks([])
+    ax1.set_yticks([])
+
+    # Leyenda fuera del mapa
+    legend_elements = [
+        mpatches.Patch(color='green', label='Supervivientes'),
+        mpatches.Patch(color='cyan', label='Recursos'),
+        mpatches.Patch(color='gray', label='Obstáculos'),
+        mpatches.Patch(color='yellow', label='Rescatados'),
+        mpatches.Patch(color='red', label='Drones')
+    ]
+    ax1.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(0, 1))
+
+    # Puntos para los drones (todos rojos)
+    drone_positions = np.empty((0, 2))
+    drone_dots = ax1.scatter([], [], c='red', s=100, edgecolors='darkred', linewidths=2)
+
+    # Texto informativo (fuera del área del mapa)
+    info_text = fig.text(0.02, 0.95, '', fontsize=10, 
+                        bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
+
+    # Gráficos de métricas
+    coverage_line, = ax2.plot([], [], 'b-', linewidth=2)
+    ax2.set_xlim(0, MAX_STEPS)
+    ax2.set_ylim(0, 100)
+    ax2.set_xlabel('Pasos')
+    ax2.set_ylabel('Cobertura (%)')
+    ax2.set_title('Cobertura del Área')
+    ax2.grid(True, alpha=0.3)
+
+    energy_line, = ax3.plot([], [], 'r-', linewidth=2)
+    ax3.set_xlim(0, MAX_STEPS)
+    ax3.set_ylim(0, 2000)
+    ax3.set_xlabel('Pasos')
+    ax3.set_ylabel('Energía')
+    ax3.set_title('Energía Consumida')
+    ax3.grid(True, alpha=0.3)
+
+    survivors_line, = ax4.plot([], [], 'g-', label='Supervivientes', linewidth=2)
+    resources_line, = ax4.plot([], [], 'c-', label='Recursos', linewidth=2)
+    ax4.set_xlim(0, MAX_STEPS)
+    ax4.set_ylim(0, max(NUM_SURVIVORS, NUM_RESOURCES) + 2)
+    ax4.set_xlabel('Pasos')
+    ax4.set_ylabel('Encontrados')
+    ax4.set_title('Objetivos Encontrados')
+    ax4.legend()
+    ax4.grid(True, alpha=0.3)
+
+    # Variables para guardar la animación
+    frames_data = []
+
+    def init_animation():
+        map_display.set_array(np.zeros((map_size, map_size, 3)))
+        drone_dots.set_offsets(np.empty((0, 2)))
+        coverage_line.set_data([], [])
+        energy_line.set_data([], [])
+        survivors_line.set_data([], [])
+        resources_line.set_data([], [])
+        info_text.set_text('Iniciando simulación...')
+        return map_display, drone_dots, coverage_line, energy_line, survivors_line, resources_line, info_text
+
+    def update_animation(frame):
+        global drones, disaster_map, simulation_finished
     
-    total_covered_history.append(total_covered)
-    energy_consumed_history.append(total_energy)
-    survivors_found_history.append(total_survivors_found)
-    resources_found_history.append(total_resources_found)
-    steps_history.append(frame)
+        events_this_step = simulation_step(disaster_map, drones, frame)
+        recorder.record(events_this_step)
     
-    # Actualizar visualización del mapa (solo el fondo)
-    grid_viz = np.zeros((MAP_SIZE, MAP_SIZE, 3))
-    for r in range(MAP_SIZE):
-        for c in range(MAP_SIZE):
-            grid_viz[r, c] = COLORS[disaster_map.grid[r, c]]
+        # Calcular métricas
+        total_covered = np.sum(disaster_map.covered)
+        total_energy = sum(drone.energy_used for drone in drones)
+        total_survivors_found = sum(drone.found_survivors for drone in drones)
+        total_resources_found = sum(drone.found_resources for drone in drones)
     
-    map_display.set_array(grid_viz)
+        total_covered_history.append(total_covered)
+        energy_consumed_history.append(total_energy)
+        survivors_found_history.append(total_survivors_found)
+        resources_found_history.append(total_resources_found)
+        steps_history.append(frame)
     
-    # Actualizar posiciones de los drones (todos rojos)
-    drone_positions = np.array([drone.position for drone in drones])
+        # Actualizar visualización del mapa (solo el fondo)
+        grid_viz = np.zeros((map_size, map_size, 3))
+        for r in range(map_size):
+            for c in range(map_size):
+                grid_viz[r, c] = COLORS[disaster_map.grid[r, c]]
     
-    if len(drone_positions) > 0:
-        # Invertir coordenadas Y para matplotlib
-        drone_positions_display = np.column_stack([drone_positions[:, 1], drone_positions[:, 0]])
-        drone_dots.set_offsets(drone_positions_display)
+        map_display.set_array(grid_viz)
     
-    # Actualizar gráficos de métricas
-    total_cells = MAP_SIZE ** 2
-    covered_percentage = [100 * x / total_cells for x in total_covered_history]
+        # Actualizar posiciones de los drones (todos rojos)
+        drone_positions = np.array([drone.position for drone in drones])
     
-    coverage_line.set_data(steps_history, covered_percentage)
-    energy_line.set_data(steps_history, energy_consumed_history)
-    survivors_line.set_data(steps_history, survivors_found_history)
-    resources_line.set_data(steps_history, resources_found_history)
+        if len(drone_positions) > 0:
+            # Invertir coordenadas Y para matplotlib
+            drone_positions_display = np.column_stack([drone_positions[:, 1], drone_positions[:, 0]])
+            drone_dots.set_offsets(drone_positions_display)
     
-    # Ajustar límites de los gráficos
-    if steps_history:
-        current_max_step = max(steps_history)
-        ax2.set_xlim(0, current_max_step + 10)
-        ax3.set_xlim(0, current_max_step + 10)
-        ax4.set_xlim(0, current_max_step + 10)
+        # Actualizar gráficos de métricas
+        total_cells = map_size ** 2
+        covered_percentage = [100 * x / total_cells for x in total_covered_history]
+    
+        coverage_line.set_data(steps_history, covered_percentage)
+        energy_line.set_data(steps_history, energy_consumed_history)
+        survivors_line.set_data(steps_history, survivors_found_history)
+        resources_line.set_data(steps_history, resources_found_history)
+    
+        # Ajustar límites de los gráficos
+        if steps_history:
+            current_max_step = max(steps_history)
+            ax2.set_xlim(0, current_max_step + 10)
+            ax3.set_xlim(0, current_max_step + 10)
+            ax4.set_xlim(0, current_max_step + 10)
         
-        ax2.set_ylim(0, min(100, max(covered_percentage) + 10) if covered_percentage else 100)
-        ax3.set_ylim(0, max(energy_consumed_history) + 50 if energy_consumed_history else 2000)
-        max_obj = max(max(survivors_found_history) if survivors_found_history else 0, 
-                     max(resources_found_history) if resources_found_history else 0)
-        ax4.set_ylim(0, max_obj + 2)
+            ax2.set_ylim(0, min(100, max(covered_percentage) + 10) if covered_percentage else 100)
+            ax3.set_ylim(0, max(energy_consumed_history) + 50 if energy_consumed_history else 2000)
+            max_obj = max(max(survivors_found_history) if survivors_found_history else 0, 
+                         max(resources_found_history) if resources_found_history else 0)
+            ax4.set_ylim(0, max_obj + 2)
     
-    # Actualizar texto informativo
-    info_text.set_text(f'Paso: {frame}\n'
-                      f'Cobertura: {covered_percentage[-1]:.1f}%\n'
-                      f'Supervivientes: {total_survivors_found}/{disaster_map.initial_survivors}\n'
-                      f'Recursos: {total_resources_found}/{disaster_map.initial_resources}\n'
-                      f'Energía: {total_energy}')
+        # Actualizar texto informativo
+        info_text.set_text(f'Paso: {frame}\n'
+                          f'Cobertura: {covered_percentage[-1]:.1f}%\n'
+                          f'Supervivientes: {total_survivors_found}/{disaster_map.initial_survivors}\n'
+                          f'Recursos: {total_resources_found}/{disaster_map.initial_resources}\n'
+                          f'Energía: {total_energy}')
     
-    # Mostrar eventos de este paso
-    if events_this_step:
-        for event in events_this_step:
-            print(f"Paso {frame}: {event}")
+        # Mostrar eventos de este paso
+        if events_this_step:
+            for drone_id, event in events_this_step:
+                print(f"Paso {frame}: {describe_event(drone_id, event)}")
     
-    # Verificar si se cubrió el 100%
-    if total_covered == MAP_SIZE ** 2:
-        print(f"¡Cobertura del 100% alcanzada en el paso {frame}!")
-        ani.event_source.stop()  # Detener la animación
+        # Verificar si se cubrió el 100%
+        if total_covered == map_size ** 2:
+            print(f"¡Cobertura del 100% alcanzada en el paso {frame}!")
+            simulation_finished = True
+            if ani.event_source is not None:  # Sin ventana (cerrada o no interactiva) no hay temporizador
+                ani.event_source.stop()  # Detener la animación
             
-    return map_display, drone_dots, coverage_line, energy_line, survivors_line, resources_line, info_text
-
-# Crear animación
-ani = FuncAnimation(fig, update_animation, frames=MAX_STEPS,
-                    init_func=init_animation, blit=False, interval=150, repeat=False)
-
-plt.tight_layout()
-
-# Guardar GIF de la animación
-print("Guardando animación como GIF...")
-writer = PillowWriter(fps=10, bitrate=1800)
-ani.save('drone_rescue_simulation.gif', writer=writer)
-print("GIF guardado: drone_rescue_simulation.gif")
-
-# Mostrar la animación
-plt.show()
-
-# Guardar imagen PNG final
-print("Guardando imagen final PNG...")
-final_fig = plt.figure(figsize=(14, 10))
-final_gs = final_fig.add_gridspec(3, 2)
-
-# Subplots para la imagen final
-final_ax1 = final_fig.add_subplot(final_gs[0:2, 0])
-final_ax2 = final_fig.add_subplot(final_gs[0, 1])
-final_ax3 = final_fig.add_subplot(final_gs[1, 1])
-final_ax4 = final_fig.add_subplot(final_gs[2, :])
-
-# Crear visualización del estado final
-grid_viz = np.zeros((MAP_SIZE, MAP_SIZE, 3))
-for r in range(MAP_SIZE):
-    for c in range(MAP_SIZE):
-        grid_viz[r, c] = COLORS[disaster_map.grid[r, c]]
-
-final_ax1.imshow(grid_viz)
-final_ax1.set_title('Estado Final - Rescate con Drones')
-final_ax1.set_xticks([])
-final_ax1.set_yticks([])
-
-# Añadir drones en rojo
-drone_positions = np.array([drone.position for drone in drones])
-if len(drone_positions) > 0:
-    drone_positions_display = np.column_stack([drone_positions[:, 1], drone_positions[:, 0]])
-    final_ax1.scatter(drone_positions_display[:, 0], drone_positions_display[:, 1], 
-                     c='red', s=100, edgecolors='darkred', linewidths=2)
-
-# Leyenda
-final_ax1.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(0, 1))
-
-# Gráficos de métricas finales
-total_cells = MAP_SIZE ** 2
-covered_percentage = [100 * x / total_cells for x in total_covered_history]
-
-final_ax2.plot(steps_history, covered_percentage, 'b-', linewidth=2)
-final_ax2.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
-final_ax2.set_ylim(0, 100)
-final_ax2.set_xlabel('Pasos')
-final_ax2.set_ylabel('Cobertura (%)')
-final_ax2.set_title('Cobertura del Área')
-final_ax2.grid(True, alpha=0.3)
-
-final_ax3.plot(steps_history, energy_consumed_history, 'r-', linewidth=2)
-final_ax3.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
-final_ax3.set_ylim(0, max(energy_consumed_history) + 50 if energy_consumed_history else 2000)
-final_ax3.set_xlabel('Pasos')
-final_ax3.set_ylabel('Energía')
-final_ax3.set_title('Energía Consumida')
-final_ax3.grid(True, alpha=0.3)
-
-final_ax4.plot(steps_history, survivors_found_history, 'g-', label='Supervivientes', linewidth=2)
-final_ax4.plot(steps_history, resources_found_history, 'c-', label='Recursos', linewidth=2)
-final_ax4.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
-max_obj = max(max(survivors_found_history) if survivors_found_history else 0, 
-             max(resources_found_history) if resources_found_history else 0)
-final_ax4.set_ylim(0, max_obj + 2)
-final_ax4.set_xlabel('Pasos')
-final_ax4.set_ylabel('Encontrados')
-final_ax4.set_title('Objetivos Encontrados')
-final_ax4.legend()
-final_ax4.grid(True, alpha=0.3)
-
-# Texto informativo final
-final_coverage = 100 * total_covered_history[-1] / total_cells if total_covered_history else 0
-final_info = (f'RESUMEN FINAL\n'
-              f'Pasos totales: {steps_history[-1] if steps_history else 0}\n'
-              f'Cobertura final: {final_coverage:.1f}%\n'
-              f'Supervivientes: {survivors_found_history[-1] if survivors_found_history else 0}/{disaster_map.initial_survivors}\n'
-              f'Recursos: {resources_found_history[-1] if resources_found_history else 0}/{disaster_map.initial_resources}\n'
-              f'Energía total: {energy_consumed_history[-1] if energy_consumed_history else 0}')
-
-final_fig.text(0.02, 0.95, final_info, fontsize=12, 
-               bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
-
-plt.tight_layout()
-plt.savefig('drone_rescue_final.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("Imagen final guardada: drone_rescue_final.png")
-
-# Mostrar métricas finales después de la animación
-if steps_history:
-    final_coverage = 100 * total_covered_history[-1] / (MAP_SIZE ** 2)
-    print(f"\n--- MÉTRICAS FINALES ---")
-    print(f"Cobertura máxima: {final_coverage:.2f}%")
-    print(f"Energía total consumida: {energy_consumed_history[-1]}")
-    print(f"Supervivientes encontrados: {survivors_found_history[-1]}/{disaster_map.initial_survivors}")
-    print(f"Recursos encontrados: {resources_found_history[-1]}/{disaster_map.initial_resources}")
\ No newline at end of file
+        return map_display, drone_dots, coverage_line, energy_line, survivors_line, resources_line, info_text
+
+    # Crear animación
+    ani = FuncAnimation(fig, update_animation, frames=MAX_STEPS,
+                        init_func=init_animation, blit=False, interval=150, repeat=False)
+
+    plt.tight_layout()
+
+    # Mostrar la animación (la simulación se ejecuta una sola vez y queda grabada)
+    plt.show()
+
+    # Completar los pasos restantes si la ventana se cerró antes o el backend no es interactivo
+    while not simulation_finished and recorder.steps < MAX_STEPS:
+        update_animation(recorder.steps)
+
+    # Guardar la grabación y renderizar el GIF en paralelo a partir de ella
+    from rescue_replay import render_gif
+    replay_path = recorder.save('drone_rescue_replay.npz')
+    print(f"Grabación guardada: {replay_path}")
+    print("Guardando animación como GIF...")
+    render_gif(replay_path, 'drone_rescue_simulation.gif')
+    print("GIF guardado: drone_rescue_simulation.gif")
+
+    # Guardar imagen PNG final
+    print("Guardando imagen final PNG...")
+    final_fig = plt.figure(figsize=(14, 10))
+    final_gs = final_fig.add_gridspec(3, 2)
+
+    # Subplots para la imagen final
+    final_ax1 = final_fig.add_subplot(final_gs[0:2, 0])
+    final_ax2 = final_fig.add_subplot(final_gs[0, 1])
+    final_ax3 = final_fig.add_subplot(final_gs[1, 1])
+    final_ax4 = final_fig.add_subplot(final_gs[2, :])
+
+    # Crear visualización del estado final
+    grid_viz = np.zeros((map_size, map_size, 3))
+    for r in range(map_size):
+        for c in range(map_size):
+            grid_viz[r, c] = COLORS[disaster_map.grid[r, c]]
+
+    final_ax1.imshow(grid_viz)
+    final_ax1.set_title('Estado Final - Rescate con Drones')
+    final_ax1.set_xticks([])
+    final_ax1.set_yticks([])
+
+    # Añadir drones en rojo
+    drone_positions = np.array([drone.position for drone in drones])
+    if len(drone_positions) > 0:
+        drone_positions_display = np.column_stack([drone_positions[:, 1], drone_positions[:, 0]])
+        final_ax1.scatter(drone_positions_display[:, 0], drone_positions_display[:, 1], 
+                         c='red', s=100, edgecolors='darkred', linewidths=2)
+
+    # Leyenda
+    final_ax1.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(0, 1))
+
+    # Gráficos de métricas finales
+    total_cells = map_size ** 2
+    covered_percentage = [100 * x / total_cells for x in total_covered_history]
+
+    final_ax2.plot(steps_history, covered_percentage, 'b-', linewidth=2)
+    final_ax2.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
+    final_ax2.set_ylim(0, 100)
+    final_ax2.set_xlabel('Pasos')
+    final_ax2.set_ylabel('Cobertura (%)')
+    final_ax2.set_title('Cobertura del Área')
+    final_ax2.grid(True, alpha=0.3)
+
+    final_ax3.plot(steps_history, energy_consumed_history, 'r-', linewidth=2)
+    final_ax3.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
+    final_ax3.set_ylim(0, max(energy_consumed_history) + 50 if energy_consumed_history else 2000)
+    final_ax3.set_xlabel('Pasos')
+    final_ax3.set_ylabel('Energía')
+    final_ax3.set_title('Energía Consumida')
+    final_ax3.grid(True, alpha=0.3)
+
+    final_ax4.plot(steps_history, survivors_found_history, 'g-', label='Supervivientes', linewidth=2)
+    final_ax4.plot(steps_history, resources_found_history, 'c-', label='Recursos', linewidth=2)
+    final_ax4.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
+    max_obj = max(max(survivors_found_history) if survivors_found_history else 0, 
+                 max(resources_found_history) if resources_found_history else 0)
+    final_ax4.set_ylim(0, max_obj + 2)
+    final_ax4.set_xlabel('Pasos')
+    final_ax4.set_ylabel('Encontrados')
+    final_ax4.set_title('Objetivos Encontrados')
+    final_ax4.legend()
+    final_ax4.grid(True, alpha=0.3)
+
+    # Texto informativo final
+    final_coverage = 100 * total_covered_history[-1] / total_cells if total_covered_history else 0
+    final_info = (f'RESUMEN FINAL\n'
+                  f'Pasos totales: {steps_history[-1] if steps_history else 0}\n'
+                  f'Cobertura final: {final_coverage:.1f}%\n'
+                  f'Supervivientes: {survivors_found_history[-1] if survivors_found_history else 0}/{disaster_map.initial_survivors}\n'
+                  f'Recursos: {resources_found_history[-1] if resources_found_history else 0}/{disaster_map.initial_resources}\n'
+                  f'Energía total: {energy_consumed_history[-1] if energy_consumed_history else 0}')
+
+    final_fig.text(0.02, 0.95, final_info, fontsize=12, 
+                   bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
+
+    plt.tight_layout()
+    plt.savefig('drone_rescue_final.png', dpi=150, bbox_inches='tight')
+    plt.close()
+    print("Imagen final guardada: drone_rescue_final.png")
+
+    # Mostrar métricas finales después de la animación
+    if steps_history:
+        final_coverage = 100 * total_covered_history[-1] / (map_size ** 2)
+        print(f"\n--- MÉTRICAS FINALES ---")
+        print(f"Cobertura máxima: {final_coverage:.2f}%")
+        print(f"Energía total consumida: {energy_consumed_history[-1]}")
+        print(f"Supervivientes encontrados: {survivors_found_history[-1]}/{disaster_map.initial_survivors}")
+        print(f"Recursos encontrados: {resources_found_history[-1]}/{disaster_map.initial_resources}")
\ No newline at end of file
@@ -0,0 +1,431 @@
+import os
+import random
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Punto2_Lab_4 import (MAP_SIZE, NUM_DRONES, NUM_SURVIVORS, NUM_RESOURCES, NUM_OBSTACLES,
+                          MAX_STEPS, ALPHA, DIFFUSION_RATE,
+                          PHEROMONE_TRAIL_LENGTH, NUM_CHANNELS, DISCOVERY_DEPOSIT, EXPLORATION_CHANNEL,
+                          SURVIVOR_CHANNEL, RESOURCE_CHANNEL,
+                          OBJECTIVE_BONUS, DRONE_CHANNEL_PROFILES, PHEROMONE_MODE,
+                          COMMUNICATION_RADIUS,
+                          EMPTY, SURVIVOR, RESOURCE, OBSTACLE, RESCUED,
+                          DisasterMap, Drone, simulation_step, pheromone_pass, sensor_footprint,
+                          load_scenario)
+
+# Simulación de rescate particionada: el mapa se divide en franjas de filas y
+# cada franja pertenece a un proceso. Todo el estado compartido (mapa, feromona,
+# cobertura y tabla de drones) vive en memoria compartida; las filas de borde
+# de las franjas vecinas (halo) se leen directamente del bloque compartido
+# después de cada barrera, y el traspaso de un dron a otra franja consiste en
+# cambiar su propietario en la tabla de drones.
+
+TRAIL_LENGTH = PHEROMONE_TRAIL_LENGTH   # Últimas posiciones que depositan feromona
+RECENT_LENGTH = 8   # Últimas posiciones que se evitan para no ciclar
+BARRIER_TIMEOUT = 120   # Segundos que un proceso espera a los demás en una barrera
+JOIN_TIMEOUT = 10       # Segundos para que los procesos salgan tras un fallo antes de terminarlos
+
+# Columnas de la tabla compartida de drones
+D_ROW = 0
+D_COL = 1
+D_NEXT_ROW = 2
+D_NEXT_COL = 3
+D_OWNER = 4
+D_SURVIVORS = 5
+D_RESOURCES = 6
+D_ENERGY = 7
+D_STUCK = 8
+D_VISITED = 9
+D_PATH_LEN = 10
+D_FIELDS = 11
+
+# Columnas del historial de métricas
+H_COVERED = 0
+H_ENERGY = 1
+H_SURVIVORS = 2
+H_RESOURCES = 3
+
+# Índices del bloque de control (a partir de C_HANDOFFS, un contador por proceso)
+C_STOP = 0
+C_STEPS = 1
+C_HANDOFFS = 2
+
+
+def _shared_layout(map_size, num_drones, max_steps, num_workers):
+    # Forma y tipo de cada arreglo que se coloca en memoria compartida
+    return {
+        'grid': ((map_size, map_size), np.int8),
+        'pheromone': ((NUM_CHANNELS, map_size, map_size), np.float64),
+        'pheromone_next': ((NUM_CHANNELS, map_size, map_size), np.float64),
+        'covered': ((map_size, map_size), np.bool_),
+        'visited': ((num_drones, map_size, map_size), np.bool_),
+        'trail': ((num_drones, TRAIL_LENGTH, 2), np.int32),
+        'drones': ((num_drones, D_FIELDS), np.int64),
+        'credits': ((num_workers, num_drones, 2), np.int64),
+        'history': ((max_steps, 4), np.float64),
+        'control': ((C_HANDOFFS + num_workers,), np.int64),
+    }
+
+
+def _attach(names, layout):
+    # Abre los bloques compartidos por nombre y devuelve vistas NumPy sobre ellos
+    blocks = {key: shared_memory.SharedMemory(name=names[key]) for key in layout}
+    arrays = {key: np.ndarray(layout[key][0], dtype=layout[key][1], buffer=blocks[key].buf)
+              for key in layout}
+    return blocks, arrays
+
+
+def strip_bounds(map_size, num_workers):
+    # Filas [inicio, fin) de cada franja, lo más equilibradas posible
+    edges = np.linspace(0, map_size, num_workers + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _neighbors(grid, r, c):
+    # Igual que DisasterMap.get_neighbors pero sobre el mapa compartido
+    size = grid.shape[0]
+    result = []
+    for dr, dc in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+        nr, nc = r + dr, c + dc
+        if 0 <= nr < size and 0 <= nc < size and grid[nr, nc] != OBSTACLE:
+            result.append((nr, nc))
+    return result
+
+
+def _recent_positions(trail, table, d, count):
+    # Últimas `count` posiciones del anillo de trayectoria del dron d
+    path_len = table[d, D_PATH_LEN]
+    n = min(count, path_len, TRAIL_LENGTH)
+    idx = [(path_len - 1 - k) % TRAIL_LENGTH for k in range(n)]
+    return set(map(tuple, trail[d, idx]))
+
+
+def _choose_move(arrays, d, base_position, rng):
+    # Elección probabilística del siguiente paso (mismas reglas que Drone.move)
+    grid = arrays['grid']
+    table = arrays['drones']
+    r, c = int(table[d, D_ROW]), int(table[d, D_COL])
+    neighbors = _neighbors(grid, r, c)
+
+    if neighbors:
+        recent = _recent_positions(arrays['trail'], table, d, RECENT_LENGTH)
+        candidates = [n for n in neighbors if n not in recent] or neighbors
+        channel_weights = np.array(DRONE_CHANNEL_PROFILES[d % len(DRONE_CHANNEL_PROFILES)])
+        weights = []
+        for nr, nc in candidates:
+            pheromone = float(channel_weights @ arrays['pheromone'][:, nr, nc])
+            visited_bonus = 0.3 if arrays['visited'][d, nr, nc] else 3.0
+            objective_bonus = OBJECTIVE_BONUS.get(grid[nr, nc], 1.0)
+            weights.append((pheromone ** ALPHA) * visited_bonus * objective_bonus)
+        if sum(weights) == 0:
+            next_pos = rng.choice(candidates)
+        else:
+            next_pos = rng.choices(candidates, weights=weights)[0]
+        table[d, D_ENERGY] += 1
+        table[d, D_STUCK] = 0
+        moved = True
+    else:
+        table[d, D_STUCK] += 1
+        next_pos = (r, c)
+        moved = False
+
+    # Reposicionar cerca de la base si está atascado
+    if not moved or table[d, D_STUCK] > 5:
+        base_neighbors = _neighbors(grid, *base_position)
+        if base_neighbors:
+            next_pos = rng.choice(base_neighbors)
+            table[d, D_STUCK] = 0
+
+    table[d, D_NEXT_ROW], table[d, D_NEXT_COL] = next_pos
+
+
+def _found(table, credits):
+    # Supervivientes y recursos por dron: contadores propios más las detecciones
+    # del sensor que otros procesos anotaron en sus franjas y aún no se han sumado
+    return table[:, [D_SURVIVORS, D_RESOURCES]] + credits.sum(axis=0)
+
+
+def _fitness(table, found, total_cells):
+    # Igual que calculate_fitness, para todos los drones a la vez
+    fitness = (found[:, 0] * 20 + found[:, 1] * 12
+               + table[:, D_VISITED] / total_cells * 50
+               - table[:, D_ENERGY] * 0.05 - table[:, D_STUCK] * 5)
+    return np.maximum(fitness, 0)
+
+
+def _worker(worker_id, names, layout, bounds, base_position, timeline, max_steps, seed, barrier):
+    blocks, arrays = _attach(names, layout)
+    grid, pheromone, covered = arrays['grid'], arrays['pheromone'], arrays['covered']
+    pheromone_next = arrays['pheromone_next']
+    visited, trail, table = arrays['visited'], arrays['trail'], arrays['drones']
+    credits = arrays['credits']
+    history, control = arrays['history'], arrays['control']
+    row_start, row_end = bounds[worker_id]
+    num_drones = table.shape[0]
+    size = grid.shape[0]
+    total_cells = grid.size
+    rng = random.Random(seed + worker_id)
+    obstacle_events, random_obstacle_events = timeline
+    event_steps = set(obstacle_events[:, 0]) | set(random_obstacle_events[:, 0])
+    previous_found = np.zeros((num_drones, 2), dtype=np.int64)
+
+    try:
+        for frame in range(max_steps):
+            # Obstáculos dinámicos de la línea de tiempo: el proceso 0 modifica el mapa completo
+            if frame in event_steps:
+                if worker_id == 0:
+                    cells = [tuple(cell) for cell in obstacle_events[obstacle_events[:, 0] == frame, 1:]]
+                    count = int(random_obstacle_events[random_obstacle_events[:, 0] == frame, 1].sum())
+                    if count:
+                        empty = [tuple(p) for p in np.argwhere(grid == EMPTY) if tuple(p) != base_position]
+                        rng.shuffle(empty)
+                        cells += empty[:count]
+                    for r, c in cells:
+                        grid[r, c] = OBSTACLE
+                        pheromone[:, r, c] = 0
+                barrier.wait(BARRIER_TIMEOUT)
+
+            # Fase 1: cada proceso suma las detecciones pendientes de sus drones y
+            # decide su movimiento
+            for d in range(num_drones):
+                if table[d, D_OWNER] == worker_id:
+                    table[d, D_SURVIVORS] += credits[:, d, 0].sum()
+                    table[d, D_RESOURCES] += credits[:, d, 1].sum()
+                    credits[:, d] = 0
+                    _choose_move(arrays, d, base_position, rng)
+            barrier.wait(BARRIER_TIMEOUT)
+
+            # Fase 2: cada proceso aplica las llegadas a sus propias filas, en
+            # orden de id, y adopta a los drones que cruzan hacia su franja
+            for d in range(num_drones):
+                r, c = int(table[d, D_NEXT_ROW]), int(table[d, D_NEXT_COL])
+                if not row_start <= r < row_end:
+                    continue
+                if table[d, D_OWNER] != worker_id:
+                    table[d, D_OWNER] = worker_id
+                    control[C_HANDOFFS + worker_id] += 1
+                table[d, D_ROW], table[d, D_COL] = r, c
+                trail[d, table[d, D_PATH_LEN] % TRAIL_LENGTH] = (r, c)
+                table[d, D_PATH_LEN] += 1
+                if not visited[d, r, c]:
+                    visited[d, r, c] = True
+                    table[d, D_VISITED] += 1
+                covered[r, c] = True
+                if grid[r, c] == SURVIVOR:
+                    table[d, D_SURVIVORS] += 1
+                    grid[r, c] = RESCUED
+                elif grid[r, c] == RESOURCE:
+                    table[d, D_RESOURCES] += 1
+                    grid[r, c] = EMPTY
+
+            # Huella del sensor de todos los drones recortada a las filas propias; las
+            # detecciones se anotan en la fila de créditos de este proceso
+            owners, rows, cols = sensor_footprint(table[:, [D_NEXT_ROW, D_NEXT_COL]], size,
+                                                  row_start=row_start, row_end=row_end)
+            covered[rows, cols] = True
+            found = np.isin(grid[rows, cols], (SURVIVOR, RESOURCE))
+            flat, first = np.unique(rows[found] * size + cols[found], return_index=True)
+            owners = owners[found][first]
+            rows, cols = np.divmod(flat, size)
+            kinds = grid[rows, cols]
+            np.add.at(credits[worker_id, :, 0], owners[kinds == SURVIVOR], 1)
+            np.add.at(credits[worker_id, :, 1], owners[kinds == RESOURCE], 1)
+            grid[rows, cols] = np.where(kinds == SURVIVOR, RESCUED, EMPTY)
+            barrier.wait(BARRIER_TIMEOUT)
+
+            # Fase 3: evaporación (y difusión, que lee el halo de las franjas
+            # vecinas y por eso usa un búfer doble) y depósito en las filas propias
+            if DIFFUSION_RATE == 0:
+                pheromone_pass(pheromone, pheromone, row_start, row_end)
+            else:
+                pheromone_pass(pheromone, pheromone_next, row_start, row_end)
+                barrier.wait(BARRIER_TIMEOUT)
+                pheromone[:, row_start:row_end] = pheromone_next[:, row_start:row_end]
+            found = _found(table, credits)
+            deposits = np.zeros((num_drones, NUM_CHANNELS))
+            deposits[:, EXPLORATION_CHANNEL] = _fitness(table, found, total_cells) * 0.1
+            deposits[:, [SURVIVOR_CHANNEL, RESOURCE_CHANNEL]] = (found - previous_found) * DISCOVERY_DEPOSIT
+            previous_found = found
+            for d in np.flatnonzero(np.any(deposits > 0, axis=1)):
+                for r, c in _recent_positions(trail, table, d, TRAIL_LENGTH):
+                    if row_start <= r < row_end:
+                        pheromone[:, r, c] += deposits[d]
+
+            if worker_id == 0:
+                history[frame] = (covered.sum(), table[:, D_ENERGY].sum(),
+                                  found[:, 0].sum(), found[:, 1].sum())
+                control[C_STEPS] = frame + 1
+                if history[frame, H_COVERED] == total_cells:
+                    control[C_STOP] = 1
+            barrier.wait(BARRIER_TIMEOUT)
+
+            if control[C_STOP]:
+                break
+    except threading.BrokenBarrierError:
+        # Otro proceso falló o no llegó a tiempo: salir con error en lugar de esperar
+        raise SystemExit(1)
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        del grid, pheromone, pheromone_next, covered, visited, trail, table, credits
+        del history, control, arrays
+        for block in blocks.values():
+            block.close()
+
+
+def _join_all(processes, barrier, timeout=JOIN_TIMEOUT):
+    # Espera a todos los procesos. Si uno termina con error se rompe la barrera
+    # para que los demás salgan, y los que no lo hagan en `timeout` segundos se
+    # terminan. Devuelve si todos terminaron bien.
+    pending = list(processes)
+    while pending:
+        pending[0].join(0.1)
+        pending = [process for process in pending if process.is_alive()]
+        if any(process.exitcode not in (None, 0) for process in processes):
+            barrier.abort()
+            for process in pending:
+                process.join(timeout)
+            for process in pending:
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            break
+    return all(process.exitcode == 0 for process in processes)
+
+
+def run_parallel_simulation(num_workers=None, seed=None, map_size=MAP_SIZE, num_drones=NUM_DRONES,
+                            num_survivors=NUM_SURVIVORS, num_resources=NUM_RESOURCES,
+                            num_obstacles=NUM_OBSTACLES, max_steps=MAX_STEPS, scenario=None):
+    """Ejecuta la simulación de rescate repartiendo el mapa entre varios procesos.
+
+    Devuelve un diccionario con el historial de métricas por paso, el mapa final
+    y las posiciones finales de los drones.
+    """
+    if PHEROMONE_MODE == 'mmas':
+        raise ValueError("El modo MMAS solo está disponible en la simulación de un solo proceso")
+    if COMMUNICATION_RADIUS > 0:
+        raise ValueError("La comunicación entre drones solo está disponible en la simulación "
+                         "de un solo proceso")
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if seed is None:
+        seed = random.randrange(2**31)
+
+    # Generar el mapa en el proceso principal con la misma lógica de siempre, o
+    # cargar un escenario guardado
+    random.seed(seed)
+    if scenario is not None:
+        disaster_map = load_scenario(scenario)
+        map_size = disaster_map.size
+    else:
+        disaster_map = DisasterMap(map_size)
+        disaster_map.add_entities(num_survivors, num_resources, num_obstacles)
+    num_workers = max(1, min(num_workers, map_size))
+    base_position = disaster_map.base_position
+    bounds = strip_bounds(map_size, num_workers)
+
+    layout = _shared_layout(map_size, num_drones, max_steps, num_workers)
+    blocks = {}
+    try:
+        for key, (shape, dtype) in layout.items():
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            blocks[key] = shared_memory.SharedMemory(create=True, size=nbytes)
+        names = {key: block.name for key, block in blocks.items()}
+        arrays = {key: np.ndarray(layout[key][0], dtype=layout[key][1], buffer=blocks[key].buf)
+                  for key in layout}
+
+        arrays['grid'][:] = disaster_map.grid
+        arrays['pheromone'][:] = disaster_map.pheromone
+        arrays['covered'][:] = False
+        arrays['covered'][base_position] = True
+        arrays['visited'][:] = False
+        arrays['visited'][:, base_position[0], base_position[1]] = True
+        arrays['trail'][:] = 0
+        arrays['trail'][:, 0] = base_position
+        arrays['history'][:] = 0
+        arrays['credits'][:] = 0
+        arrays['control'][:] = 0
+
+        table = arrays['drones']
+        table[:] = 0
+        table[:, D_ROW], table[:, D_COL] = base_position
+        table[:, D_VISITED] = 1
+        table[:, D_PATH_LEN] = 1
+        owner = next(w for w, (start, end) in enumerate(bounds) if start <= base_position[0] < end)
+        table[:, D_OWNER] = owner
+
+        timeline = (np.asarray(disaster_map.obstacle_events),
+                     np.asarray(disaster_map.random_obstacle_events))
+        barrier = mp.Barrier(num_workers)
+        processes = [mp.Process(target=_worker,
+                                args=(w, names, layout, bounds, base_position, timeline,
+                                      max_steps, seed, barrier))
+                     for w in range(num_workers)]
+        for process in processes:
+            process.start()
+        if not _join_all(processes, barrier):
+            raise RuntimeError("Un proceso de la simulación paralela terminó con error")
+
+        steps = int(arrays['control'][C_STEPS])
+        history = arrays['history'][:steps].copy()
+        result = {
+            'steps': steps,
+            'covered': history[:, H_COVERED].astype(int),
+            'energy': history[:, H_ENERGY].astype(int),
+            'survivors': history[:, H_SURVIVORS].astype(int),
+            'resources': history[:, H_RESOURCES].astype(int),
+            'grid': arrays['grid'].astype(int),
+            'drone_positions': table[:, [D_ROW, D_COL]].copy(),
+            'found': _found(table, arrays['credits']),
+            'handoffs': int(arrays['control'][C_HANDOFFS:].sum()),
+            'initial_survivors': disaster_map.initial_survivors,
+            'initial_resources': disaster_map.initial_resources,
+        }
+        del arrays, table
+        return result
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+
+def run_sequential_simulation(seed, map_size=MAP_SIZE, num_drones=NUM_DRONES,
+                              num_survivors=NUM_SURVIVORS, num_resources=NUM_RESOURCES,
+                              num_obstacles=NUM_OBSTACLES, max_steps=MAX_STEPS, scenario=None):
+    """Ejecuta la simulación original en un solo proceso, sin animación."""
+    random.seed(seed)
+    if scenario is not None:
+        disaster_map = load_scenario(scenario)
+        map_size = disaster_map.size
+    else:
+        disaster_map = DisasterMap(map_size)
+        disaster_map.add_entities(num_survivors, num_resources, num_obstacles)
+    drones = [Drone(i, disaster_map.base_position) for i in range(num_drones)]
+    covered, survivors = [], []
+    for frame in range(max_steps):
+        simulation_step(disaster_map, drones, frame)
+        covered.append(int(np.sum(disaster_map.covered)))
+        survivors.append(sum(drone.found_survivors for drone in drones))
+        if covered[-1] == map_size ** 2:
+            break
+    return {'covered': np.array(covered), 'survivors': np.array(survivors)}
+
+
+if __name__ == "__main__":
+    # Comparar la versión paralela con la original sobre varias semillas
+    seeds = range(10)
+    parallel_results = [run_parallel_simulation(seed=s) for s in seeds]
+    sequential_results = [run_sequential_simulation(seed=s) for s in seeds]
+
+    total_cells = MAP_SIZE ** 2
+    print(f"\n--- SIMULACIÓN PARALELA ({os.cpu_count()} procesos) vs UN SOLO PROCESO ---")
+    for label, results in (("Paralela", parallel_results), ("Secuencial", sequential_results)):
+        coverage = np.mean([100 * res['covered'][-1] / total_cells for res in results])
+        survivors = np.mean([res['survivors'][-1] for res in results])
+        print(f"{label}: cobertura media {coverage:.1f}%, supervivientes medios {survivors:.1f}")
+    print(f"Traspasos de drones entre franjas (media): "
+          f"{np.mean([res['handoffs'] for res in parallel_results]):.1f}")
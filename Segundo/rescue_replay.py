@@ -0,0 +1,170 @@
+import argparse
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import matplotlib.patches as mpatches
+from PIL import Image
+
+from Punto2_Lab_4 import COLORS, EVENT_NAMES, describe_event
+
+# Renderizado fuera de línea a partir de una grabación (ReplayRecorder): los
+# fotogramas se reparten en bloques contiguos entre un pool de procesos, cada
+# proceso reconstruye el mapa aplicando los cambios dispersos y devuelve los
+# fotogramas como PNG, y el proceso principal arma el GIF. No se vuelve a simular.
+
+FRAME_DPI = 80
+GIF_FPS = 10
+
+# Paleta indexada por estado de celda
+PALETTE = np.zeros((max(COLORS) + 1, 3))
+for state, color in COLORS.items():
+    PALETTE[state] = color
+
+
+def load_replay(path):
+    """Carga una grabación guardada con ReplayRecorder.save."""
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def grid_at(replay, step, grid=None, from_step=0):
+    """Estado del mapa al final de `step`, aplicando los cambios desde `from_step`."""
+    if grid is None:
+        grid = replay['initial_grid'].copy()
+        from_step = 0
+    steps = replay['change_steps']
+    lo, hi = np.searchsorted(steps, [from_step, step + 1])
+    cells = replay['change_cells'][lo:hi]
+    grid[cells[:, 0], cells[:, 1]] = replay['change_states'][lo:hi]
+    return grid
+
+
+def _build_figure(replay):
+    # Misma disposición que la animación de Punto2_Lab_4.py
+    size = int(replay['meta'][0])
+    fig = Figure(figsize=(14, 10), dpi=FRAME_DPI)
+    FigureCanvasAgg(fig)
+    gs = fig.add_gridspec(3, 2)
+    ax1 = fig.add_subplot(gs[0:2, 0])
+    ax2 = fig.add_subplot(gs[0, 1])
+    ax3 = fig.add_subplot(gs[1, 1])
+    ax4 = fig.add_subplot(gs[2, :])
+
+    artists = {}
+    artists['map'] = ax1.imshow(np.zeros((size, size, 3)))
+    ax1.set_title('Exploración en Tiempo Real - Rescate con Drones')
+    ax1.set_xticks([])
+    ax1.set_yticks([])
+    legend_elements = [
+        mpatches.Patch(color='green', label='Supervivientes'),
+        mpatches.Patch(color='cyan', label='Recursos'),
+        mpatches.Patch(color='gray', label='Obstáculos'),
+        mpatches.Patch(color='yellow', label='Rescatados'),
+        mpatches.Patch(color='red', label='Drones')
+    ]
+    ax1.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(0, 1))
+    artists['drones'] = ax1.scatter([], [], c='red', s=100, edgecolors='darkred', linewidths=2)
+    artists['info'] = fig.text(0.02, 0.95, '', fontsize=10,
+                               bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.8))
+
+    metrics = replay['metrics']
+    steps = np.arange(len(metrics))
+    coverage = 100 * metrics[:, 0] / size ** 2
+    ax2.set_xlim(0, len(steps) + 10)
+    ax2.set_ylim(0, min(100, coverage.max() + 10) if len(coverage) else 100)
+    ax2.set_xlabel('Pasos')
+    ax2.set_ylabel('Cobertura (%)')
+    ax2.set_title('Cobertura del Área')
+    ax2.grid(True, alpha=0.3)
+    ax3.set_xlim(0, len(steps) + 10)
+    ax3.set_ylim(0, metrics[:, 1].max() + 50 if len(metrics) else 2000)
+    ax3.set_xlabel('Pasos')
+    ax3.set_ylabel('Energía')
+    ax3.set_title('Energía Consumida')
+    ax3.grid(True, alpha=0.3)
+    ax4.set_xlim(0, len(steps) + 10)
+    ax4.set_ylim(0, metrics[:, 2:].max() + 2 if len(metrics) else 2)
+    ax4.set_xlabel('Pasos')
+    ax4.set_ylabel('Encontrados')
+    ax4.set_title('Objetivos Encontrados')
+    ax4.grid(True, alpha=0.3)
+    artists['coverage'], = ax2.plot([], [], 'b-', linewidth=2)
+    artists['energy'], = ax3.plot([], [], 'r-', linewidth=2)
+    artists['survivors'], = ax4.plot([], [], 'g-', label='Supervivientes', linewidth=2)
+    artists['resources'], = ax4.plot([], [], 'c-', label='Recursos', linewidth=2)
+    ax4.legend()
+    fig.tight_layout()
+    return fig, artists, steps, coverage
+
+
+def _render_chunk(args):
+    # Renderiza un bloque contiguo de fotogramas y los devuelve como PNG
+    path, first, last = args
+    replay = load_replay(path)
+    fig, artists, steps, coverage = _build_figure(replay)
+    metrics = replay['metrics']
+    meta = replay['meta']
+    grid = grid_at(replay, first - 1) if first > 0 else replay['initial_grid'].copy()
+    frames = []
+    for step in range(first, last):
+        grid = grid_at(replay, step, grid, from_step=step)
+        artists['map'].set_array(PALETTE[grid])
+        positions = replay['positions'][step]
+        artists['drones'].set_offsets(np.column_stack([positions[:, 1], positions[:, 0]]))
+        artists['coverage'].set_data(steps[:step + 1], coverage[:step + 1])
+        artists['energy'].set_data(steps[:step + 1], metrics[:step + 1, 1])
+        artists['survivors'].set_data(steps[:step + 1], metrics[:step + 1, 2])
+        artists['resources'].set_data(steps[:step + 1], metrics[:step + 1, 3])
+        artists['info'].set_text(f'Paso: {step}\n'
+                                 f'Cobertura: {coverage[step]:.1f}%\n'
+                                 f'Supervivientes: {metrics[step, 2]}/{meta[3]}\n'
+                                 f'Recursos: {metrics[step, 3]}/{meta[4]}\n'
+                                 f'Energía: {metrics[step, 1]}')
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=FRAME_DPI)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def render_gif(replay_path, gif_path, num_workers=None, fps=GIF_FPS):
+    """Renderiza una grabación como GIF repartiendo los fotogramas en un pool de procesos."""
+    num_steps = len(load_replay(replay_path)['positions'])
+    if num_steps == 0:
+        raise ValueError(f"La grabación {replay_path} no contiene pasos")
+    num_workers = max(1, min(num_workers or os.cpu_count() or 1, num_steps))
+    edges = np.linspace(0, num_steps, num_workers + 1).astype(int)
+    chunks = [(replay_path, int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+    with ProcessPoolExecutor(num_workers) as executor:
+        png_frames = [png for chunk in executor.map(_render_chunk, chunks) for png in chunk]
+
+    images = [Image.open(io.BytesIO(png)).convert('RGB') for png in png_frames]
+    images[0].save(gif_path, save_all=True, append_images=images[1:],
+                   duration=int(1000 / fps), loop=0)
+    return gif_path
+
+
+def print_events(replay_path):
+    """Imprime los eventos grabados, igual que durante la simulación."""
+    replay = load_replay(replay_path)
+    for step, drone_id, code in zip(replay['event_steps'], replay['event_drones'],
+                                    replay['event_codes']):
+        print(f"Paso {step}: {describe_event(int(drone_id), EVENT_NAMES[int(code)])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Renderiza una grabación de la simulación de rescate')
+    parser.add_argument('replay', help='Archivo .npz guardado por ReplayRecorder')
+    parser.add_argument('--gif', default='drone_rescue_simulation.gif')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--eventos', action='store_true', help='Imprimir los eventos grabados')
+    args = parser.parse_args()
+
+    if args.eventos:
+        print_events(args.replay)
+    render_gif(args.replay, args.gif, args.workers)
+    print(f"GIF guardado: {args.gif}")
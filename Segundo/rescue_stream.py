@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import random
+import struct
+
+import numpy as np
+
+from Punto2_Lab_4 import (MAP_SIZE, NUM_DRONES, NUM_SURVIVORS, NUM_RESOURCES, NUM_OBSTACLES,
+                          MAX_STEPS, EVENT_CODES, EVENT_NAMES, DisasterMap, Drone,
+                          simulation_step, describe_event, load_scenario)
+
+# Modo servidor: la simulación avanza a una tasa fija de pasos por segundo y en
+# cada paso se envía a todos los clientes conectados solo lo que cambió (celdas,
+# movimientos de drones y eventos) en un formato binario compacto. Un cliente
+# nuevo, o uno que se queda atrás, recibe primero un fotograma completo.
+
+TICK_RATE = 10              # Pasos de simulación por segundo
+CLIENT_QUEUE_SIZE = 64      # Fotogramas pendientes antes de resincronizar a un cliente
+SOCKET_PATH = '/tmp/drone_rescue.sock'
+
+# Tipos de fotograma
+FRAME_KEYFRAME = 0
+FRAME_DELTA = 1
+FRAME_END = 2
+
+# Cabecera: tipo, paso, nº de celdas, nº de movimientos, nº de eventos
+HEADER = struct.Struct('<BIIHH')
+LENGTH = struct.Struct('<I')
+CELL_DTYPE = np.dtype([('r', '<u2'), ('c', '<u2'), ('state', 'u1')])
+MOVE_DTYPE = np.dtype([('id', '<u2'), ('r', '<u2'), ('c', '<u2')])
+EVENT_DTYPE = np.dtype([('id', '<u2'), ('code', 'u1')])
+
+
+def encode_frame(kind, tick, cells, moves, events):
+    """Empaqueta un fotograma como bytes con prefijo de longitud."""
+    payload = b''.join((HEADER.pack(kind, tick, len(cells), len(moves), len(events)),
+                        cells.tobytes(), moves.tobytes(), events.tobytes()))
+    return LENGTH.pack(len(payload)) + payload
+
+
+def decode_frame(payload):
+    """Desempaqueta un fotograma (sin el prefijo de longitud)."""
+    kind, tick, n_cells, n_moves, n_events = HEADER.unpack_from(payload)
+    offset = HEADER.size
+    cells = np.frombuffer(payload, CELL_DTYPE, n_cells, offset)
+    offset += cells.nbytes
+    moves = np.frombuffer(payload, MOVE_DTYPE, n_moves, offset)
+    offset += moves.nbytes
+    events = np.frombuffer(payload, EVENT_DTYPE, n_events, offset)
+    return kind, tick, cells, moves, events
+
+
+def _cells_record(grid, rows, cols):
+    cells = np.empty(len(rows), dtype=CELL_DTYPE)
+    cells['r'], cells['c'], cells['state'] = rows, cols, grid[rows, cols]
+    return cells
+
+
+def _moves_record(drones, ids):
+    moves = np.empty(len(ids), dtype=MOVE_DTYPE)
+    for k, drone_id in enumerate(ids):
+        moves[k] = (drone_id, *drones[drone_id].position)
+    return moves
+
+
+class RescueStreamServer:
+    """Avanza la simulación a ritmo fijo y difunde deltas binarios a los clientes."""
+
+    def __init__(self, disaster_map, drones, tick_rate=TICK_RATE, max_steps=MAX_STEPS):
+        self.disaster_map = disaster_map
+        self.drones = drones
+        self.tick_rate = tick_rate
+        self.max_steps = max_steps
+        self.tick = 0
+        self.clients = set()
+        self.finished = asyncio.Event()
+
+    def keyframe(self, tick=None):
+        # Estado completo: todas las celdas no vacías y todos los drones
+        if tick is None:
+            tick = self.tick
+        grid = self.disaster_map.grid
+        rows, cols = np.nonzero(grid)
+        cells = _cells_record(grid, rows, cols)
+        moves = _moves_record(self.drones, range(len(self.drones)))
+        return encode_frame(FRAME_KEYFRAME, tick, cells, moves, np.empty(0, EVENT_DTYPE))
+
+    def advance(self):
+        # Ejecuta un paso y devuelve el delta frente al estado anterior
+        grid = self.disaster_map.grid
+        previous_grid = grid.copy()
+        previous_positions = [drone.position for drone in self.drones]
+
+        events = simulation_step(self.disaster_map, self.drones, self.tick)
+
+        rows, cols = np.nonzero(grid != previous_grid)
+        cells = _cells_record(grid, rows, cols)
+        moved = [drone.id for drone, old in zip(self.drones, previous_positions)
+                 if drone.position != old]
+        moves = _moves_record(self.drones, moved)
+        event_record = np.array([(drone_id, EVENT_CODES[event]) for drone_id, event in events],
+                                dtype=EVENT_DTYPE)
+        frame = encode_frame(FRAME_DELTA, self.tick, cells, moves, event_record)
+        self.tick += 1
+        return frame
+
+    def broadcast(self, frame):
+        for queue in list(self.clients):
+            if queue.full():
+                # Cliente lento: descartar lo pendiente y resincronizar con un fotograma
+                # completo del mismo paso; el fin de la simulación nunca se descarta
+                while not queue.empty():
+                    queue.get_nowait()
+                kind, tick = HEADER.unpack_from(frame, LENGTH.size)[:2]
+                queue.put_nowait(self.keyframe(tick))
+                if kind == FRAME_END:
+                    queue.put_nowait(frame)
+            else:
+                queue.put_nowait(frame)
+
+    def end_frame(self):
+        return encode_frame(FRAME_END, self.tick, np.empty(0, CELL_DTYPE),
+                            np.empty(0, MOVE_DTYPE), np.empty(0, EVENT_DTYPE))
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        while self.tick < self.max_steps:
+            self.broadcast(self.advance())
+            if np.all(self.disaster_map.covered):
+                break
+            next_tick += period
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+        self.broadcast(self.end_frame())
+        self.finished.set()
+
+    async def handle_client(self, reader, writer):
+        queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+        queue.put_nowait(self.keyframe())
+        if self.finished.is_set():
+            queue.put_nowait(self.end_frame())
+        else:
+            self.clients.add(queue)
+        try:
+            while True:
+                frame = await queue.get()
+                writer.write(frame)
+                await writer.drain()
+                if frame[LENGTH.size] == FRAME_END:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(queue)
+            writer.close()
+
+
+async def serve(socket_path=SOCKET_PATH, port=None, tick_rate=TICK_RATE, seed=None, scenario=None):
+    """Arranca el servidor en un socket Unix (o TCP local si se indica puerto)."""
+    random.seed(seed)
+    if scenario is not None:
+        disaster_map = load_scenario(scenario)
+    else:
+        disaster_map = DisasterMap(MAP_SIZE)
+        disaster_map.add_entities(NUM_SURVIVORS, NUM_RESOURCES, NUM_OBSTACLES)
+    drones = [Drone(i, disaster_map.base_position) for i in range(NUM_DRONES)]
+    server = RescueStreamServer(disaster_map, drones, tick_rate)
+
+    if port is None:
+        listener = await asyncio.start_unix_server(server.handle_client, path=socket_path)
+        print(f"Servidor de rescate escuchando en {socket_path}")
+    else:
+        listener = await asyncio.start_server(server.handle_client, '127.0.0.1', port)
+        print(f"Servidor de rescate escuchando en 127.0.0.1:{port}")
+    async with listener:
+        await server.run()
+        # Esperar a que los clientes conectados reciban el fotograma final
+        for _ in range(50):
+            if not server.clients:
+                break
+            await asyncio.sleep(0.1)
+    print(f"Simulación terminada en el paso {server.tick}")
+
+
+async def read_frames(reader):
+    """Generador asíncrono de fotogramas decodificados desde el servidor."""
+    while True:
+        try:
+            header = await reader.readexactly(LENGTH.size)
+        except asyncio.IncompleteReadError:
+            return
+        (length,) = LENGTH.unpack(header)
+        frame = decode_frame(await reader.readexactly(length))
+        yield frame
+        if frame[0] == FRAME_END:
+            return
+
+
+async def watch(socket_path=SOCKET_PATH, port=None):
+    """Cliente sencillo que reconstruye el mapa y muestra los eventos recibidos."""
+    if port is None:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    else:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    cell_states = {}  # Celdas no vacías: (fila, columna) -> estado
+    positions = {}
+    async for kind, tick, cells, moves, events in read_frames(reader):
+        if kind == FRAME_KEYFRAME:
+            cell_states.clear()
+        for cell in cells:
+            key = (int(cell['r']), int(cell['c']))
+            if cell['state']:
+                cell_states[key] = int(cell['state'])
+            else:
+                cell_states.pop(key, None)
+        positions.update((int(m['id']), (int(m['r']), int(m['c']))) for m in moves)
+        for event in events:
+            print(f"Paso {tick}: {describe_event(int(event['id']), EVENT_NAMES[int(event['code'])])}")
+    writer.close()
+    print(f"Transmisión terminada. Drones seguidos: {len(positions)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Transmisión en vivo de la simulación de rescate')
+    parser.add_argument('modo', choices=['servidor', 'cliente'])
+    parser.add_argument('--socket', default=SOCKET_PATH, help='Ruta del socket Unix')
+    parser.add_argument('--port', type=int, default=None, help='Usar TCP local en este puerto')
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--escenario', default=None, help='Directorio de un escenario guardado')
+    args = parser.parse_args()
+
+    if args.modo == 'servidor':
+        asyncio.run(serve(args.socket, args.port, args.tick_rate, args.seed, args.escenario))
+    else:
+        asyncio.run(watch(args.socket, args.port))
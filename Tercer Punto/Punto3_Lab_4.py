@@ -1,6 +1,10 @@
 import numpy as np
 import matplotlib.pyplot as plt
+import math
 import random
+import heapq
+import itertools
+from collections import Counter, OrderedDict, deque
 from matplotlib.animation import FuncAnimation, PillowWriter
 import matplotlib.patches as mpatches
 from matplotlib.markers import MarkerStyle
@@ -14,6 +18,31 @@ NUM_SCOUT_DRONES = 6  # Aumentado para mejor exploración
 MAX_STEPS = 500
 BASE_POSITION = (4, 4)
 RECHARGE_THRESHOLD = 25
+AREA_ROWS = 2               # Filas de la cuadrícula de áreas
+AREA_COLS = 2               # Columnas de la cuadrícula de áreas
+REBALANCE_INTERVAL = 20     # Pasos entre redistribuciones de obreras entre áreas
+REBALANCE_IMMATURE_WEIGHT = 0.25  # Peso de una flor inmadura frente a una lista en la demanda
+MAX_DRONES_PER_FLOWER = 1   # Drones que pueden reservar a la vez una misma flor lista
+RESERVATION_TIMEOUT = 70    # Pasos antes de que caduque una reserva (cruzar el invernadero)
+SPATIAL_CELL_SIZE = 5       # Lado de las cubetas del índice espacial de flores listas
+CHARGING_PADS = (BASE_POSITION, (GREENHOUSE_SIZE - 5, GREENHOUSE_SIZE - 5))  # Pads de recarga
+PAD_CAPACITY = 3            # Drones que recargan a la vez en cada pad (None = sin límite)
+CHARGE_STEPS = 28           # Pasos aproximados de una recarga completa (25% -> 95% a 2.5 por paso)
+# Obstáculos del invernadero como rectángulos (x_min, x_max, y_min, y_max) inclusivos
+GREENHOUSE_OBSTACLES = (
+    (5, 11, 12, 12), (23, 29, 12, 12), (5, 11, 22, 22), (23, 29, 22, 22),  # Mesas de cultivo
+    (17, 17, 3, 13), (17, 17, 21, 31),                                      # Líneas de riego
+    (13, 13, 28, 28), (21, 21, 6, 6),                                       # Pilares
+)
+FORECAST_WORKERS = True     # Enviar obreras libres a flores que madurarán cuando lleguen
+FORECAST_SLACK = 10         # Pasos que una obrera puede esperar en la flor a que madure
+FORECAST_CANDIDATES = 8     # Flores inmaduras (las más próximas a madurar) que se evalúan
+CELL_CAPACITY = None        # Drones por celda del espacio aéreo (None = sin límite, 1 = uno por celda)
+PATH_CACHE_SIZE = 128       # Campos de distancia (uno por celda destino) que guarda la caché LRU
+VISIT_MEMORY = 5            # Flores recientes que recuerda cada dron (los selectores leen 3-5)
+TRACK_LIFETIME_VISITS = False  # Contar visitas por flor durante toda la simulación
+EVENT_DRIVEN = False        # run() salta los tramos en que toda la flota está parada (ver skip_idle_steps)
+TRIP_RESERVE = 0.0          # Batería que debe sobrar al volver al pad más cercano tras polinizar
 
 # Estados de los drones
 WORKER = 0
@@ -41,28 +70,153 @@ FLOWER_COLORS = {
     FLOWER_POLLINATED: [0.2, 0.8, 0.2]   # Verde - polinizada
 }
 
+class FlowerStore:
+    """Estado de todas las flores como arreglos de NumPy (estructura de arreglos).
+
+    Cada flor es una fila; los objetos Flower son vistas ligeras sobre su fila,
+    de modo que el crecimiento de todas las flores se avanza en una sola pasada.
+    """
+    FIELDS = ('maturity', 'state', 'pollen_level', 'size', 'position', 'area_id', 'pollination_count',
+              'claims')
+    
+    def __init__(self, capacity=64):
+        capacity = max(1, capacity)
+        self.count = 0
+        self.maturity = np.zeros(capacity)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.pollen_level = np.zeros(capacity)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.position = np.zeros((capacity, 2), dtype=np.int32)
+        self.area_id = np.zeros(capacity, dtype=np.int32)
+        self.pollination_count = np.zeros(capacity, dtype=np.int32)
+        self.claims = np.zeros(capacity, dtype=np.int32)  # Drones con reserva sobre la flor
+        self.views = []
+        # Crecimiento natural acumulado: todas las flores inmaduras crecen lo mismo
+        # en cada pasada, así que su orden relativo se puede guardar frente a este valor
+        self.growth_offset = 0.0
+        
+    def _ensure_capacity(self):
+        if self.count < len(self.maturity):
+            return
+        for name in self.FIELDS:
+            array = getattr(self, name)
+            grown = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+            
+    def add(self, view, position, area_id, maturity, state=FLOWER_IMMATURE, pollen_level=1.0,
+            size=120, pollination_count=0, claims=0):
+        """Reserva una fila para la flor `view` y devuelve su índice"""
+        self._ensure_capacity()
+        i = self.count
+        self.maturity[i] = maturity
+        self.state[i] = state
+        self.pollen_level[i] = pollen_level
+        self.size[i] = size
+        self.position[i] = position
+        self.area_id[i] = area_id
+        self.pollination_count[i] = pollination_count
+        self.claims[i] = claims
+        self.views.append(view)
+        self.count += 1
+        return i
+    
+    def remove(self, index):
+        """Libera una fila; la última ocupa su lugar y se reindexa su vista"""
+        last = self.count - 1
+        if index != last:
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                array[index] = array[last]
+            self.views[index] = self.views[last]
+            self.views[index].index = index
+        self.views.pop()
+        self.count -= 1
+        
+    def adopt(self, flower):
+        """Mueve una flor (con todos sus datos) a este almacén"""
+        if flower.store is self:
+            return
+        old_store, old_index = flower.store, flower.index
+        values = {name: getattr(old_store, name)[old_index] for name in self.FIELDS}
+        old_store.remove(old_index)
+        flower.store = self
+        flower.index = self.add(flower, **values)
+        
+    def advance_growth(self, rate=0.003, cap=0.75):
+        """Crecimiento natural y actualización de estado de todas las flores a la vez.
+
+        Equivale a llamar grow_naturally y update_state en cada flor. Devuelve los
+        índices de las flores que cambiaron de estado y su estado anterior; el
+        resto de inmaduras solo avanzó `rate`, que queda reflejado en growth_offset.
+        """
+        n = self.count
+        maturity = self.maturity[:n]
+        state = self.state[:n]
+        growing = state != FLOWER_POLLINATED
+        new_maturity = np.where(growing, np.minimum(cap, maturity + rate), maturity)
+        new_state = np.where(new_maturity < 0.75, FLOWER_IMMATURE,
+                             np.where(state == FLOWER_POLLINATED, FLOWER_POLLINATED, FLOWER_READY))
+        changed = np.flatnonzero(new_state != state)
+        old_states = state[changed].copy()
+        maturity[:] = new_maturity
+        state[:] = new_state
+        self.growth_offset += rate
+        return changed, old_states
+
+# Identificadores estables de flor (el índice en el almacén cambia al quitar flores)
+_flower_ids = itertools.count()
+
+def _store_field(name, cast, store='store'):
+    # Propiedad que lee y escribe la fila del objeto en su almacén de arreglos
+    def getter(self):
+        return cast(getattr(getattr(self, store), name)[self.index])
+    def setter(self, value):
+        getattr(getattr(self, store), name)[self.index] = value
+    return property(getter, setter)
+
 class Flower:
-    def __init__(self, position, area_id):
-        self.position = position
-        self.area_id = area_id
-        self.maturity = random.uniform(0.1, 0.3)
-        self.state = FLOWER_IMMATURE
-        self.pollen_level = 1.0
-        self.pollination_count = 0
-        self.size = 120
-        # Formas diferentes para cada estado
-        self.shape = {
-            FLOWER_IMMATURE: 'h',  # Hexágono para inmaduras
-            FLOWER_READY: '^',     # Triángulo para listas
-            FLOWER_POLLINATED: 'D' # Diamante para polinizadas
-        }
+    # Formas diferentes para cada estado (compartidas por todas las flores)
+    shape = {
+        FLOWER_IMMATURE: 'h',  # Hexágono para inmaduras
+        FLOWER_READY: '^',     # Triángulo para listas
+        FLOWER_POLLINATED: 'D' # Diamante para polinizadas
+    }
+    
+    maturity = _store_field('maturity', float)
+    state = _store_field('state', int)
+    pollen_level = _store_field('pollen_level', float)
+    size = _store_field('size', int)
+    area_id = _store_field('area_id', int)
+    pollination_count = _store_field('pollination_count', int)
+    
+    def __init__(self, position, area_id, store=None):
+        # Sin almacén propio la flor vive en uno de una sola fila hasta que la adopten
+        self.id = next(_flower_ids)
+        self.store = store if store is not None else FlowerStore(1)
+        self.index = self.store.add(self, position, area_id, random.uniform(0.1, 0.3))
+        self.on_change = None  # Se llama con (flor, estado_anterior) al cambiar madurez o estado
         
-    def update_state(self):
-        """Actualiza el estado de la flor basado en su madurez"""
+    @property
+    def position(self):
+        x, y = self.store.position[self.index]
+        return (int(x), int(y))
+        
+    def _notify(self, old_maturity, old_state):
+        if self.on_change is not None and (self.maturity != old_maturity or self.state != old_state):
+            self.on_change(self, old_state)
+        
+    def _refresh_state(self):
         if self.maturity >= 0.75 and self.state != FLOWER_POLLINATED:
             self.state = FLOWER_READY
         elif self.maturity < 0.75:
             self.state = FLOWER_IMMATURE
+        
+    def update_state(self):
+        """Actualiza el estado de la flor basado en su madurez"""
+        old_state = self.state
+        self._refresh_state()
+        self._notify(self.maturity, old_state)
             
     def pollinate(self, amount=0.25):
         """Realiza la polinización de la flor"""
@@ -74,14 +228,21 @@ class Flower:
             if self.maturity >= 0.95:
                 self.state = FLOWER_POLLINATED
                 self.size = 180
+            self._notify(old_maturity, FLOWER_READY)
             return True
         return False
     
     def grow_naturally(self):
         """Crecimiento natural de la flor (sin polinización)"""
         if self.state != FLOWER_POLLINATED:
+            old_maturity, old_state = self.maturity, self.state
             self.maturity = min(0.75, self.maturity + 0.003)
-            self.update_state()
+            self._refresh_state()
+            self._notify(old_maturity, old_state)
+        
+    def steps_to_ready(self, rate=0.003):
+        """Pasos de crecimiento natural que faltan para que la flor inmadura esté lista (estimado)"""
+        return max(1, math.ceil((0.75 - self.maturity) / rate))
         
     def get_priority(self):
         """Calcula la prioridad de la flor para polinización"""
@@ -91,12 +252,440 @@ class Flower:
             return 1.0
         else:
             return self.maturity * 0.7
+    
+    def get_priority_key(self):
+        """Clave de montículo con el mismo orden que get_priority (menor = más prioritaria).
+
+        Para inmaduras se usa la madurez relativa al crecimiento acumulado del
+        almacén, que no cambia con el crecimiento natural uniforme.
+        """
+        if self.state == FLOWER_READY:
+            return (0, 0.0)
+        elif self.state == FLOWER_POLLINATED:
+            return (2, 0.0)
+        return (1, self.store.growth_offset - self.maturity)
+
+class IndexedHeap:
+    """Montículo binario de mínimos con índice elemento -> posición.
+
+    Permite actualizar o quitar un elemento en O(log n). Los empates de clave
+    se resuelven por orden de inserción.
+    """
+    def __init__(self):
+        self.keys = []
+        self.items = []
+        self.index = {}
+        self.counter = 0
+        
+    def __len__(self):
+        return len(self.items)
+    
+    def __contains__(self, item):
+        return item in self.index
+    
+    def push(self, item, key, order=None):
+        """Inserta un elemento con la clave dada (y el orden de desempate, si viene de otro montículo)"""
+        if order is None:
+            order = self.counter
+            self.counter += 1
+        self.keys.append((key, order))
+        self.items.append(item)
+        self.index[item] = len(self.items) - 1
+        self._sift_up(len(self.items) - 1)
+        
+    def update(self, item, key):
+        """Cambia la clave de un elemento conservando su orden de inserción"""
+        pos = self.index[item]
+        old_key = self.keys[pos]
+        self.keys[pos] = (key, old_key[1])
+        if self.keys[pos] < old_key:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+            
+    def remove(self, item):
+        """Quita un elemento del montículo y devuelve su orden de desempate"""
+        pos = self.index.pop(item)
+        order = self.keys[pos][1]
+        last_key, last_item = self.keys.pop(), self.items.pop()
+        if pos < len(self.items):
+            old_key = self.keys[pos]
+            self.keys[pos], self.items[pos] = last_key, last_item
+            self.index[last_item] = pos
+            if last_key < old_key:
+                self._sift_up(pos)
+            else:
+                self._sift_down(pos)
+        return order
+                
+    def peek(self):
+        """Elemento con la menor clave (None si está vacío)"""
+        return self.items[0] if self.items else None
+    
+    def iter_ordered(self):
+        """Recorre los elementos en orden de clave sin modificar el montículo.
+
+        Obtener los k primeros cuesta O(k log k), no hace falta ordenar todo.
+        """
+        if not self.items:
+            return
+        frontier = [(self.keys[0], 0)]
+        while frontier:
+            _, pos = heapq.heappop(frontier)
+            yield self.items[pos]
+            for child in (2 * pos + 1, 2 * pos + 2):
+                if child < len(self.items):
+                    heapq.heappush(frontier, (self.keys[child], child))
+                    
+    def _swap(self, i, j):
+        self.keys[i], self.keys[j] = self.keys[j], self.keys[i]
+        self.items[i], self.items[j] = self.items[j], self.items[i]
+        self.index[self.items[i]] = i
+        self.index[self.items[j]] = j
+        
+    def _sift_up(self, pos):
+        while pos > 0:
+            parent = (pos - 1) // 2
+            if self.keys[pos] >= self.keys[parent]:
+                break
+            self._swap(pos, parent)
+            pos = parent
+            
+    def _sift_down(self, pos):
+        size = len(self.items)
+        while True:
+            smallest = pos
+            for child in (2 * pos + 1, 2 * pos + 2):
+                if child < size and self.keys[child] < self.keys[smallest]:
+                    smallest = child
+            if smallest == pos:
+                break
+            self._swap(pos, smallest)
+            pos = smallest
+
+class RandomAccessSet:
+    """Conjunto con inserción, borrado y muestreo aleatorio en O(1).
+
+    Los elementos viven en una lista y un diccionario guarda su posición; al
+    borrar, el último elemento ocupa el hueco.
+    """
+    def __init__(self):
+        self.items = []
+        self.index = {}
+        
+    def __len__(self):
+        return len(self.items)
+    
+    def __contains__(self, item):
+        return item in self.index
+    
+    def __iter__(self):
+        return iter(self.items)
+    
+    def add(self, item):
+        if item not in self.index:
+            self.index[item] = len(self.items)
+            self.items.append(item)
+            
+    def discard(self, item):
+        pos = self.index.pop(item, None)
+        if pos is None:
+            return
+        last = self.items.pop()
+        if pos < len(self.items):
+            self.items[pos] = last
+            self.index[last] = pos
+
+class SpatialGrid:
+    """Índice espacial por cubetas para buscar la flor más cercana a un dron.
+
+    El invernadero se divide en cubetas de `cell_size` x `cell_size`; la búsqueda
+    recorre anillos de cubetas alrededor del dron y se detiene cuando ningún
+    anillo restante puede tener una flor más cerca (distancia Manhattan, que es
+    lo que tarda el dron en llegar).
+    """
+    def __init__(self, size, cell_size=SPATIAL_CELL_SIZE):
+        self.cell_size = cell_size
+        self.num_buckets = (size + cell_size - 1) // cell_size
+        self.buckets = {}  # (bx, by) -> flores (dict como conjunto ordenado)
+        
+    def _bucket(self, position):
+        return (position[0] // self.cell_size, position[1] // self.cell_size)
+    
+    def add(self, flower):
+        self.buckets.setdefault(self._bucket(flower.position), {})[flower] = None
+        
+    def discard(self, flower):
+        key = self._bucket(flower.position)
+        bucket = self.buckets.get(key)
+        if bucket is not None:
+            bucket.pop(flower, None)
+            if not bucket:
+                del self.buckets[key]
+                
+    def nearest(self, position, accept=None, bounds=None):
+        """Flor más cercana a `position` que cumpla `accept`, dentro de `bounds` si se indica"""
+        x, y = position
+        bx, by = self._bucket(position)
+        lo_x, hi_x, lo_y, hi_y = 0, self.num_buckets - 1, 0, self.num_buckets - 1
+        if bounds is not None:
+            x_min, x_max, y_min, y_max = bounds
+            lo_x, hi_x = max(lo_x, x_min // self.cell_size), min(hi_x, x_max // self.cell_size)
+            lo_y, hi_y = max(lo_y, y_min // self.cell_size), min(hi_y, y_max // self.cell_size)
+        max_ring = max(bx - lo_x, hi_x - bx, by - lo_y, hi_y - by)
+        best, best_distance = None, None
+        for ring in range(max_ring + 1):
+            # Ninguna flor de este anillo está a menos de (ring - 1) * cell_size + 1
+            if best is not None and best_distance <= (ring - 1) * self.cell_size + 1:
+                break
+            for i in range(max(lo_x, bx - ring), min(hi_x, bx + ring) + 1):
+                step = 1 if abs(i - bx) == ring else 2 * ring
+                for j in range(by - ring, by + ring + 1, max(1, step)):
+                    if j < lo_y or j > hi_y:
+                        continue
+                    for flower in self.buckets.get((i, j), ()):
+                        fx, fy = flower.position
+                        distance = abs(fx - x) + abs(fy - y)
+                        if (best is None or distance < best_distance) and (accept is None or accept(flower)):
+                            best, best_distance = flower, distance
+        return best
+
+UNREACHABLE = np.iinfo(np.int32).max  # Distancia de las celdas sin camino al destino
+
+class PathPlanner:
+    """Rutas alrededor de los obstáculos con campos de flujo y una caché LRU.
+
+    Para cada celda destino se calcula por BFS la distancia de todas las celdas
+    libres hasta ella; cualquier dron que vaya a ese destino, salga de donde
+    salga, baja por ese campo. Los campos se guardan por destino en una caché
+    LRU que se vacía al cambiar los obstáculos. Además, si el rectángulo entre
+    el dron y su destino no tiene obstáculos (consulta O(1) con una tabla de
+    sumas acumuladas) el paso directo ya es óptimo y no se consulta ningún campo.
+    """
+    def __init__(self, size, obstacles=GREENHOUSE_OBSTACLES, cache_size=PATH_CACHE_SIZE):
+        self.size = size
+        self.blocked = np.zeros((size, size), dtype=bool)
+        self.blocked_sum = np.zeros((size + 1, size + 1), dtype=np.int32)  # Sumas acumuladas
+        self.has_obstacles = False
+        self.cache_size = cache_size
+        self.fields = OrderedDict()  # Celda destino -> campo de distancias
+        self.hits = 0
+        self.misses = 0
+        for bounds in obstacles:
+            self.set_blocked(bounds)
+            
+    def set_blocked(self, bounds, blocked=True):
+        """Pone o quita un obstáculo rectangular y descarta las rutas guardadas"""
+        x_min, x_max, y_min, y_max = bounds
+        self.blocked[max(0, x_min):x_max + 1, max(0, y_min):y_max + 1] = blocked
+        self.blocked_sum[1:, 1:] = self.blocked.cumsum(axis=0).cumsum(axis=1)
+        self.has_obstacles = bool(self.blocked.any())
+        self.fields.clear()
+        
+    def box_blocked(self, start, target):
+        """Si hay algún obstáculo en el rectángulo entre cada par de celdas"""
+        start, target = np.atleast_2d(start), np.atleast_2d(target)
+        x0, x1 = np.minimum(start[:, 0], target[:, 0]), np.maximum(start[:, 0], target[:, 0]) + 1
+        y0, y1 = np.minimum(start[:, 1], target[:, 1]), np.maximum(start[:, 1], target[:, 1]) + 1
+        total = self.blocked_sum
+        return (total[x1, y1] - total[x0, y1] - total[x1, y0] + total[x0, y0]) > 0
+        
+    def is_free(self, position):
+        x, y = position
+        return not self.blocked[x, y]
+    
+    def blocked_runs(self):
+        """Obstáculos actuales como tramos (x, y_min, y_max) de celdas seguidas en cada columna"""
+        padded = np.zeros((self.size, self.size + 2), dtype=np.int8)
+        padded[:, 1:-1] = self.blocked
+        edges = np.diff(padded, axis=1)
+        starts, ends = np.argwhere(edges == 1), np.argwhere(edges == -1)
+        return [(int(x), int(y0), int(y1) - 1) for (x, y0), (_, y1) in zip(starts, ends)]
+    
+    def distance_field(self, target):
+        """Distancia en pasos de cada celda a `target` (UNREACHABLE si no hay camino)"""
+        key = (int(target[0]), int(target[1]))
+        field = self.fields.get(key)
+        if field is not None:
+            self.fields.move_to_end(key)
+            self.hits += 1
+            return field
+        self.misses += 1
+        field = self._flood(key)
+        self.fields[key] = field
+        if len(self.fields) > self.cache_size:
+            self.fields.popitem(last=False)
+        return field
+    
+    def _flood(self, target):
+        # BFS por frentes de onda sobre toda la cuadrícula (4 vecinos)
+        field = np.full((self.size, self.size), UNREACHABLE, dtype=np.int32)
+        free = ~self.blocked
+        frontier = np.zeros_like(free)
+        frontier[target] = True
+        distance = 0
+        while frontier.any():
+            field[frontier] = distance
+            grown = np.zeros_like(frontier)
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            frontier = grown & free & (field == UNREACHABLE)
+            distance += 1
+        return field
+    
+    def distance(self, start, target):
+        """Pasos de `start` a `target` rodeando obstáculos (Manhattan si no hay)"""
+        if not self.has_obstacles or not self.box_blocked(start, target)[0]:
+            return int(abs(start[0] - target[0]) + abs(start[1] - target[1]))
+        return int(self.distance_field(target)[start[0], start[1]])
+    
+    def route(self, pos, proposed, targets, planned):
+        """Corrige un paso de la flota: de `pos` a `proposed` hacia `targets`.
+
+        Nadie entra en un obstáculo. Los drones con `planned` y obstáculos de
+        por medio toman el paso directo si los acerca por el campo de flujo de
+        su destino y, si no, el vecino que más los acerca; sin vecino mejor se
+        quedan quietos.
+        """
+        if not self.has_obstacles:
+            return proposed
+        new_pos = proposed.copy()
+        into_obstacle = self.blocked[new_pos[:, 0], new_pos[:, 1]]
+        new_pos[into_obstacle] = pos[into_obstacle]
+        
+        rows = np.flatnonzero(planned)
+        rows = rows[self.box_blocked(pos[rows], targets[rows])] if len(rows) else rows
+        if not len(rows):
+            return new_pos
+        neighbours = np.clip(pos[rows][:, None, :] + DIRECTIONS[:4], 0, self.size - 1)
+        here = np.empty(len(rows), dtype=np.int64)
+        there = np.empty(len(rows), dtype=np.int64)
+        around = np.empty((len(rows), 4), dtype=np.int64)
+        destinations, group = np.unique(targets[rows], axis=0, return_inverse=True)
+        group = group.reshape(-1)
+        for k, target in enumerate(destinations):
+            field = self.distance_field(target)
+            members = np.flatnonzero(group == k)
+            p, q, nb = pos[rows[members]], proposed[rows[members]], neighbours[members]
+            here[members] = field[p[:, 0], p[:, 1]]
+            there[members] = field[q[:, 0], q[:, 1]]
+            around[members] = field[nb[..., 0], nb[..., 1]]
+        
+        detour = (there >= here) & (here < UNREACHABLE)
+        best = np.argmin(around, axis=1)
+        improves = around[np.arange(len(rows)), best] < here
+        turn = detour & improves
+        new_pos[rows[turn]] = neighbours[turn, best[turn]]
+        new_pos[rows[detour & ~improves]] = pos[rows[detour & ~improves]]
+        return new_pos
+
+class AirspaceTable:
+    """Reserva de la celda del siguiente paso con un límite de drones por celda.
+
+    Los drones que no se mueven conservan su celda; los que se mueven piden la
+    siguiente y todos los conflictos se resuelven a la vez ordenando las
+    peticiones por celda y prioridad (menos batería primero). Quien pierde se
+    queda quieto y su celda cuenta como ocupada, lo que puede rechazar en
+    cadena a quien iba a entrar en ella; esos rechazos se propagan por el
+    grafo origen -> destino rechazando cada dron como mucho una vez, así que
+    el paso completo es O(N log N) aunque haya colas largas. Dos drones no
+    pueden intercambiar sus celdas. Los pads de recarga no tienen límite.
+    """
+    def __init__(self, size, capacity=CELL_CAPACITY, exempt=CHARGING_PADS):
+        self.size = size
+        self.capacity = capacity
+        self.exempt = np.zeros(size * size, dtype=bool)
+        for x, y in exempt:
+            if 0 <= x < size and 0 <= y < size:  # Un pad fuera del invernadero no cuenta
+                self.exempt[x * size + y] = True
+        self.requests = 0  # Movimientos pedidos
+        self.denied = 0    # Movimientos rechazados por celda llena o intercambio
+        
+    def _cells(self, positions):
+        return positions[:, 0] * self.size + positions[:, 1]
+    
+    def resolve(self, fleet, idx, pos, proposed):
+        """Posiciones finales de los drones `idx` que van de `pos` a `proposed`"""
+        idx = np.asarray(idx, dtype=np.intp)
+        new_pos = proposed.copy()
+        moving = np.any(proposed != pos, axis=1)
+        if self.capacity is None or not moving.any():
+            return new_pos
+        num_cells = self.size * self.size
+        others = np.ones(fleet.count, dtype=bool)
+        others[idx] = False
+        occupied = (np.bincount(self._cells(fleet.position[:fleet.count][others]), minlength=num_cells) +
+                    np.bincount(self._cells(pos[~moving]), minlength=num_cells))
+        self.requests += int(moving.sum())
+        
+        movers = np.flatnonzero(moving)
+        drones = idx[movers]
+        src = self._cells(pos[movers]).astype(np.int64)
+        dst = self._cells(proposed[movers]).astype(np.int64)
+        
+        # Puesto de cada petición dentro de su celda destino según prioridad
+        order = np.lexsort((drones, fleet.battery[drones], dst))
+        sorted_dst = dst[order]
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order)) - np.searchsorted(sorted_dst, sorted_dst)
+        free = np.where(self.exempt[dst], len(movers), self.capacity - occupied[dst])
+        rejected = rank >= free
+        
+        # Intercambios: entre dos celdas que se cruzan se quedan quietos todos
+        # los drones del sentido cuyo dron más prioritario pierde frente al otro
+        key = src * num_cells + dst
+        battery = fleet.battery[drones]
+        by_key = np.lexsort((drones, battery, key))
+        keys, first = np.unique(key[by_key], return_index=True)
+        best = by_key[first]  # Dron más prioritario de cada sentido
+        reverse = dst * num_cells + src
+        slot = np.minimum(np.searchsorted(keys, reverse), len(keys) - 1)
+        swapped = keys[slot] == reverse
+        mine, theirs = best[np.searchsorted(keys, key)], best[slot]
+        loses = (battery[mine] > battery[theirs]) | ((battery[mine] == battery[theirs]) &
+                                                     (drones[mine] > drones[theirs]))
+        rejected |= swapped & loses
+        
+        # Rechazos en cadena: cada celda conserva sus peticiones aceptadas en
+        # orden de prioridad y, cuando un rechazo ocupa la celda, suelta las
+        # últimas; cada dron soltado ocupa a su vez su celda de origen
+        accepted = order[~rejected[order]]
+        cells, starts, counts = np.unique(dst[accepted], return_index=True, return_counts=True)
+        start = dict(zip(cells.tolist(), starts.tolist()))
+        count = dict(zip(cells.tolist(), counts.tolist()))
+        np.add.at(occupied, src[rejected], 1)
+        pending = src[rejected].tolist()
+        while pending:
+            cell = pending.pop()
+            if cell not in count or self.exempt[cell]:
+                continue
+            keep = max(0, self.capacity - int(occupied[cell]))
+            while count[cell] > keep:
+                count[cell] -= 1
+                k = accepted[start[cell] + count[cell]]
+                rejected[k] = True
+                occupied[src[k]] += 1
+                pending.append(int(src[k]))
+        
+        moving[movers[rejected]] = False
+        self.denied += int(rejected.sum())
+        new_pos[~moving] = pos[~moving]
+        return new_pos
 
 class Area:
     def __init__(self, area_id, bounds):
         self.area_id = area_id
         self.bounds = bounds
         self.flowers = []
+        self.priority_heap = IndexedHeap()  # Flores no listas por prioridad descendente
+        self.ready_heap = IndexedHeap()     # Flores listas
+        self.arrivals = itertools.count()   # Orden de llegada al área (desempate en ambos montículos)
+        self.forecast_heap = IndexedHeap()  # Inmaduras por tiempo hasta estar listas
+        self.ready_count = 0      # Flores listas en el área
+        self.immature_count = 0   # Flores inmaduras en el área
+        self.workers = []         # Índices de las obreras asignadas al área
         self.observer_position = self.calculate_center()
         
     def calculate_center(self):
@@ -104,765 +693,1575 @@ class Area:
         x_min, x_max, y_min, y_max = self.bounds
         return ((x_min + x_max) // 2, (y_min + y_max) // 2)
     
+    def _count_state(self, state, sign):
+        if state == FLOWER_READY:
+            self.ready_count += sign
+        elif state == FLOWER_IMMATURE:
+            self.immature_count += sign
+    
     def add_flower(self, flower):
         """Añade una flor al área"""
         self.flowers.append(flower)
+        self._heap_for(flower.state).push(flower, flower.get_priority_key(), next(self.arrivals))
+        if flower.state == FLOWER_IMMATURE:
+            self.forecast_heap.push(flower, flower.get_priority_key())
+        self._count_state(flower.state, 1)
+    
+    def remove_flower(self, flower):
+        """Quita una flor del área"""
+        self.flowers.remove(flower)
+        self._heap_for(flower.state).remove(flower)
+        if flower in self.forecast_heap:
+            self.forecast_heap.remove(flower)
+        self._count_state(flower.state, -1)
+    
+    def _heap_for(self, state):
+        return self.ready_heap if state == FLOWER_READY else self.priority_heap
+    
+    def update_flower(self, flower, old_state=None):
+        """Reubica la flor en el montículo tras un cambio de madurez o estado"""
+        old_heap = self._heap_for(flower.state if old_state is None else old_state)
+        heap = self._heap_for(flower.state)
+        if heap is old_heap:
+            heap.update(flower, flower.get_priority_key())
+        else:
+            # Conserva su orden de llegada al área
+            heap.push(flower, flower.get_priority_key(), old_heap.remove(flower))
+        if flower.state != FLOWER_IMMATURE and flower in self.forecast_heap:
+            self.forecast_heap.remove(flower)
+        if old_state is not None and old_state != flower.state:
+            self._count_state(old_state, -1)
+            self._count_state(flower.state, 1)
+    
+    def demand(self):
+        """Trabajo pendiente del área: flores listas y, con menos peso, inmaduras"""
+        return self.ready_count + REBALANCE_IMMATURE_WEIGHT * self.immature_count
+    
+    def iter_flowers_by_priority(self):
+        """Recorre las flores del área de mayor a menor prioridad, bajo demanda"""
+        return itertools.chain(self.ready_heap.iter_ordered(), self.priority_heap.iter_ordered())
+    
+    def iter_unready_by_priority(self):
+        """Como iter_flowers_by_priority pero sin pasar por las flores listas"""
+        return self.priority_heap.iter_ordered()
+    
+    def iter_forecast(self):
+        """Recorre las flores inmaduras del área de la que antes madura a la que más tarda"""
+        return self.forecast_heap.iter_ordered()
     
     def get_flowers_by_priority(self):
         """Obtiene las flores del área ordenadas por prioridad"""
-        return sorted(self.flowers, key=lambda f: f.get_priority(), reverse=True)
+        return list(self.iter_flowers_by_priority())
+
+# Movimientos en 8 direcciones (exploradoras)
+DIRECTIONS = np.array([(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)])
+
+class DroneFleet:
+    """Estado de toda la flota como arreglos de NumPy.
+
+    Movimiento, consumo y recarga se aplican a un conjunto de índices en una sola
+    pasada; los objetos Drone son vistas sobre su fila y usan los mismos métodos
+    con un único índice. La energía total de la flota se acumula al consumir.
+    """
+    FIELDS = ('position', 'type', 'area_id', 'battery', 'battery_drain_rate', 'state', 'target',
+              'energy_used', 'pollination_count', 'recharge_time', 'stuck_count', 'claim', 'claim_expiry',
+              'pad', 'dirty')
+    
+    def __init__(self, flower_store=None, size=GREENHOUSE_SIZE, capacity=32):
+        capacity = max(1, capacity)
+        self.flower_store = flower_store  # Almacén al que apuntan los índices de `target`
+        self.size = size
+        self.count = 0
+        self.position = np.zeros((capacity, 2), dtype=np.int32)
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.area_id = np.full(capacity, -1, dtype=np.int32)
+        self.battery = np.zeros(capacity)
+        self.battery_drain_rate = np.zeros(capacity)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.target = np.full(capacity, -1, dtype=np.int32)  # Índice de flor, -1 sin objetivo
+        self.energy_used = np.zeros(capacity)
+        self.pollination_count = np.zeros(capacity, dtype=np.int32)
+        self.recharge_time = np.zeros(capacity, dtype=np.int32)
+        self.stuck_count = np.zeros(capacity, dtype=np.int32)
+        self.claim = np.full(capacity, -1, dtype=np.int32)  # Flor reservada, -1 sin reserva
+        self.claim_expiry = np.zeros(capacity, dtype=np.int32)
+        self.pad = np.full(capacity, -1, dtype=np.int32)  # Pad de recarga asignado, -1 sin pad
+        self.dirty = np.zeros(capacity, dtype=bool)  # Posición o estado cambió desde el último dibujo
+        self.views = []
+        self.planner = None  # PathPlanner para rodear obstáculos (None = sin obstáculos)
+        self.airspace = None  # AirspaceTable para limitar drones por celda (None = sin límite)
+        self.total_energy = 0.0
+        # Generador propio sembrado desde `random` para que random.seed siga fijando la simulación
+        self.rng = np.random.default_rng(random.getrandbits(32))
+        
+    def add(self, view, position, drone_type, area_id, drain_rate):
+        """Reserva una fila para el dron `view` con batería llena y devuelve su índice"""
+        if self.count == len(self.battery):
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                grown = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+                grown[:len(array)] = array
+                setattr(self, name, grown)
+            self.area_id[self.count:] = -1
+            self.target[self.count:] = -1
+            self.claim[self.count:] = -1
+            self.pad[self.count:] = -1
+        i = self.count
+        self.position[i] = position
+        self.type[i] = drone_type
+        self.area_id[i] = -1 if area_id is None else area_id
+        self.battery[i] = 100.0
+        self.battery_drain_rate[i] = drain_rate
+        self.state[i] = drone_type
+        self.target[i] = -1
+        self.claim[i] = -1
+        self.pad[i] = -1
+        self.dirty[i] = True
+        self.views.append(view)
+        self.count += 1
+        return i
+    
+    def remove(self, index):
+        """Libera una fila; la última ocupa su lugar y se reindexa su vista"""
+        last = self.count - 1
+        if index != last:
+            for name in self.FIELDS:
+                array = getattr(self, name)
+                array[index] = array[last]
+            self.views[index] = self.views[last]
+            self.views[index].index = index
+            self.dirty[index] = True
+        self.views.pop()
+        self.count -= 1
+    
+    def target_positions(self, idx):
+        """Posiciones de las flores objetivo de los drones `idx` (todos con objetivo)"""
+        return self.flower_store.position[self.target[idx]]
     
-    def get_ready_flowers(self):
-        """Obtiene las flores listas para polinizar en esta área"""
-        return [f for f in self.flowers if f.state == FLOWER_READY]
+    def move_towards(self, idx, targets):
+        """Avanza un paso a los drones `idx` hacia `targets`; devuelve quién llegó"""
+        idx = np.asarray(idx, dtype=np.intp)
+        targets = np.asarray(targets).reshape(-1, 2)
+        pos = self.position[idx]
+        moving = np.any(pos != targets, axis=1)
+        idx, pos, targets = idx[moving], pos[moving], targets[moving]
+        
+        # Movimiento directo: un paso en el eje con mayor distancia
+        delta = targets - pos
+        horizontal = np.abs(delta[:, 0]) > np.abs(delta[:, 1])
+        step = np.zeros_like(pos)
+        step[horizontal, 0] = np.sign(delta[horizontal, 0])
+        step[~horizontal, 1] = np.sign(delta[~horizontal, 1])
+        # Movimiento más exploratorio para exploradoras
+        wander = (self.type[idx] == SCOUT) & (self.rng.random(len(idx)) < 0.4)
+        step[wander] = DIRECTIONS[self.rng.integers(len(DIRECTIONS), size=wander.sum())]
+        
+        # Asegurar que no se sale del invernadero y rodear los obstáculos
+        new_pos = np.clip(pos + step, 0, self.size - 1)
+        if self.planner is not None:
+            new_pos = self.planner.route(pos, new_pos, targets, ~wander)
+        if self.airspace is not None:
+            new_pos = self.airspace.resolve(self, idx, pos, new_pos)
+        stuck = np.all(new_pos == pos, axis=1)
+        self.stuck_count[idx] = np.where(stuck, self.stuck_count[idx] + 1, 0)
+        self.position[idx] = new_pos
+        self.dirty[idx] = True
+        self.consume_energy(idx, self.battery_drain_rate[idx])
+        
+        # Si está atascado por mucho tiempo, cambiar objetivo
+        lost = idx[self.stuck_count[idx] > 10]
+        self.target[lost] = -1
+        self.stuck_count[lost] = 0
+        
+        arrived = ~moving
+        arrived[moving] = np.all(new_pos == targets, axis=1)
+        return arrived
+    
+    def random_walk(self, idx, probability=0.7, drain_factor=0.5):
+        """Paso aleatorio en 8 direcciones para drones sin objetivo"""
+        idx = np.asarray(idx, dtype=np.intp)
+        idx = idx[self.rng.random(len(idx)) < probability]
+        step = DIRECTIONS[self.rng.integers(len(DIRECTIONS), size=len(idx))]
+        new_pos = np.clip(self.position[idx] + step, 0, self.size - 1)
+        if self.planner is not None:
+            new_pos = self.planner.route(self.position[idx], new_pos, None, np.zeros(len(idx), bool))
+        if self.airspace is not None:
+            new_pos = self.airspace.resolve(self, idx, self.position[idx], new_pos)
+        self.position[idx] = new_pos
+        self.dirty[idx] = True
+        self.consume_energy(idx, self.battery_drain_rate[idx] * drain_factor)
+        
+    def consume_energy(self, idx, amounts):
+        """Consume energía y pasa a recarga a quien quede con batería baja"""
+        amounts = np.broadcast_to(np.asarray(amounts, dtype=float), np.shape(idx))
+        self.battery[idx] = np.maximum(0, self.battery[idx] - amounts)
+        self.energy_used[idx] += amounts
+        self.total_energy += float(np.sum(amounts))
+        self.update_state(idx)
+        
+    def recharge(self, idx, recharge_rate=2.5):
+        """Recarga la batería; devuelve qué drones quedaron cargados y vuelven a su rol"""
+        self.battery[idx] = np.minimum(100, self.battery[idx] + recharge_rate)
+        self.recharge_time[idx] += 1
+        full = self.battery[idx] >= 95
+        done = np.asarray(idx)[full]
+        self.state[done] = self.type[done]
+        self.recharge_time[done] = 0
+        self.dirty[done] = True
+        return full
+    
+    def update_state(self, idx=None):
+        """Priorizar recarga si la batería es baja"""
+        if idx is None:
+            idx = np.arange(self.count)
+        low = np.asarray(idx)[(self.battery[idx] <= RECHARGE_THRESHOLD) & (self.state[idx] != RECHARGING)]
+        self.state[low] = RECHARGING
+        self.target[low] = -1
+        self.dirty[low] = True
+    
+    def drain_dirty(self):
+        """Índices de los drones que cambiaron desde la última llamada"""
+        changed = np.flatnonzero(self.dirty[:self.count])
+        self.dirty[changed] = False
+        return changed
+
+class RecentVisits:
+    """Memoria acotada de flores visitadas por un dron.
+
+    Un búfer circular guarda las últimas `capacity` flores y un conjunto paralelo
+    permite comprobar pertenencia en O(1); al llenarse se olvida la más antigua.
+    Opcionalmente cuenta las visitas de toda la simulación por id de flor.
+    """
+    def __init__(self, capacity=VISIT_MEMORY, track_lifetime=TRACK_LIFETIME_VISITS):
+        self.buffer = deque(maxlen=capacity)
+        self.members = set()
+        self.total_visits = 0
+        self.lifetime = Counter() if track_lifetime else None
+        
+    def __contains__(self, flower):
+        return flower in self.members
+    
+    def __len__(self):
+        return len(self.buffer)
+    
+    def __iter__(self):
+        return iter(self.buffer)
+    
+    def add(self, flower):
+        """Registra una visita; si la flor ya está entre las recientes no se repite"""
+        self.total_visits += 1
+        if self.lifetime is not None:
+            self.lifetime[flower.id] += 1
+        if flower in self.members:
+            return
+        if len(self.buffer) == self.buffer.maxlen:
+            self.members.discard(self.buffer[0])
+        self.buffer.append(flower)
+        self.members.add(flower)
+        
+    def recent(self, count):
+        """Las últimas `count` flores visitadas, de la más antigua a la más reciente"""
+        return list(itertools.islice(self.buffer, max(0, len(self.buffer) - count), None))
 
 class Drone:
-    def __init__(self, drone_id, position, drone_type, area_id=None):
+    area_id = property(lambda self: None if self.fleet.area_id[self.index] < 0
+                       else int(self.fleet.area_id[self.index]))
+    type = _store_field('type', int, 'fleet')
+    battery = _store_field('battery', float, 'fleet')
+    battery_drain_rate = _store_field('battery_drain_rate', float, 'fleet')
+    energy_used = _store_field('energy_used', float, 'fleet')
+    pollination_count = _store_field('pollination_count', int, 'fleet')
+    recharge_time = _store_field('recharge_time', int, 'fleet')
+    stuck_count = _store_field('stuck_count', int, 'fleet')  # Contador para evitar que se atasquen
+    
+    def __init__(self, drone_id, position, drone_type, area_id=None, fleet=None, drain_rate=None):
         self.id = drone_id
-        self.position = position
-        self.type = drone_type
-        self.area_id = area_id
-        self.battery = 100.0
-        self.target_flower = None
-        self.visited_flowers = []
-        self.pollination_count = 0
-        self.energy_used = 0
-        self.state = drone_type
-        self.recharge_time = 0
+        self.fleet = fleet if fleet is not None else DroneFleet(capacity=1)
+        if drain_rate is None:
+            drain_rate = random.uniform(0.4, 0.7)
+        self.index = self.fleet.add(self, position, drone_type, area_id, drain_rate)
+        self.visited_flowers = RecentVisits()
         self.size = 100
-        self.battery_drain_rate = random.uniform(0.4, 0.7)
-        self.stuck_count = 0  # Contador para evitar que se atasquen
+        
+    @property
+    def position(self):
+        x, y = self.fleet.position[self.index]
+        return (int(x), int(y))
+    
+    @position.setter
+    def position(self, value):
+        self.fleet.position[self.index] = value
+        self.fleet.dirty[self.index] = True
+        
+    @property
+    def state(self):
+        return int(self.fleet.state[self.index])
+    
+    @state.setter
+    def state(self, value):
+        self.fleet.state[self.index] = value
+        self.fleet.dirty[self.index] = True
+        
+    @property
+    def target_flower(self):
+        target = self.fleet.target[self.index]
+        return None if target < 0 else self.fleet.flower_store.views[target]
+    
+    @target_flower.setter
+    def target_flower(self, flower):
+        if flower is None:
+            self.fleet.target[self.index] = -1
+            return
+        if self.fleet.flower_store is None:
+            self.fleet.flower_store = flower.store
+        elif flower.store is not self.fleet.flower_store:
+            raise ValueError("La flor objetivo no pertenece al almacén de flores de la flota")
+        self.fleet.target[self.index] = flower.index
         
     def move_towards(self, target_pos):
         """Mueve el dron hacia la posición objetivo"""
-        if self.position == target_pos:
-            return True
-            
-        current_x, current_y = self.position
-        target_x, target_y = target_pos
-        
-        # Movimiento más inteligente para exploradoras
-        if self.type == SCOUT and random.random() < 0.4:
-            # Movimiento más exploratorio para exploradoras
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            dx, dy = random.choice(directions)
-            new_x = current_x + dx
-            new_y = current_y + dy
-        else:
-            # Movimiento directo hacia el objetivo
-            if abs(target_x - current_x) > abs(target_y - current_y):
-                new_x = current_x + (1 if target_x > current_x else -1)
-                new_y = current_y
-            else:
-                new_x = current_x
-                new_y = current_y + (1 if target_y > current_y else -1)
-            
-        # Asegurar que no se sale del invernadero
-        new_x = max(0, min(GREENHOUSE_SIZE-1, new_x))
-        new_y = max(0, min(GREENHOUSE_SIZE-1, new_y))
-            
-        # Verificar si se movió
-        if (new_x, new_y) == self.position:
-            self.stuck_count += 1
-        else:
-            self.stuck_count = 0
-            
-        self.position = (new_x, new_y)
-        self.consume_energy(self.battery_drain_rate)
-        
-        # Si está atascado por mucho tiempo, cambiar objetivo
-        if self.stuck_count > 10:
-            self.target_flower = None
-            self.stuck_count = 0
-            
-        return self.position == target_pos
+        return bool(self.fleet.move_towards([self.index], [target_pos])[0])
         
     def consume_energy(self, amount):
         """Consume energía del dron"""
-        self.battery = max(0, self.battery - amount)
-        self.energy_used += amount
-        
-        # Priorizar recarga si la batería es baja
-        if self.battery <= RECHARGE_THRESHOLD and self.state != RECHARGING:
-            self.state = RECHARGING
-            self.target_flower = None
+        self.fleet.consume_energy([self.index], amount)
         
     def recharge(self):
         """Recarga la batería del dron"""
-        recharge_rate = 2.5
-        self.battery = min(100, self.battery + recharge_rate)
-        self.recharge_time += 1
-        
-        if self.battery >= 95:
-            self.state = self.type
-            self.recharge_time = 0
-            return True
-        return False
+        return bool(self.fleet.recharge([self.index])[0])
         
     def update_state(self):
         """Actualiza el estado del dron basado en la batería"""
-        if self.battery <= RECHARGE_THRESHOLD and self.state != RECHARGING:
-            self.state = RECHARGING
-            self.target_flower = None
+        self.fleet.update_state([self.index])
         return self.state
 
+class ReservationTable:
+    """Reservas de flores listas para que no las persigan varios drones a la vez.
+
+    Cada flor lista admite como máximo `limit` reservas. Una reserva se libera
+    sola cuando el dron deja de tener esa flor como objetivo (llegó, se quedó
+    sin batería o se atascó) o cuando pasan `timeout` pasos; en ese caso el
+    dron también pierde el objetivo y vuelve a elegir.
+    """
+    def __init__(self, flower_store, fleet, limit=MAX_DRONES_PER_FLOWER, timeout=RESERVATION_TIMEOUT):
+        self.flower_store = flower_store
+        self.fleet = fleet
+        self.limit = limit
+        self.timeout = timeout
+        self.on_change = None  # Se llama con (índice de flor, disponible) al llenarse o liberarse
+        
+    def is_available(self, flower):
+        """Indica si la flor admite otra reserva"""
+        return self.flower_store.claims[flower.index] < self.limit
+    
+    def claim(self, drone, flower, step):
+        """Reserva la flor para el dron hasta el paso step + timeout"""
+        self.release([drone.index])
+        self.flower_store.claims[flower.index] += 1
+        if self.on_change is not None and self.flower_store.claims[flower.index] == self.limit:
+            self.on_change(flower.index, False)
+        self.fleet.claim[drone.index] = flower.index
+        self.fleet.claim_expiry[drone.index] = step + self.timeout
+        
+    def release(self, idx):
+        """Libera las reservas de los drones `idx` y las devuelve a sus flores"""
+        idx = np.asarray(idx, dtype=np.intp)
+        idx = idx[self.fleet.claim[idx] >= 0]
+        flowers = self.fleet.claim[idx]
+        claims = self.flower_store.claims
+        full = flowers[claims[flowers] >= self.limit]
+        np.subtract.at(claims, flowers, 1)
+        self.fleet.claim[idx] = -1
+        if self.on_change is not None:
+            for index in np.unique(full[claims[full] < self.limit]):
+                self.on_change(int(index), True)
+        
+    def release_flower(self, index):
+        """Libera todas las reservas sobre la flor de índice `index`"""
+        n = self.fleet.count
+        self.release(np.flatnonzero(self.fleet.claim[:n] == index))
+        
+    def sync(self, step):
+        """Libera las reservas caducadas o de drones que cambiaron de objetivo"""
+        n = self.fleet.count
+        claim = self.fleet.claim[:n]
+        target = self.fleet.target[:n]
+        held = claim >= 0
+        expired = held & (self.fleet.claim_expiry[:n] <= step)
+        target[expired & (target == claim)] = -1
+        self.release(np.flatnonzero(held & (target != claim)))
+
+class ChargingScheduler:
+    """Pads de recarga con capacidad limitada y una cola FIFO por pad.
+
+    Al pasar a recarga, cada dron se asigna al pad que minimiza la distancia más
+    la espera estimada por la cola; al llegar hace fila y solo `capacity` drones
+    recargan a la vez en cada pad. Así las recargas se escalonan en lugar de
+    sacar de servicio a media flota a la vez.
+    """
+    def __init__(self, fleet, pads=CHARGING_PADS, capacity=PAD_CAPACITY):
+        self.fleet = fleet
+        self.pads = np.array(pads, dtype=np.int32).reshape(-1, 2)
+        self.capacity = capacity
+        self.charging = [{} for _ in range(len(self.pads))]  # Drones recargando (conjunto ordenado)
+        self.queues = [deque() for _ in range(len(self.pads))]
+        self.docked = set()  # Drones en un pad, en cola o recargando
+        
+    def pad_distances(self, position):
+        """Distancia Manhattan desde una posición a cada pad"""
+        return np.abs(self.pads - np.asarray(position)).sum(axis=1)
+    
+    def choose_pad(self, position):
+        """Pad con menor distancia más espera estimada"""
+        wait = np.zeros(len(self.pads))
+        if self.capacity is not None:
+            load = np.array([len(c) + len(q) for c, q in zip(self.charging, self.queues)])
+            wait = np.maximum(0, load - self.capacity + 1) / self.capacity * CHARGE_STEPS
+        return int(np.argmin(self.pad_distances(position) + wait))
+    
+    def can_make_trip(self, i, target):
+        """Comprueba si el dron `i` llega a `target` sin entrar en recarga y puede volver a un pad"""
+        fleet = self.fleet
+        planner = fleet.planner
+        if planner is None:
+            to_target = np.abs(fleet.position[i] - np.asarray(target)).sum()
+            to_pad = self.pad_distances(target).min()
+        else:
+            to_target = planner.distance(fleet.position[i], target)
+            to_pad = min(planner.distance(target, pad) for pad in self.pads)
+        drain = fleet.battery_drain_rate[i]
+        battery = fleet.battery[i]
+        return (battery - drain * to_target >= RECHARGE_THRESHOLD and
+                battery - drain * (to_target + to_pad) - 0.3 >= TRIP_RESERVE)
+    
+    def step(self):
+        """Asigna pads, encola a los que llegaron y recarga; devuelve los drones que van a un pad"""
+        fleet = self.fleet
+        n = fleet.count
+        recharging = fleet.state[:n] == RECHARGING
+        for i in np.flatnonzero(recharging & (fleet.pad[:n] < 0)):
+            fleet.pad[i] = self.choose_pad(fleet.position[i])
+            
+        heading = np.flatnonzero(recharging)
+        at_pad = np.all(fleet.position[heading] == self.pads[fleet.pad[heading]], axis=1)
+        for i in heading[at_pad]:
+            if i not in self.docked:
+                self.docked.add(i)
+                self.queues[fleet.pad[i]].append(i)
+                
+        for charging, queue in zip(self.charging, self.queues):
+            while queue and (self.capacity is None or len(charging) < self.capacity):
+                charging[queue.popleft()] = None
+        charging_idx = np.array([i for charging in self.charging for i in charging], dtype=np.intp)
+        if len(charging_idx):
+            full = fleet.recharge(charging_idx)
+            for i in charging_idx[full]:
+                del self.charging[fleet.pad[i]][i]
+                self.docked.discard(i)
+                fleet.pad[i] = -1
+        return heading[~at_pad]
+    
+    def steps_to_release(self):
+        """Pasos hasta que el primer dron que recarga quede cargado (None si nadie recarga)"""
+        charging_idx = [i for charging in self.charging for i in charging]
+        if not charging_idx:
+            return None
+        battery = self.fleet.battery[charging_idx]
+        return int(np.max([1, np.ceil((95 - battery.max()) / 2.5)]))
+    
+    def is_idle(self):
+        """Todos los drones en recarga están en su pad y ninguna cola puede avanzar"""
+        fleet = self.fleet
+        recharging = np.flatnonzero(fleet.state[:fleet.count] == RECHARGING)
+        if any(i not in self.docked for i in recharging):
+            return False
+        return not any(queue and (self.capacity is None or len(charging) < self.capacity)
+                       for charging, queue in zip(self.charging, self.queues))
+    
+    def advance_idle(self, steps):
+        """Aplica `steps` pasos de recarga sin que nadie termine (ver steps_to_release)"""
+        charging_idx = np.array([i for charging in self.charging for i in charging], dtype=np.intp)
+        for _ in range(steps):
+            self.fleet.recharge(charging_idx)
+    
+    def renumber(self, old, new):
+        """El dron de índice `old` pasa a ser `new` (al quitar otro dron de la flota)"""
+        if old in self.docked:
+            self.docked.discard(old)
+            self.docked.add(new)
+        for queue in self.queues:
+            for k, i in enumerate(queue):
+                if i == old:
+                    queue[k] = new
+        for pad, charging in enumerate(self.charging):
+            if old in charging:
+                self.charging[pad] = {new if i == old else i: None for i in charging}
+    
+    def pad_positions(self, idx):
+        """Posición del pad asignado a cada dron de `idx`"""
+        return self.pads[self.fleet.pad[idx]]
+
+def pads_for_size(size, pads=CHARGING_PADS):
+    """Pads de recarga de un invernadero de lado `size`: cada coordenada se
+    recorta al borde y se descartan los pads repetidos."""
+    return tuple(dict.fromkeys((min(x, size - 1), min(y, size - 1)) for x, y in pads))
+
+def split_by_weight(total, weights):
+    """Reparte `total` unidades en proporción a `weights` (cuota entera más restos mayores)"""
+    weights = np.asarray(weights, dtype=float)
+    quota = total * weights / weights.sum()
+    desired = np.floor(quota).astype(int)
+    leftover = total - desired.sum()
+    if leftover:
+        desired[np.argsort(desired - quota, kind='stable')[:leftover]] += 1
+    return desired
+
 class ABCPollination:
-    def __init__(self, greenhouse_size, num_flowers, num_workers, num_observers, num_scouts):
+    def __init__(self, greenhouse_size, num_flowers, num_workers, num_observers, num_scouts,
+                 area_rows=AREA_ROWS, area_cols=AREA_COLS, obstacles=GREENHOUSE_OBSTACLES,
+                 cell_capacity=CELL_CAPACITY):
+        # Cada área necesita al menos 2 celdas por lado para dejar margen a sus flores
+        if not (1 <= area_rows <= greenhouse_size // 2 and 1 <= area_cols <= greenhouse_size // 2):
+            raise ValueError(f"Una cuadrícula de {area_rows}x{area_cols} áreas no cabe en un "
+                             f"invernadero de {greenhouse_size}x{greenhouse_size}")
         self.greenhouse_size = greenhouse_size
+        self.area_rows = area_rows
+        self.area_cols = area_cols
         self.flowers = []
+        self.flower_store = FlowerStore(num_flowers)
+        self.flowers_by_position = {}  # Índice posición -> flores en esa celda
+        self.flowers_by_state = {state: RandomAccessSet() for state in FLOWER_COLORS}
+        self.ready_index = SpatialGrid(greenhouse_size)  # Flores listas que admiten reservas, por cubetas
+        self.charging_pads = pads_for_size(greenhouse_size)
+        self.planner = PathPlanner(greenhouse_size, obstacles)
+        # Los obstáculos están pensados para GREENHOUSE_SIZE: en invernaderos
+        # más pequeños nunca deben tapar un pad
+        for x, y in self.charging_pads:
+            self.planner.set_blocked((x, x, y, y), False)
+        self.airspace = AirspaceTable(greenhouse_size, cell_capacity, self.charging_pads)
         self.drones = []
+        self.fleet = None
+        self.reservations = None
+        self.charging = None
         self.areas = []
-        self.base_position = BASE_POSITION
+        self.base_position = self.charging_pads[0]
         self.step_count = 0
         self.total_pollination = 0
         self.energy_consumed = 0
+        self.pollinations_by_type = {WORKER: 0, OBSERVER: 0, SCOUT: 0}
+        # Registro de cambios para el renderizador incremental
+        self.changed_flowers = set()  # Índices de flores que cambiaron de estado
+        self.layout_changed = True    # Se añadieron o quitaron flores: redibujar todo
+        # Modo por eventos: montículo (paso, id, flor) de cuándo madurará cada flor inmadura
+        self.ready_events = []
+        self.skipped_steps = 0
         
         self._initialize_areas()
         self._initialize_flowers(num_flowers)
         self._initialize_drones(num_workers, num_observers, num_scouts)
     
     def _initialize_areas(self):
-        """Divide el invernadero en 4 áreas"""
-        mid_x = self.greenhouse_size // 2
-        mid_y = self.greenhouse_size // 2
-        
-        self.areas.append(Area(0, (0, mid_x, 0, mid_y)))
-        self.areas.append(Area(1, (mid_x, self.greenhouse_size, 0, mid_y)))
-        self.areas.append(Area(2, (0, mid_x, mid_y, self.greenhouse_size)))
-        self.areas.append(Area(3, (mid_x, self.greenhouse_size, mid_y, self.greenhouse_size)))
+        """Divide el invernadero en una cuadrícula de area_rows x area_cols áreas"""
+        x_edges = [self.greenhouse_size * col // self.area_cols for col in range(self.area_cols + 1)]
+        y_edges = [self.greenhouse_size * row // self.area_rows for row in range(self.area_rows + 1)]
+        for row in range(self.area_rows):
+            for col in range(self.area_cols):
+                bounds = (x_edges[col], x_edges[col + 1], y_edges[row], y_edges[row + 1])
+                area = Area(len(self.areas), bounds)
+                if not self.planner.is_free(area.observer_position):
+                    # El centro cae en un obstáculo: la celda libre del área más cercana a él
+                    x_min, x_max, y_min, y_max = bounds
+                    free = np.argwhere(~self.planner.blocked[x_min:x_max, y_min:y_max]) + (x_min, y_min)
+                    if len(free):
+                        nearest = free[np.abs(free - area.observer_position).sum(axis=1).argmin()]
+                        area.observer_position = (int(nearest[0]), int(nearest[1]))
+                self.areas.append(area)
+    
+    def random_free_cell(self, x_range, y_range):
+        """Celda al azar dentro de los rangos (inclusivos) que no sea un obstáculo.
+
+        Se elige entre las celdas libres del rango, así que no hay reintentos; si
+        todas son obstáculos lanza ValueError.
+        """
+        (x_lo, x_hi), (y_lo, y_hi) = x_range, y_range
+        free = np.argwhere(~self.planner.blocked[x_lo:x_hi + 1, y_lo:y_hi + 1])
+        if not len(free):
+            raise ValueError(f"No hay celdas libres en x={x_range}, y={y_range}")
+        dx, dy = free[random.randrange(len(free))]
+        return x_lo + int(dx), y_lo + int(dy)
+    
+    def random_free_cell_in_area(self, area, x_range, y_range):
+        """Como random_free_cell, pero si el rango no tiene celdas libres usa toda el área"""
+        try:
+            return self.random_free_cell(x_range, y_range)
+        except ValueError:
+            x_min, x_max, y_min, y_max = area.bounds
+            return self.random_free_cell((x_min, x_max - 1), (y_min, y_max - 1))
     
     def _initialize_flowers(self, num_flowers):
-        """Inicializa las flores distribuidas en las áreas"""
-        for area in self.areas:
+        """Inicializa las flores distribuidas en las áreas (el resto va a las primeras)"""
+        per_area = split_by_weight(num_flowers, np.ones(len(self.areas)))
+        for area, count in zip(self.areas, per_area):
             x_min, x_max, y_min, y_max = area.bounds
-            for _ in range(num_flowers // 4):
-                x = random.randint(x_min + 2, x_max - 2)
-                y = random.randint(y_min + 2, y_max - 2)
-                flower = Flower((x, y), area.area_id)
-                self.flowers.append(flower)
-                area.add_flower(flower)
+            # Margen de 2 celdas con el borde del área si cabe
+            margin_x = min(2, (x_max - x_min) // 2)
+            margin_y = min(2, (y_max - y_min) // 2)
+            for _ in range(count):
+                x, y = self.random_free_cell_in_area(area, (x_min + margin_x, x_max - margin_x),
+                                                     (y_min + margin_y, y_max - margin_y))
+                self.add_flower(Flower((x, y), area.area_id, self.flower_store))
     
     def _initialize_drones(self, num_workers, num_observers, num_scouts):
         """Inicializa los drones con sus respectivas áreas"""
+        self.fleet = DroneFleet(self.flower_store, self.greenhouse_size,
+                                num_workers + num_observers + num_scouts)
+        self.fleet.planner = self.planner
+        self.fleet.airspace = self.airspace
         drone_id = 0
         
-        # Drones observadores (uno por área, posiciones fijas)
-        for area in self.areas:
-            self.drones.append(Drone(drone_id, area.observer_position, OBSERVER, area.area_id))
+        # Drones observadores en posiciones fijas: en el centro de áreas repartidas
+        # por la cuadrícula si hay menos que áreas, y por turnos si hay más
+        num_areas = len(self.areas)
+        for k in range(num_observers):
+            area = self.areas[k * num_areas // num_observers if num_observers <= num_areas
+                              else k % num_areas]
+            self.drones.append(Drone(drone_id, area.observer_position, OBSERVER, area.area_id, self.fleet))
             drone_id += 1
             
-        # Drones obreros (asignados a áreas específicas)
-        workers_per_area = num_workers // len(self.areas)
-        for area in self.areas:
-            for i in range(workers_per_area):
+        # Drones obreros (asignados a áreas específicas, el resto a las primeras)
+        for area, count in zip(self.areas, split_by_weight(num_workers, np.ones(num_areas))):
+            for i in range(count):
                 obs_x, obs_y = area.observer_position
-                start_x = random.randint(max(0, obs_x-3), min(self.greenhouse_size-1, obs_x+3))
-                start_y = random.randint(max(0, obs_y-3), min(self.greenhouse_size-1, obs_y+3))
-                self.drones.append(Drone(drone_id, (start_x, start_y), WORKER, area.area_id))
+                start_x, start_y = self.random_free_cell_in_area(
+                    area, (max(0, obs_x-3), min(self.greenhouse_size-1, obs_x+3)),
+                    (max(0, obs_y-3), min(self.greenhouse_size-1, obs_y+3)))
+                drone = Drone(drone_id, (start_x, start_y), WORKER, area.area_id, self.fleet)
+                self.drones.append(drone)
+                area.workers.append(drone.index)
                 drone_id += 1
             
         # Drones exploradores (sin área específica)
+        margin = min(5, self.greenhouse_size // 2)
         for i in range(num_scouts):
-            start_x = random.randint(5, self.greenhouse_size-5)
-            start_y = random.randint(5, self.greenhouse_size-5)
-            self.drones.append(Drone(drone_id, (start_x, start_y), SCOUT))
+            start_x, start_y = self.random_free_cell((margin, self.greenhouse_size-margin),
+                                                     (margin, self.greenhouse_size-margin))
+            self.drones.append(Drone(drone_id, (start_x, start_y), SCOUT, fleet=self.fleet))
             drone_id += 1
+        
+        self.reservations = ReservationTable(self.flower_store, self.fleet)
+        self.reservations.on_change = self._on_claims_change
+        self.charging = ChargingScheduler(self.fleet, self.charging_pads, PAD_CAPACITY)
+    
+    def add_flower(self, flower):
+        """Añade una flor a la simulación, a su área y al índice de posiciones"""
+        self.flower_store.adopt(flower)
+        self.flowers.append(flower)
+        self.areas[flower.area_id].add_flower(flower)
+        self.flowers_by_position.setdefault(flower.position, []).append(flower)
+        self.flowers_by_state[flower.state].add(flower)
+        self.layout_changed = True
+        if flower.state == FLOWER_READY and (self.reservations is None or
+                                             self.reservations.is_available(flower)):
+            self.ready_index.add(flower)
+        elif flower.state == FLOWER_IMMATURE:
+            heapq.heappush(self.ready_events,
+                           (self.step_count + flower.steps_to_ready(), flower.id, flower))
+        flower.on_change = self._on_flower_change
+    
+    def remove_flower(self, flower):
+        """Quita una flor de la simulación, de su área y del índice de posiciones"""
+        self.flowers.remove(flower)
+        self.areas[flower.area_id].remove_flower(flower)
+        cell = self.flowers_by_position[flower.position]
+        cell.remove(flower)
+        if not cell:
+            del self.flowers_by_position[flower.position]
+        self.flowers_by_state[flower.state].discard(flower)
+        self.ready_index.discard(flower)
+        self.layout_changed = True
+        flower.on_change = None
+        # Los drones que la perseguían se quedan sin objetivo; la última fila del
+        # almacén ocupa su índice, así que se reasignan quienes apuntaban a ella
+        index, last = flower.index, self.flower_store.count - 1
+        if self.fleet is not None:
+            self.reservations.release_flower(index)
+            self.fleet.target[self.fleet.target == index] = -1
+        FlowerStore(1).adopt(flower)
+        if self.fleet is not None:
+            self.fleet.target[self.fleet.target == last] = index
+            self.fleet.claim[self.fleet.claim == last] = index
+    
+    def spare_workers(self):
+        """Obreras que pueden salir del invernadero: sin objetivo, reserva ni recarga pendiente"""
+        fleet = self.fleet
+        n = fleet.count
+        return np.flatnonzero((fleet.type[:n] == WORKER) & (fleet.state[:n] == WORKER) &
+                              (fleet.target[:n] < 0) & (fleet.claim[:n] < 0) & (fleet.pad[:n] < 0))
+    
+    def add_drone(self, drone_id, drone_type, battery=100.0, drain_rate=None, energy_used=0.0,
+                  pollination_count=0, position=None):
+        """Incorpora un dron que llega desde fuera (por defecto por la base).
+
+        Una obrera se asigna al área con más demanda por obrera; la siguiente
+        redistribución la reubicará si hace falta.
+        """
+        area_id = None
+        if drone_type == WORKER:
+            area_id = max(self.areas, key=lambda a: a.demand() / (len(a.workers) + 1)).area_id
+        drone = Drone(drone_id, position or self.base_position, drone_type, area_id, self.fleet,
+                      drain_rate)
+        fleet, i = self.fleet, drone.index
+        fleet.battery[i] = battery
+        fleet.energy_used[i] = energy_used
+        fleet.pollination_count[i] = pollination_count
+        fleet.update_state([i])
+        self.drones.append(drone)
+        if area_id is not None:
+            self.areas[area_id].workers.append(i)
+        self.layout_changed = True
+        return drone
+    
+    def remove_drone(self, drone):
+        """Quita un dron de la simulación; el último de la flota ocupa su índice"""
+        fleet = self.fleet
+        i, last = drone.index, fleet.count - 1
+        self.reservations.release([i])
+        if i in self.charging.docked:
+            raise ValueError("No se puede quitar un dron que está en un pad de recarga")
+        if fleet.pad[i] >= 0:
+            fleet.pad[i] = -1
+        for area in self.areas:
+            if i in area.workers:
+                area.workers.remove(i)
+        fleet.remove(i)
+        self.drones[i] = self.drones[last]
+        self.drones.pop()
+        if i != last:
+            for area in self.areas:
+                area.workers = [i if k == last else k for k in area.workers]
+            self.charging.renumber(last, i)
+        self.layout_changed = True
+    
+    def _on_flower_change(self, flower, old_state):
+        # Mantiene al día los índices que dependen de la madurez o el estado
+        self.areas[flower.area_id].update_flower(flower, old_state)
+        if flower.state != old_state:
+            self.changed_flowers.add(flower.index)
+            self.flowers_by_state[old_state].discard(flower)
+            self.flowers_by_state[flower.state].add(flower)
+            if old_state == FLOWER_READY:
+                self.ready_index.discard(flower)
+            elif flower.state == FLOWER_READY and self.reservations.is_available(flower):
+                self.ready_index.add(flower)
+    
+    def _on_claims_change(self, index, available):
+        # En el índice espacial solo están las flores listas que admiten otra
+        # reserva, así las búsquedas no recorren las ya reservadas
+        flower = self.flower_store.views[index]
+        if flower.on_change is None or flower.state != FLOWER_READY:
+            return
+        if available:
+            self.ready_index.add(flower)
+        else:
+            self.ready_index.discard(flower)
+    
+    def drain_changes(self):
+        """Devuelve y vacía el registro de cambios: (flores, drones, hay_que_redibujar_todo)"""
+        flowers = np.fromiter(self.changed_flowers, dtype=np.intp, count=len(self.changed_flowers))
+        self.changed_flowers.clear()
+        layout_changed, self.layout_changed = self.layout_changed, False
+        return flowers, self.fleet.drain_dirty(), layout_changed
+    
+    def sample_flower(self, states, excluded=(), accept=None, attempts=16):
+        """Elige al azar una flor en alguno de los estados dados que no esté en `excluded`.
+
+        Si se da `accept`, la flor además debe cumplirlo. Se muestrea por rechazo
+        (O(1) esperado); solo si los intentos fallan se filtra la lista completa.
+        """
+        pools = [self.flowers_by_state[state] for state in states]
+        total = sum(len(pool) for pool in pools)
+        if total == 0:
+            return None
+        if total > 2 * len(excluded):
+            for _ in range(attempts):
+                k = random.randrange(total)
+                for pool in pools:
+                    if k < len(pool):
+                        flower = pool.items[k]
+                        break
+                    k -= len(pool)
+                if flower not in excluded and (accept is None or accept(flower)):
+                    return flower
+        candidates = [f for pool in pools for f in pool
+                      if f not in excluded and (accept is None or accept(f))]
+        return random.choice(candidates) if candidates else None
+    
+    def is_unclaimed(self, flower):
+        """Una flor lista con todas sus reservas ocupadas no se ofrece a otro dron"""
+        return flower.state != FLOWER_READY or self.reservations.is_available(flower)
+    
+    def get_flowers_at_position(self, position):
+        """Obtiene todas las flores de una celda en O(1)"""
+        return self.flowers_by_position.get(position, [])
     
     def get_flower_at_position(self, position):
-        """Obtiene la flor en una posición específica"""
-        for flower in self.flowers:
-            if flower.position == position:
+        """Obtiene la flor en una posición específica (la primera lista para polinizar si hay varias)"""
+        flowers = self.flowers_by_position.get(position)
+        if not flowers:
+            return None
+        for flower in flowers:
+            if flower.state == FLOWER_READY:
                 return flower
-        return None
+        return flowers[0]
     
     def find_flower_for_worker(self, drone):
         """Encuentra una flor para un drone obrero en su área"""
         if drone.area_id is None:
             return None
             
+        # Primero la flor lista sin reservas completas más cercana dentro de su área
         area = self.areas[drone.area_id]
-        ready_flowers = area.get_ready_flowers()
+        flower = self.ready_index.nearest(
+            drone.position, lambda f: f.area_id == area.area_id and self.reservations.is_available(f),
+            area.bounds)
+        if flower is not None:
+            return flower
         
-        if ready_flowers:
-            return ready_flowers[0]
-        else:
-            prioritized_flowers = area.get_flowers_by_priority()
-            for flower in prioritized_flowers:
-                if flower not in drone.visited_flowers[-5:]:
-                    return flower
+        # Si no hay, una flor que madure para cuando llegue
+        if FORECAST_WORKERS:
+            flower = self.forecast_flower(drone, area)
+            if flower is not None:
+                return flower
+        
+        # Si no hay, la flor no lista de mayor prioridad que no visitó hace poco
+        # (las listas van en otro montículo, así no se recorren las ya reservadas)
+        recent = drone.visited_flowers.recent(5)
+        for flower in area.iter_unready_by_priority():
+            if flower not in recent:
+                return flower
         return None
     
+    def ready_on_arrival(self, drone, flower):
+        """La flor estará lista a lo sumo FORECAST_SLACK pasos después de que llegue el dron"""
+        travel = self.planner.distance(drone.position, flower.position)
+        return flower.steps_to_ready() <= travel + FORECAST_SLACK
+    
+    def _forecast_candidates(self, area, candidates=FORECAST_CANDIDATES):
+        available = (f for f in area.iter_forecast() if self.reservations.is_available(f))
+        return itertools.islice(available, candidates)
+    
+    def forecast_opens(self, drone, candidates=FORECAST_CANDIDATES):
+        """Pasos hasta que forecast_flower pueda ofrecer una flor a la obrera (None si nunca)"""
+        if not FORECAST_WORKERS or drone.area_id is None:
+            return None
+        waits = [flower.steps_to_ready() - FORECAST_SLACK -
+                 self.planner.distance(drone.position, flower.position)
+                 for flower in self._forecast_candidates(self.areas[drone.area_id], candidates)]
+        return max(1, min(waits)) if waits else None
+    
+    def forecast_flower(self, drone, area, candidates=FORECAST_CANDIDATES):
+        """Flor inmadura sin reservar del área que antes podrá polinizar la obrera.
+
+        Entre las `candidates` flores libres que antes maduran, elige la que
+        minimiza el mayor entre el viaje y la maduración, siempre que la obrera
+        no tenga que esperar en ella más de FORECAST_SLACK pasos.
+        """
+        best, best_time = None, None
+        for flower in self._forecast_candidates(area, candidates):
+            travel = self.planner.distance(drone.position, flower.position)
+            ready_in = flower.steps_to_ready()
+            if ready_in > travel + FORECAST_SLACK:
+                continue
+            if best is None or max(travel, ready_in) < best_time:
+                best, best_time = flower, max(travel, ready_in)
+        return best
+    
     def find_flower_for_scout(self, drone):
         """Encuentra una flor para un drone explorador en cualquier área"""
-        # Buscar flores listas para polinizar en cualquier área
-        all_ready_flowers = []
-        for area in self.areas:
-            all_ready_flowers.extend(area.get_ready_flowers())
-        
-        if all_ready_flowers:
-            # Para exploradoras, elegir aleatoriamente entre flores listas
-            available_flowers = [f for f in all_ready_flowers if f not in drone.visited_flowers[-3:]]
-            if available_flowers:
-                return random.choice(available_flowers)
+        # Para exploradoras, la flor lista sin reservas completas más cercana de cualquier área
+        recent = drone.visited_flowers.recent(3)
+        flower = self.ready_index.nearest(
+            drone.position, lambda f: f not in recent and self.reservations.is_available(f))
+        if flower is not None:
+            return flower
         
         # Si no hay flores listas, buscar cualquier flor no polinizada
-        all_flowers = []
-        for area in self.areas:
-            all_flowers.extend([f for f in area.flowers if f.state != FLOWER_POLLINATED])
-        
-        if all_flowers:
-            available_flowers = [f for f in all_flowers if f not in drone.visited_flowers[-5:]]
-            if available_flowers:
-                return random.choice(available_flowers)
-                
-        # Si no hay flores disponibles, explorar áreas aleatorias
-        return None
+        # Si tampoco hay, devuelve None y la exploradora se mueve al azar
+        return self.sample_flower((FLOWER_IMMATURE, FLOWER_READY), drone.visited_flowers.recent(5),
+                                  self.is_unclaimed)
     
     def run_step(self):
         """Ejecuta un paso de simulación"""
         self.step_count += 1
         
-        # Actualizar estado de las flores
-        for flower in self.flowers:
-            flower.grow_naturally()
-            flower.update_state()
+        # Actualizar estado de las flores en una pasada vectorizada
+        changed, old_states = self.flower_store.advance_growth()
+        for index, old_state in zip(changed, old_states):
+            self._on_flower_change(self.flower_store.views[index], int(old_state))
         
-        # Procesar cada dron
-        for drone in self.drones:
-            # Actualizar estado basado en batería
-            drone.update_state()
-            
-            if drone.state == RECHARGING:
-                if drone.position != self.base_position:
-                    drone.move_towards(self.base_position)
-                else:
-                    drone.recharge()
-                continue
-                
-            # Drones observadores no se mueven
-            if drone.type == OBSERVER:
+        # Redistribuir obreras según la demanda de cada área
+        if self.step_count % REBALANCE_INTERVAL == 0:
+            self.rebalance_workers()
+        
+        # Procesar la flota: estado según batería y recarga en los pads
+        fleet = self.fleet
+        n = fleet.count
+        fleet.update_state()
+        recharging = fleet.state[:n] == RECHARGING
+        to_pad = self.charging.step()
+        self.reservations.sync(self.step_count)
+        
+        # Drones observadores no se mueven
+        active = np.flatnonzero(~recharging & (fleet.type[:n] != OBSERVER))
+        
+        # Si no tiene objetivo, buscar uno según su tipo
+        wandering = []
+        for i in active[fleet.target[active] < 0]:
+            drone = self.drones[i]
+            if drone.type == WORKER:
+                drone.target_flower = self.find_flower_for_worker(drone)
+            elif drone.type == SCOUT:
+                drone.target_flower = self.find_flower_for_scout(drone)
+                # Si no encuentra flor, moverse aleatoriamente
+                if drone.target_flower is None:
+                    wandering.append(i)
+            flower = drone.target_flower
+            if flower is None:
                 continue
-                
-            # Si no tiene objetivo, buscar uno según su tipo
-            if drone.target_flower is None:
-                if drone.type == WORKER:
-                    drone.target_flower = self.find_flower_for_worker(drone)
-                elif drone.type == SCOUT:
-                    drone.target_flower = self.find_flower_for_scout(drone)
-                    # Si no encuentra flor, moverse aleatoriamente
-                    if drone.target_flower is None:
-                        self._move_scout_randomly(drone)
-                        continue
-                
-            # Si tiene objetivo, moverse hacia él
-            if drone.target_flower:
-                arrived = drone.move_towards(drone.target_flower.position)
-                
-                if arrived:
-                    # Polinizar la flor
-                    flower = self.get_flower_at_position(drone.position)
-                    if flower and flower.pollinate():
-                        drone.pollination_count += 1
-                        flower.pollination_count += 1
-                        self.total_pollination += 0.25
-                    
-                    # Marcar como visitada y buscar nuevo objetivo
-                    if flower and flower not in drone.visited_flowers:
-                        drone.visited_flowers.append(flower)
-                    
-                    drone.target_flower = None
-                    drone.consume_energy(0.3)
+            # Sin batería para llegar y volver a un pad, recargar antes del viaje
+            if not self.charging.can_make_trip(i, flower.position):
+                fleet.target[i] = -1
+                fleet.state[i] = RECHARGING
+                fleet.dirty[i] = True
+            # Reservar la flor si está lista, o si es una obrera y madurará cuando llegue
+            elif flower.state == FLOWER_READY or (
+                    FORECAST_WORKERS and drone.type == WORKER and flower.state == FLOWER_IMMATURE and
+                    self.ready_on_arrival(drone, flower)):
+                self.reservations.claim(drone, flower, self.step_count)
+        fleet.random_walk(wandering)
+        
+        # Un paso de todos los desplazamientos a la vez: a su pad o hacia la flor objetivo
+        chasing = active[fleet.target[active] >= 0]
+        destinations = np.concatenate([self.charging.pad_positions(to_pad),
+                                       fleet.target_positions(chasing)])
+        arrived = fleet.move_towards(np.concatenate([to_pad, chasing]), destinations)
         
-        # Calcular energía total consumida
-        self.energy_consumed = sum(drone.energy_used for drone in self.drones)
+        arrivals = chasing[arrived[len(to_pad):]]
+        # Quien llegó antes de que madure la flor que reservó la espera sin gastar energía
+        store = self.flower_store
+        early = ((fleet.claim[arrivals] == fleet.target[arrivals]) &
+                 (store.state[fleet.target[arrivals]] == FLOWER_IMMATURE))
+        arrivals = arrivals[~early]
+        for i in arrivals:
+            drone = self.drones[i]
+            # Polinizar la flor
+            flower = self.get_flower_at_position(drone.position)
+            if flower and flower.pollinate():
+                fleet.pollination_count[i] += 1
+                self.pollinations_by_type[fleet.type[i]] += 1
+                flower.pollination_count += 1
+                self.total_pollination += 0.25
+            
+            # Marcar como visitada y buscar nuevo objetivo
+            if flower:
+                drone.visited_flowers.add(flower)
+        fleet.target[arrivals] = -1
+        fleet.consume_energy(arrivals, 0.3)
+        
+        # Energía total consumida, acumulada por la flota
+        self.energy_consumed = fleet.total_energy
         
         # Verificar si todas las flores están completamente polinizadas
-        all_pollinated = all(flower.state == FLOWER_POLLINATED for flower in self.flowers)
+        all_pollinated = len(self.flowers_by_state[FLOWER_POLLINATED]) == len(self.flowers)
         return all_pollinated
     
-    def _move_scout_randomly(self, drone):
-        """Mueve un drone explorador aleatoriamente cuando no tiene objetivo"""
-        if random.random() < 0.7:  # 70% de probabilidad de moverse
-            directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-            dx, dy = random.choice(directions)
-            new_x = drone.position[0] + dx
-            new_y = drone.position[1] + dy
-            
-            # Asegurar que no se sale del invernadero
-            new_x = max(0, min(self.greenhouse_size-1, new_x))
-            new_y = max(0, min(self.greenhouse_size-1, new_y))
+    def next_event_step(self):
+        """Primer paso en que puede cambiar algo mientras la flota está parada.
+
+        Son eventos una flor que madura, un dron que termina de recargar (y libera
+        su plaza en el pad), la redistribución periódica de obreras y que una
+        flor entre en el horizonte de previsión de una obrera libre. Las
+        entradas del montículo de flores ya pasadas o de flores quitadas o
+        polinizadas se descartan al consultarlo.
+        """
+        events = self.ready_events
+        while events and (events[0][0] <= self.step_count or
+                          events[0][2].on_change is None or
+                          events[0][2].state != FLOWER_IMMATURE):
+            heapq.heappop(events)
+        steps = [REBALANCE_INTERVAL * (self.step_count // REBALANCE_INTERVAL + 1)]
+        if events:
+            steps.append(events[0][0])
+        release = self.charging.steps_to_release()
+        if release is not None:
+            steps.append(self.step_count + release)
+        fleet = self.fleet
+        n = fleet.count
+        for i in np.flatnonzero((fleet.type[:n] == WORKER) & (fleet.state[:n] == WORKER)):
+            opens = self.forecast_opens(self.drones[i])
+            if opens is not None:
+                steps.append(self.step_count + opens)
+        return min(steps)
+    
+    def is_idle(self):
+        """Ningún dron puede moverse ni elegir objetivo hasta el siguiente evento.
+
+        Los drones en recarga esperan o recargan en su pad, y las obreras sin
+        objetivo no encuentran flor en su área (su búsqueda solo cambia cuando
+        madura una flor o se redistribuyen las obreras). Una exploradora activa
+        siempre se mueve (hacia cualquier flor no polinizada o al azar), así que
+        con exploradoras fuera del pad la flota nunca está parada.
+        """
+        fleet = self.fleet
+        n = fleet.count
+        if np.any(fleet.claim[:n] >= 0) or not self.charging.is_idle():
+            return False
+        waiting = np.flatnonzero((fleet.type[:n] != OBSERVER) & (fleet.state[:n] != RECHARGING))
+        # Primero la comprobación vectorizada, para no buscar flor a cada obrera en vano
+        if np.any((fleet.type[waiting] != WORKER) | (fleet.target[waiting] >= 0)):
+            return False
+        return all(self.find_flower_for_worker(self.drones[i]) is None for i in waiting)
+    
+    def skip_idle_steps(self, max_steps=MAX_STEPS):
+        """Avanza sin simular drones los pasos en que la flota está parada (ver is_idle).
+
+        Se salta hasta dos pasos antes del siguiente evento (las estimaciones de
+        maduración y recarga pueden adelantarse un paso por redondeo), así que
+        esos pasos dejan el mismo estado que run_step: solo crecen las flores y
+        se recargan los drones del pad. Si aun así una flor cambia de estado, se
+        actualizan sus índices y se deja de saltar en ese paso. Devuelve cuántos
+        pasos se saltaron.
+        """
+        if not self.is_idle():
+            return 0
+        steps = min(self.next_event_step() - 2, max_steps) - self.step_count
+        if steps <= 0:
+            return 0
+        store = self.flower_store
+        for skipped in range(1, steps + 1):
+            changed, old_states = store.advance_growth()
+            if len(changed):
+                for index, old_state in zip(changed, old_states):
+                    self._on_flower_change(store.views[index], int(old_state))
+                steps = skipped
+                break
+        self.charging.advance_idle(steps)
+        self.step_count += steps
+        self.skipped_steps += steps
+        return steps
+    
+    def run(self, max_steps=MAX_STEPS, event_driven=EVENT_DRIVEN):
+        """Simula hasta polinizar todas las flores o llegar a max_steps; devuelve si terminó.
+
+        Con `event_driven` se saltan los tramos en que toda la flota está parada;
+        las métricas coinciden con las de llamar run_step paso a paso. No es una
+        simulación por eventos de cada dron: con exploradoras activas o flores
+        inmaduras a las que mandar obreras no hay tramos así y no se salta nada.
+        """
+        while self.step_count < max_steps:
+            if event_driven and self.skip_idle_steps(max_steps) and self.step_count >= max_steps:
+                break
+            if self.run_step():
+                return True
+        return False
+    
+    def rebalance_workers(self):
+        """Redistribuye las obreras entre áreas en proporción a su demanda.
+
+        El reparto (cuota entera más restos mayores) es lineal en el número de
+        áreas; los traslados solo recorren las obreras de las áreas con sobrante.
+        Se mueven primero las obreras sin objetivo; las demás sueltan su objetivo
+        (y su reserva).
+        """
+        demand = np.array([area.demand() for area in self.areas])
+        current = np.array([len(area.workers) for area in self.areas])
+        num_workers = current.sum()
+        if demand.sum() == 0 or num_workers == 0:
+            return 0
+        desired = split_by_weight(num_workers, demand)
+        
+        # Obreras sobrantes de cada área, primero las que no tienen objetivo
+        fleet = self.fleet
+        available = []
+        for area, surplus in zip(self.areas, current - desired):
+            if surplus > 0:
+                idle = [i for i in area.workers if fleet.target[i] < 0]
+                busy = [i for i in area.workers if fleet.target[i] >= 0]
+                area.workers = idle + busy
+                available.extend(area.workers[:surplus])
+                del area.workers[:surplus]
+        
+        moved = 0
+        for area, deficit in zip(self.areas, desired - current):
+            for _ in range(max(0, deficit)):
+                i = available.pop()
+                area.workers.append(i)
+                fleet.area_id[i] = area.area_id
+                fleet.target[i] = -1
+                moved += 1
+        return moved
+
+# Colores de los drones indexados por estado
+DRONE_PALETTE = np.array([DRONE_COLORS[state] for state in sorted(DRONE_COLORS)])
+
+class PollinationRenderer:
+    """Dibuja flores y drones aplicando solo los cambios registrados por la simulación.
+
+    Cada scatter de flores contiene todas las flores y las que no están en su
+    estado tienen tamaño 0, así un cambio de estado solo toca dos tamaños. Los
+    arreglos de posiciones, tamaños y colores se reservan al reconstruir y se
+    reutilizan en cada fotograma.
+    """
+    def __init__(self, sim, flower_scatters, drone_scatter):
+        self.sim = sim
+        self.flower_scatters = flower_scatters  # Estado de flor -> scatter
+        self.drone_scatter = drone_scatter
+        self.flower_sizes = {}
+        self.drone_offsets = None
+        self.drone_colors = None
+        
+    def rebuild(self):
+        """Rellena todos los arreglos desde cero (al inicio o si cambió el conjunto de flores)"""
+        store = self.sim.flower_store
+        n = store.count
+        offsets = store.position[:n].astype(float)
+        for state, scatter in self.flower_scatters.items():
+            self.flower_sizes[state] = np.where(store.state[:n] == state, store.size[:n], 0).astype(float)
+            scatter.set_offsets(offsets)
+            scatter.set_sizes(self.flower_sizes[state])
+            scatter.set_color(FLOWER_COLORS[state])
             
-            drone.position = (new_x, new_y)
-            drone.consume_energy(drone.battery_drain_rate * 0.5)  # Menor consumo en movimiento aleatorio
-
-# Configuración de la figura con más espacio para la leyenda
-fig = plt.figure(figsize=(22, 12))
-gs = fig.add_gridspec(2, 3, width_ratios=[1.5, 1, 1], height_ratios=[1, 1])
-
-# Subplots
-ax1 = fig.add_subplot(gs[:, 0])  # Mapa principal
-ax2 = fig.add_subplot(gs[0, 1])  # Polinización
-ax3 = fig.add_subplot(gs[0, 2])  # Energía
-ax4 = fig.add_subplot(gs[1, 1])  # Eficiencia por tipo
-ax5 = fig.add_subplot(gs[1, 2])  # Estado de flores
-
-# Inicializar simulación
-abc_sim = ABCPollination(GREENHOUSE_SIZE, NUM_FLOWERS, 
-                        NUM_WORKER_DRONES, NUM_OBSERVER_DRONES, NUM_SCOUT_DRONES)
-
-# Configurar el mapa principal
-ax1.set_xlim(0, GREENHOUSE_SIZE)
-ax1.set_ylim(0, GREENHOUSE_SIZE)
-ax1.set_aspect('equal')
-ax1.set_title('SISTEMA DE POLINIZACIÓN CON DRONES - ALGORITMO ABC', 
-              fontsize=16, fontweight='bold', pad=20)
-ax1.set_xlabel('Coordenada X', fontsize=12)
-ax1.set_ylabel('Coordenada Y', fontsize=12)
-
-# Dibujar división de áreas
-mid_x = GREENHOUSE_SIZE // 2
-mid_y = GREENHOUSE_SIZE // 2
-ax1.axvline(x=mid_x, color='gray', linestyle='--', alpha=0.5, linewidth=2)
-ax1.axhline(y=mid_y, color='gray', linestyle='--', alpha=0.5, linewidth=2)
-
-# Etiquetar áreas
-ax1.text(mid_x/2, mid_y/2, 'ÁREA 0', ha='center', va='center', 
-         fontweight='bold', fontsize=11, alpha=0.7)
-ax1.text(mid_x*1.5, mid_y/2, 'ÁREA 1', ha='center', va='center', 
-         fontweight='bold', fontsize=11, alpha=0.7)
-ax1.text(mid_x/2, mid_y*1.5, 'ÁREA 2', ha='center', va='center', 
-         fontweight='bold', fontsize=11, alpha=0.7)
-ax1.text(mid_x*1.5, mid_y*1.5, 'ÁREA 3', ha='center', va='center', 
-         fontweight='bold', fontsize=11, alpha=0.7)
-
-# Base de recarga
-base_circle = plt.Circle(BASE_POSITION, 2.0, color='gray', alpha=0.7)
-ax1.add_patch(base_circle)
-ax1.text(BASE_POSITION[0], BASE_POSITION[1], 'BASE', ha='center', va='center', 
-         fontweight='bold', color='white', fontsize=10)
-
-# Elementos gráficos para flores y drones
-# Scatter plots separados para cada tipo de flor con formas diferentes
-immature_flowers_scatter = ax1.scatter([], [], s=[], c=[], marker='H', alpha=0.8, 
-                                       edgecolors='darkred', linewidths=1.5)
-ready_flowers_scatter = ax1.scatter([], [], s=[], c=[], marker='^', alpha=0.8, 
-                                    edgecolors='darkorange', linewidths=1.5)
-pollinated_flowers_scatter = ax1.scatter([], [], s=[], c=[], marker='D', alpha=0.8, 
-                                         edgecolors='darkgreen', linewidths=1.5)
-
-# Drones con forma circular
-drone_scatter = ax1.scatter([], [], s=[], c=[], alpha=1.0, 
-                            edgecolors='black', linewidths=2, marker='o')
-
-# LEYENDA MEJORADA - Fuera del área del gráfico
-legend_elements = [
-    mpatches.Patch(color=DRONE_COLORS[WORKER], label='Obreras'),
-    mpatches.Patch(color=DRONE_COLORS[OBSERVER], label='Observadoras'),
-    mpatches.Patch(color=DRONE_COLORS[SCOUT], label='Exploradoras'),
-    mpatches.Patch(color=DRONE_COLORS[RECHARGING], label='Recargando'),
-    plt.Line2D([0], [0], marker='H', color='w', markerfacecolor=FLOWER_COLORS[FLOWER_IMMATURE], 
-               markersize=10, label='Flores Inmaduras (Hexágono)'),
-    plt.Line2D([0], [0], marker='^', color='w', markerfacecolor=FLOWER_COLORS[FLOWER_READY], 
-               markersize=10, label='Flores Listas (Triángulo)'),
-    plt.Line2D([0], [0], marker='D', color='w', markerfacecolor=FLOWER_COLORS[FLOWER_POLLINATED], 
-               markersize=10, label='Flores Polinizadas (Diamante)')
-]
-
-# Crear una leyenda separada fuera del gráfico principal
-fig.legend(handles=legend_elements, loc='center left', bbox_to_anchor=(0.92, 0.5), 
-           fontsize=12, title="LEYENDA", title_fontsize=13, frameon=True, 
-           fancybox=True, shadow=True, ncol=1)
-
-# Gráficos de métricas
-maturity_line, = ax2.plot([], [], 'g-', linewidth=3)
-ax2.set_xlim(0, MAX_STEPS)
-ax2.set_ylim(0, 100)
-ax2.set_xlabel('Pasos', fontsize=11)
-ax2.set_ylabel('Polinización (%)', fontsize=11)
-ax2.set_title('PROGRESO DE POLINIZACIÓN', fontsize=13, fontweight='bold')
-ax2.grid(True, alpha=0.3)
-ax2.tick_params(axis='both', which='major', labelsize=10)
-
-energy_line, = ax3.plot([], [], 'r-', linewidth=3)
-ax3.set_xlim(0, MAX_STEPS)
-ax3.set_ylim(0, 1000)
-ax3.set_xlabel('Pasos', fontsize=11)
-ax3.set_ylabel('Energía Consumida', fontsize=11)
-ax3.set_title('ENERGÍA TOTAL CONSUMIDA', fontsize=13, fontweight='bold')
-ax3.grid(True, alpha=0.3)
-ax3.tick_params(axis='both', which='major', labelsize=10)
-
-worker_line, = ax4.plot([], [], 'b-', label='Obreras', linewidth=3)
-scout_line, = ax4.plot([], [], 'm-', label='Exploradoras', linewidth=3)
-ax4.set_xlim(0, MAX_STEPS)
-ax4.set_ylim(0, 100)
-ax4.set_xlabel('Pasos', fontsize=11)
-ax4.set_ylabel('Polinizaciones', fontsize=11)
-ax4.set_title('EFICIENCIA POR TIPO DE DRON', fontsize=13, fontweight='bold')
-ax4.legend(fontsize=11)
-ax4.grid(True, alpha=0.3)
-ax4.tick_params(axis='both', which='major', labelsize=10)
-
-# Gráfico de estado de flores
-flower_state_bars = ax5.bar([0, 1, 2], [0, 0, 0], 
-                           color=[FLOWER_COLORS[FLOWER_IMMATURE], 
-                                  FLOWER_COLORS[FLOWER_READY], 
-                                  FLOWER_COLORS[FLOWER_POLLINATED]],
-                           width=0.6)
-ax5.set_ylim(0, NUM_FLOWERS)
-ax5.set_xlabel('Estado de Flores', fontsize=11)
-ax5.set_ylabel('Cantidad', fontsize=11)
-ax5.set_title('DISTRIBUCIÓN DE ESTADOS DE FLORES', fontsize=13, fontweight='bold')
-ax5.set_xticks([0, 1, 2])
-ax5.set_xticklabels(['Inmaduras', 'Listas', 'Polinizadas'], fontsize=10)
-ax5.tick_params(axis='both', which='major', labelsize=10)
-
-# Texto informativo - Fuera del área del gráfico
-info_text = fig.text(0.02, 0.95, '', transform=fig.transFigure, verticalalignment='top',
-                    bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.9),
-                    fontsize=11, fontweight='bold')
-
-# Métricas para gráficos
-steps_history = []
-maturity_history = []
-energy_history = []
-worker_pollination_history = []
-scout_pollination_history = []
-
-def init_animation():
-    immature_flowers_scatter.set_offsets(np.empty((0, 2)))
-    immature_flowers_scatter.set_sizes(np.empty(0))
-    immature_flowers_scatter.set_color(np.empty((0, 3)))
-    
-    ready_flowers_scatter.set_offsets(np.empty((0, 2)))
-    ready_flowers_scatter.set_sizes(np.empty(0))
-    ready_flowers_scatter.set_color(np.empty((0, 3)))
-    
-    pollinated_flowers_scatter.set_offsets(np.empty((0, 2)))
-    pollinated_flowers_scatter.set_sizes(np.empty(0))
-    pollinated_flowers_scatter.set_color(np.empty((0, 3)))
-    
-    drone_scatter.set_offsets(np.empty((0, 2)))
-    drone_scatter.set_sizes(np.empty(0))
-    drone_scatter.set_color(np.empty((0, 3)))
-    
-    maturity_line.set_data([], [])
-    energy_line.set_data([], [])
-    worker_line.set_data([], [])
-    scout_line.set_data([], [])
-    
-    info_text.set_text('INICIANDO SIMULACIÓN...\nPreparando drones y flores...')
-    
-    return (immature_flowers_scatter, ready_flowers_scatter, pollinated_flowers_scatter,
-            drone_scatter, maturity_line, energy_line, worker_line, scout_line, info_text)
-
-def update_animation(frame):
-    global abc_sim
-    
-    # Ejecutar un paso de simulación
-    all_pollinated = abc_sim.run_step()
-    
-    # Separar flores por estado
-    immature_flowers = [f for f in abc_sim.flowers if f.state == FLOWER_IMMATURE]
-    ready_flowers = [f for f in abc_sim.flowers if f.state == FLOWER_READY]
-    pollinated_flowers = [f for f in abc_sim.flowers if f.state == FLOWER_POLLINATED]
-    
-    # Preparar datos para visualización de flores
-    immature_positions = [f.position for f in immature_flowers]
-    immature_sizes = [f.size for f in immature_flowers]
-    immature_colors = [FLOWER_COLORS[FLOWER_IMMATURE] for _ in immature_flowers]
-    
-    ready_positions = [f.position for f in ready_flowers]
-    ready_sizes = [f.size for f in ready_flowers]
-    ready_colors = [FLOWER_COLORS[FLOWER_READY] for _ in ready_flowers]
-    
-    pollinated_positions = [f.position for f in pollinated_flowers]
-    pollinated_sizes = [f.size for f in pollinated_flowers]
-    pollinated_colors = [FLOWER_COLORS[FLOWER_POLLINATED] for _ in pollinated_flowers]
-    
-    # Preparar datos para drones
-    drone_positions = [d.position for d in abc_sim.drones]
-    drone_sizes = [d.size for d in abc_sim.drones]
-    drone_colors = [DRONE_COLORS[d.state] for d in abc_sim.drones]
-    
-    # Actualizar scatter plots de flores
-    if immature_positions:
-        immature_flowers_scatter.set_offsets(immature_positions)
-        immature_flowers_scatter.set_sizes(immature_sizes)
-        immature_flowers_scatter.set_color(immature_colors)
-    else:
-        immature_flowers_scatter.set_offsets(np.empty((0, 2)))
-    
-    if ready_positions:
-        ready_flowers_scatter.set_offsets(ready_positions)
-        ready_flowers_scatter.set_sizes(ready_sizes)
-        ready_flowers_scatter.set_color(ready_colors)
-    else:
-        ready_flowers_scatter.set_offsets(np.empty((0, 2)))
-    
-    if pollinated_positions:
-        pollinated_flowers_scatter.set_offsets(pollinated_positions)
-        pollinated_flowers_scatter.set_sizes(pollinated_sizes)
-        pollinated_flowers_scatter.set_color(pollinated_colors)
-    else:
-        pollinated_flowers_scatter.set_offsets(np.empty((0, 2)))
-    
-    # Actualizar scatter plot de drones
-    if drone_positions:
-        drone_scatter.set_offsets(drone_positions)
-        drone_scatter.set_sizes(drone_sizes)
-        drone_scatter.set_color(drone_colors)
-    
-    # Calcular métricas
-    pollinated_count = len(pollinated_flowers)
-    pollinated_percentage = (pollinated_count / len(abc_sim.flowers)) * 100
-    
-    worker_pollinations = sum(d.pollination_count for d in abc_sim.drones if d.type == WORKER)
-    scout_pollinations = sum(d.pollination_count for d in abc_sim.drones if d.type == SCOUT)
-    
-    # Contar flores por estado
-    immature_count = len(immature_flowers)
-    ready_count = len(ready_flowers)
-    pollinated_count = len(pollinated_flowers)
-    
-    # Contar drones exploradores activos
-    active_scouts = sum(1 for d in abc_sim.drones if d.type == SCOUT and d.state != RECHARGING)
-    
-    # Contar drones recargando
-    recharging_drones = sum(1 for d in abc_sim.drones if d.state == RECHARGING)
-    
-    # Actualizar historiales
-    steps_history.append(frame)
-    maturity_history.append(pollinated_percentage)
-    energy_history.append(abc_sim.energy_consumed)
-    worker_pollination_history.append(worker_pollinations)
-    scout_pollination_history.append(scout_pollinations)
-    
-    # Actualizar gráficos
-    maturity_line.set_data(steps_history, maturity_history)
-    energy_line.set_data(steps_history, energy_history)
-    worker_line.set_data(steps_history, worker_pollination_history)
-    scout_line.set_data(steps_history, scout_pollination_history)
-    
-    # Actualizar barras de estado de flores
-    for bar, height in zip(flower_state_bars, [immature_count, ready_count, pollinated_count]):
-        bar.set_height(height)
-    
-    # Ajustar límites de los gráficos
-    if steps_history:
-        current_max_step = max(steps_history)
-        ax2.set_xlim(0, current_max_step + 10)
-        ax3.set_xlim(0, current_max_step + 10)
-        ax4.set_xlim(0, current_max_step + 10)
-        
-        ax2.set_ylim(0, min(100, max(maturity_history) + 10) if maturity_history else 100)
-        ax3.set_ylim(0, max(energy_history) + 50 if energy_history else 1000)
-        max_poll = max(max(worker_pollination_history) if worker_pollination_history else 0,
-                      max(scout_pollination_history) if scout_pollination_history else 0)
-        ax4.set_ylim(0, max_poll + 5)
-    
-    # Actualizar texto informativo
-    avg_battery = np.mean([d.battery for d in abc_sim.drones])
-    
-    info_text.set_text(f'PASO: {frame}\n'
-                      f'FLORES POLINIZADAS: {pollinated_count}/{len(abc_sim.flowers)}\n'
-                      f'FLORES LISTAS: {ready_count}\n'
-                      f'EXPLORADORAS ACTIVAS: {active_scouts}/{NUM_SCOUT_DRONES}\n'
-                      f'DRONES ACTIVOS: {len(abc_sim.drones) - recharging_drones}/{len(abc_sim.drones)}\n'
-                      f'BATERÍA PROMEDIO: {avg_battery:.1f}%')
-    
-    # Verificar si se completó la polinización
-    if all_pollinated:
-        print(f"¡Polinización completa alcanzada en el paso {frame}!")
+        fleet = self.sim.fleet
+        self.drone_offsets = fleet.position[:fleet.count].astype(float)
+        self.drone_colors = DRONE_PALETTE[fleet.state[:fleet.count]]
+        self.drone_scatter.set_offsets(self.drone_offsets)
+        self.drone_scatter.set_sizes(np.array([d.size for d in self.sim.drones], dtype=float))
+        self.drone_scatter.set_color(self.drone_colors)
+        self.sim.drain_changes()
+        
+    def update(self):
+        """Aplica el registro de cambios del último paso"""
+        flowers, drones, layout_changed = self.sim.drain_changes()
+        if layout_changed or self.drone_offsets is None or len(self.drone_offsets) != self.sim.fleet.count:
+            self.rebuild()
+            return
+        if len(flowers):
+            store = self.sim.flower_store
+            states, sizes = store.state[flowers], store.size[flowers]
+            for state, scatter in self.flower_scatters.items():
+                self.flower_sizes[state][flowers] = np.where(states == state, sizes, 0)
+                scatter.set_sizes(self.flower_sizes[state])
+        if len(drones):
+            fleet = self.sim.fleet
+            self.drone_offsets[drones] = fleet.position[drones]
+            self.drone_colors[drones] = DRONE_PALETTE[fleet.state[drones]]
+            self.drone_scatter.set_offsets(self.drone_offsets)
+            self.drone_scatter.set_color(self.drone_colors)
+
+if __name__ == "__main__":
+    # Configuración de la figura con más espacio para la leyenda
+    fig = plt.figure(figsize=(22, 12))
+    gs = fig.add_gridspec(2, 3, width_ratios=[1.5, 1, 1], height_ratios=[1, 1])
+
+    # Subplots
+    ax1 = fig.add_subplot(gs[:, 0])  # Mapa principal
+    ax2 = fig.add_subplot(gs[0, 1])  # Polinización
+    ax3 = fig.add_subplot(gs[0, 2])  # Energía
+    ax4 = fig.add_subplot(gs[1, 1])  # Eficiencia por tipo
+    ax5 = fig.add_subplot(gs[1, 2])  # Estado de flores
+
+    # Inicializar simulación
+    abc_sim = ABCPollination(GREENHOUSE_SIZE, NUM_FLOWERS, 
+                            NUM_WORKER_DRONES, NUM_OBSERVER_DRONES, NUM_SCOUT_DRONES)
+
+    # Configurar el mapa principal
+    ax1.set_xlim(0, abc_sim.greenhouse_size)
+    ax1.set_ylim(0, abc_sim.greenhouse_size)
+    ax1.set_aspect('equal')
+    ax1.set_title('SISTEMA DE POLINIZACIÓN CON DRONES - ALGORITMO ABC', 
+                  fontsize=16, fontweight='bold', pad=20)
+    ax1.set_xlabel('Coordenada X', fontsize=12)
+    ax1.set_ylabel('Coordenada Y', fontsize=12)
+
+    # Dibujar división de áreas
+    x_edges = sorted({area.bounds[0] for area in abc_sim.areas})[1:]
+    y_edges = sorted({area.bounds[2] for area in abc_sim.areas})[1:]
+    for x in x_edges:
+        ax1.axvline(x=x, color='gray', linestyle='--', alpha=0.5, linewidth=2)
+    for y in y_edges:
+        ax1.axhline(y=y, color='gray', linestyle='--', alpha=0.5, linewidth=2)
+
+    # Etiquetar áreas
+    for area in abc_sim.areas:
+        x_min, x_max, y_min, y_max = area.bounds
+        ax1.text((x_min + x_max) / 2, (y_min + y_max) / 2, f'ÁREA {area.area_id}', ha='center', va='center', 
+                 fontweight='bold', fontsize=11, alpha=0.7)
+
+    # Obstáculos (mesas, líneas de riego y pilares) tal como los ve la simulación
+    for x, y_min, y_max in abc_sim.planner.blocked_runs():
+        ax1.add_patch(mpatches.Rectangle((x - 0.5, y_min - 0.5), 1, y_max - y_min + 1,
+                                         color='dimgray', alpha=0.6, linewidth=0))
+
+    # Pads de recarga
+    for pad in abc_sim.charging_pads:
+        base_circle = plt.Circle(pad, 2.0, color='gray', alpha=0.7)
+        ax1.add_patch(base_circle)
+        ax1.text(pad[0], pad[1], 'BASE', ha='center', va='center', 
+                 fontweight='bold', color='white', fontsize=10)
+
+    # Elementos gráficos para flores y drones
+    # Scatter plots separados para cada tipo de flor con formas diferentes
+    immature_flowers_scatter = ax1.scatter([], [], s=[], c=[], marker='H', alpha=0.8, 
+                                           edgecolors='darkred', linewidths=1.5)
+    ready_flowers_scatter = ax1.scatter([], [], s=[], c=[], marker='^', alpha=0.8, 
+                                        edgecolors='darkorange', linewidths=1.5)
+    pollinated_flowers_scatter = ax1.scatter([], [], s=[], c=[], marker='D', alpha=0.8, 
+                                             edgecolors='darkgreen', linewidths=1.5)
+
+    # Drones con forma circular
+    drone_scatter = ax1.scatter([], [], s=[], c=[], alpha=1.0, 
+                                edgecolors='black', linewidths=2, marker='o')
+
+    # LEYENDA MEJORADA - Fuera del área del gráfico
+    legend_elements = [
+        mpatches.Patch(color=DRONE_COLORS[WORKER], label='Obreras'),
+        mpatches.Patch(color=DRONE_COLORS[OBSERVER], label='Observadoras'),
+        mpatches.Patch(color=DRONE_COLORS[SCOUT], label='Exploradoras'),
+        mpatches.Patch(color=DRONE_COLORS[RECHARGING], label='Recargando'),
+        plt.Line2D([0], [0], marker='H', color='w', markerfacecolor=FLOWER_COLORS[FLOWER_IMMATURE], 
+                   markersize=10, label='Flores Inmaduras (Hexágono)'),
+        plt.Line2D([0], [0], marker='^', color='w', markerfacecolor=FLOWER_COLORS[FLOWER_READY], 
+                   markersize=10, label='Flores Listas (Triángulo)'),
+        plt.Line2D([0], [0], marker='D', color='w', markerfacecolor=FLOWER_COLORS[FLOWER_POLLINATED], 
+                   markersize=10, label='Flores Polinizadas (Diamante)'),
+        mpatches.Patch(color='dimgray', alpha=0.6, label='Obstáculos')
+    ]
+
+    # Crear una leyenda separada fuera del gráfico principal
+    fig.legend(handles=legend_elements, loc='center left', bbox_to_anchor=(0.92, 0.5), 
+               fontsize=12, title="LEYENDA", title_fontsize=13, frameon=True, 
+               fancybox=True, shadow=True, ncol=1)
+
+    # Gráficos de métricas
+    maturity_line, = ax2.plot([], [], 'g-', linewidth=3)
+    ax2.set_xlim(0, MAX_STEPS)
+    ax2.set_ylim(0, 100)
+    ax2.set_xlabel('Pasos', fontsize=11)
+    ax2.set_ylabel('Polinización (%)', fontsize=11)
+    ax2.set_title('PROGRESO DE POLINIZACIÓN', fontsize=13, fontweight='bold')
+    ax2.grid(True, alpha=0.3)
+    ax2.tick_params(axis='both', which='major', labelsize=10)
+
+    energy_line, = ax3.plot([], [], 'r-', linewidth=3)
+    ax3.set_xlim(0, MAX_STEPS)
+    ax3.set_ylim(0, 1000)
+    ax3.set_xlabel('Pasos', fontsize=11)
+    ax3.set_ylabel('Energía Consumida', fontsize=11)
+    ax3.set_title('ENERGÍA TOTAL CONSUMIDA', fontsize=13, fontweight='bold')
+    ax3.grid(True, alpha=0.3)
+    ax3.tick_params(axis='both', which='major', labelsize=10)
+
+    worker_line, = ax4.plot([], [], 'b-', label='Obreras', linewidth=3)
+    scout_line, = ax4.plot([], [], 'm-', label='Exploradoras', linewidth=3)
+    ax4.set_xlim(0, MAX_STEPS)
+    ax4.set_ylim(0, 100)
+    ax4.set_xlabel('Pasos', fontsize=11)
+    ax4.set_ylabel('Polinizaciones', fontsize=11)
+    ax4.set_title('EFICIENCIA POR TIPO DE DRON', fontsize=13, fontweight='bold')
+    ax4.legend(fontsize=11)
+    ax4.grid(True, alpha=0.3)
+    ax4.tick_params(axis='both', which='major', labelsize=10)
+
+    # Gráfico de estado de flores
+    flower_state_bars = ax5.bar([0, 1, 2], [0, 0, 0], 
+                               color=[FLOWER_COLORS[FLOWER_IMMATURE], 
+                                      FLOWER_COLORS[FLOWER_READY], 
+                                      FLOWER_COLORS[FLOWER_POLLINATED]],
+                               width=0.6)
+    ax5.set_ylim(0, NUM_FLOWERS)
+    ax5.set_xlabel('Estado de Flores', fontsize=11)
+    ax5.set_ylabel('Cantidad', fontsize=11)
+    ax5.set_title('DISTRIBUCIÓN DE ESTADOS DE FLORES', fontsize=13, fontweight='bold')
+    ax5.set_xticks([0, 1, 2])
+    ax5.set_xticklabels(['Inmaduras', 'Listas', 'Polinizadas'], fontsize=10)
+    ax5.tick_params(axis='both', which='major', labelsize=10)
+
+    # Texto informativo - Fuera del área del gráfico
+    info_text = fig.text(0.02, 0.95, '', transform=fig.transFigure, verticalalignment='top',
+                        bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.9),
+                        fontsize=11, fontweight='bold')
+
+    # Métricas para gráficos
+    steps_history = []
+    maturity_history = []
+    energy_history = []
+    worker_pollination_history = []
+    scout_pollination_history = []
+
+    # Renderizador incremental de flores y drones
+    renderer = PollinationRenderer(abc_sim, {FLOWER_IMMATURE: immature_flowers_scatter,
+                                             FLOWER_READY: ready_flowers_scatter,
+                                             FLOWER_POLLINATED: pollinated_flowers_scatter},
+                                   drone_scatter)
+
+    def init_animation():
+        renderer.rebuild()
+    
+        maturity_line.set_data([], [])
+        energy_line.set_data([], [])
+        worker_line.set_data([], [])
+        scout_line.set_data([], [])
+    
+        info_text.set_text('INICIANDO SIMULACIÓN...\nPreparando drones y flores...')
+    
         return (immature_flowers_scatter, ready_flowers_scatter, pollinated_flowers_scatter,
                 drone_scatter, maturity_line, energy_line, worker_line, scout_line, info_text)
+
+    def update_animation(frame):
+        global abc_sim
+    
+        # Ejecutar un paso de simulación
+        all_pollinated = abc_sim.run_step()
+    
+        # Actualizar solo las flores y drones que cambiaron
+        renderer.update()
+    
+        # Calcular métricas (contadores mantenidos por la simulación)
+        immature_count = len(abc_sim.flowers_by_state[FLOWER_IMMATURE])
+        ready_count = len(abc_sim.flowers_by_state[FLOWER_READY])
+        pollinated_count = len(abc_sim.flowers_by_state[FLOWER_POLLINATED])
+        pollinated_percentage = (pollinated_count / len(abc_sim.flowers)) * 100
+    
+        worker_pollinations = abc_sim.pollinations_by_type[WORKER]
+        scout_pollinations = abc_sim.pollinations_by_type[SCOUT]
+    
+        fleet = abc_sim.fleet
+        fleet_state = fleet.state[:fleet.count]
     
-    if frame >= MAX_STEPS - 1:
-        print("Límite de pasos alcanzado")
+        # Contar drones exploradores activos
+        active_scouts = int(np.sum((fleet.type[:fleet.count] == SCOUT) & (fleet_state != RECHARGING)))
+    
+        # Contar drones recargando
+        recharging_drones = int(np.sum(fleet_state == RECHARGING))
+    
+        # Actualizar historiales
+        steps_history.append(frame)
+        maturity_history.append(pollinated_percentage)
+        energy_history.append(abc_sim.energy_consumed)
+        worker_pollination_history.append(worker_pollinations)
+        scout_pollination_history.append(scout_pollinations)
+    
+        # Actualizar gráficos
+        maturity_line.set_data(steps_history, maturity_history)
+        energy_line.set_data(steps_history, energy_history)
+        worker_line.set_data(steps_history, worker_pollination_history)
+        scout_line.set_data(steps_history, scout_pollination_history)
+    
+        # Actualizar barras de estado de flores
+        for bar, height in zip(flower_state_bars, [immature_count, ready_count, pollinated_count]):
+            bar.set_height(height)
+    
+        # Ajustar límites de los gráficos
+        if steps_history:
+            current_max_step = max(steps_history)
+            ax2.set_xlim(0, current_max_step + 10)
+            ax3.set_xlim(0, current_max_step + 10)
+            ax4.set_xlim(0, current_max_step + 10)
+        
+            ax2.set_ylim(0, min(100, max(maturity_history) + 10) if maturity_history else 100)
+            ax3.set_ylim(0, max(energy_history) + 50 if energy_history else 1000)
+            max_poll = max(max(worker_pollination_history) if worker_pollination_history else 0,
+                          max(scout_pollination_history) if scout_pollination_history else 0)
+            ax4.set_ylim(0, max_poll + 5)
+    
+        # Actualizar texto informativo
+        avg_battery = fleet.battery[:fleet.count].mean()
+    
+        info_text.set_text(f'PASO: {frame}\n'
+                          f'FLORES POLINIZADAS: {pollinated_count}/{len(abc_sim.flowers)}\n'
+                          f'FLORES LISTAS: {ready_count}\n'
+                          f'EXPLORADORAS ACTIVAS: {active_scouts}/{NUM_SCOUT_DRONES}\n'
+                          f'DRONES ACTIVOS: {len(abc_sim.drones) - recharging_drones}/{len(abc_sim.drones)}\n'
+                          f'BATERÍA PROMEDIO: {avg_battery:.1f}%')
+    
+        # Verificar si se completó la polinización
+        if all_pollinated:
+            print(f"¡Polinización completa alcanzada en el paso {frame}!")
+            return (immature_flowers_scatter, ready_flowers_scatter, pollinated_flowers_scatter,
+                    drone_scatter, maturity_line, energy_line, worker_line, scout_line, info_text)
+    
+        if frame >= MAX_STEPS - 1:
+            print("Límite de pasos alcanzado")
+            return (immature_flowers_scatter, ready_flowers_scatter, pollinated_flowers_scatter,
+                    drone_scatter, maturity_line, energy_line, worker_line, scout_line, info_text)
+            
         return (immature_flowers_scatter, ready_flowers_scatter, pollinated_flowers_scatter,
                 drone_scatter, maturity_line, energy_line, worker_line, scout_line, info_text)
-            
-    return (immature_flowers_scatter, ready_flowers_scatter, pollinated_flowers_scatter,
-            drone_scatter, maturity_line, energy_line, worker_line, scout_line, info_text)
-
-# Crear animación
-ani = FuncAnimation(fig, update_animation, frames=MAX_STEPS,
-                    init_func=init_animation, blit=False, interval=100, repeat=False)
-
-# Ajustar el layout para dar espacio a la leyenda
-plt.tight_layout()
-plt.subplots_adjust(right=0.88)  # Dejar espacio a la derecha para la leyenda
-
-# Guardar GIF de la animación
-print("Guardando animación como GIF...")
-writer = PillowWriter(fps=10, bitrate=1800)
-ani.save('bee_drone_pollination.gif', writer=writer)
-print("GIF guardado: bee_drone_pollination.gif")
-
-# Mostrar la animación
-plt.show()
-
-# Guardar imagen PNG final
-print("Guardando imagen final PNG...")
-final_fig = plt.figure(figsize=(20, 12))
-final_gs = final_fig.add_gridspec(2, 3, width_ratios=[1.5, 1, 1], height_ratios=[1, 1])
-
-# Subplots para la imagen final
-final_ax1 = final_fig.add_subplot(final_gs[:, 0])
-final_ax2 = final_fig.add_subplot(final_gs[0, 1])
-final_ax3 = final_fig.add_subplot(final_gs[1, 1])
-final_ax4 = final_fig.add_subplot(final_gs[0, 2])
-final_ax5 = final_fig.add_subplot(final_gs[1, 2])
-
-# Crear visualización del estado final
-final_ax1.set_xlim(0, GREENHOUSE_SIZE)
-final_ax1.set_ylim(0, GREENHOUSE_SIZE)
-final_ax1.set_aspect('equal')
-final_ax1.set_title('ESTADO FINAL - SISTEMA DE POLINIZACIÓN CON DRONES', 
-                    fontsize=16, fontweight='bold', pad=20)
-
-# Dibujar división de áreas en la imagen final
-final_ax1.axvline(x=mid_x, color='gray', linestyle='--', alpha=0.5, linewidth=2)
-final_ax1.axhline(y=mid_y, color='gray', linestyle='--', alpha=0.5, linewidth=2)
-
-# Etiquetar áreas en imagen final
-final_ax1.text(mid_x/2, mid_y/2, 'ÁREA 0', ha='center', va='center', 
-               fontweight='bold', fontsize=11, alpha=0.7)
-final_ax1.text(mid_x*1.5, mid_y/2, 'ÁREA 1', ha='center', va='center', 
-               fontweight='bold', fontsize=11, alpha=0.7)
-final_ax1.text(mid_x/2, mid_y*1.5, 'ÁREA 2', ha='center', va='center', 
-               fontweight='bold', fontsize=11, alpha=0.7)
-final_ax1.text(mid_x*1.5, mid_y*1.5, 'ÁREA 3', ha='center', va='center', 
-               fontweight='bold', fontsize=11, alpha=0.7)
-
-# Base de recarga
-final_base_circle = plt.Circle(BASE_POSITION, 2.0, color='gray', alpha=0.7)
-final_ax1.add_patch(final_base_circle)
-final_ax1.text(BASE_POSITION[0], BASE_POSITION[1], 'BASE', ha='center', va='center', 
-               fontweight='bold', color='white', fontsize=10)
-
-# Separar flores por estado para la imagen final
-immature_flowers = [f for f in abc_sim.flowers if f.state == FLOWER_IMMATURE]
-ready_flowers = [f for f in abc_sim.flowers if f.state == FLOWER_READY]
-pollinated_flowers = [f for f in abc_sim.flowers if f.state == FLOWER_POLLINATED]
-
-# Dibujar flores en la imagen final
-if immature_flowers:
-    immature_positions = [f.position for f in immature_flowers]
-    immature_sizes = [f.size for f in immature_flowers]
-    final_ax1.scatter([p[0] for p in immature_positions], [p[1] for p in immature_positions], 
-                     s=immature_sizes, c=[FLOWER_COLORS[FLOWER_IMMATURE] for _ in immature_flowers], 
-                     marker='H', alpha=0.8, edgecolors='darkred', linewidths=1.5)
-
-if ready_flowers:
-    ready_positions = [f.position for f in ready_flowers]
-    ready_sizes = [f.size for f in ready_flowers]
-    final_ax1.scatter([p[0] for p in ready_positions], [p[1] for p in ready_positions], 
-                     s=ready_sizes, c=[FLOWER_COLORS[FLOWER_READY] for _ in ready_flowers], 
-                     marker='^', alpha=0.8, edgecolors='darkorange', linewidths=1.5)
-
-if pollinated_flowers:
-    pollinated_positions = [f.position for f in pollinated_flowers]
-    pollinated_sizes = [f.size for f in pollinated_flowers]
-    final_ax1.scatter([p[0] for p in pollinated_positions], [p[1] for p in pollinated_positions], 
-                     s=pollinated_sizes, c=[FLOWER_COLORS[FLOWER_POLLINATED] for _ in pollinated_flowers], 
-                     marker='D', alpha=0.8, edgecolors='darkgreen', linewidths=1.5)
-
-# Dibujar drones en la imagen final
-drone_positions = [d.position for d in abc_sim.drones]
-drone_sizes = [d.size for d in abc_sim.drones]
-drone_colors = [DRONE_COLORS[d.state] for d in abc_sim.drones]
-final_ax1.scatter([p[0] for p in drone_positions], [p[1] for p in drone_positions], 
-                 s=drone_sizes, c=drone_colors, alpha=1.0, 
-                 edgecolors='black', linewidths=2, marker='o')
-
-# Gráficos de métricas finales
-total_cells = GREENHOUSE_SIZE ** 2
-covered_percentage = [100 * x / total_cells for x in maturity_history]
-
-final_ax2.plot(steps_history, maturity_history, 'g-', linewidth=3)
-final_ax2.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
-final_ax2.set_ylim(0, 100)
-final_ax2.set_xlabel('Pasos', fontsize=11)
-final_ax2.set_ylabel('Polinización (%)', fontsize=11)
-final_ax2.set_title('PROGRESO DE POLINIZACIÓN', fontsize=13, fontweight='bold')
-final_ax2.grid(True, alpha=0.3)
-
-final_ax3.plot(steps_history, energy_history, 'r-', linewidth=3)
-final_ax3.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
-final_ax3.set_ylim(0, max(energy_history) + 50 if energy_history else 1000)
-final_ax3.set_xlabel('Pasos', fontsize=11)
-final_ax3.set_ylabel('Energía Consumida', fontsize=11)
-final_ax3.set_title('ENERGÍA TOTAL CONSUMIDA', fontsize=13, fontweight='bold')
-final_ax3.grid(True, alpha=0.3)
-
-final_ax4.plot(steps_history, worker_pollination_history, 'b-', label='Obreras', linewidth=3)
-final_ax4.plot(steps_history, scout_pollination_history, 'm-', label='Exploradoras', linewidth=3)
-final_ax4.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
-max_poll = max(max(worker_pollination_history) if worker_pollination_history else 0,
-              max(scout_pollination_history) if scout_pollination_history else 0)
-final_ax4.set_ylim(0, max_poll + 5)
-final_ax4.set_xlabel('Pasos', fontsize=11)
-final_ax4.set_ylabel('Polinizaciones', fontsize=11)
-final_ax4.set_title('EFICIENCIA POR TIPO DE DRON', fontsize=13, fontweight='bold')
-final_ax4.legend()
-final_ax4.grid(True, alpha=0.3)
-
-# Gráfico de estado de flores final
-final_flower_counts = [len(immature_flowers), len(ready_flowers), len(pollinated_flowers)]
-final_flower_bars = final_ax5.bar([0, 1, 2], final_flower_counts,
-                                color=[FLOWER_COLORS[FLOWER_IMMATURE], 
-                                       FLOWER_COLORS[FLOWER_READY], 
-                                       FLOWER_COLORS[FLOWER_POLLINATED]],
-                                width=0.6)
-final_ax5.set_ylim(0, NUM_FLOWERS)
-final_ax5.set_xlabel('Estado de Flores', fontsize=11)
-final_ax5.set_ylabel('Cantidad', fontsize=11)
-final_ax5.set_title('DISTRIBUCIÓN FINAL DE FLORES', fontsize=13, fontweight='bold')
-final_ax5.set_xticks([0, 1, 2])
-final_ax5.set_xticklabels(['Inmaduras', 'Listas', 'Polinizadas'], fontsize=10)
-
-# Añadir valores en las barras
-for i, v in enumerate(final_flower_counts):
-    final_ax5.text(i, v + 0.5, str(v), ha='center', va='bottom', fontweight='bold')
-
-# Texto informativo final
-final_pollinated_percentage = (len(pollinated_flowers) / len(abc_sim.flowers)) * 100
-final_worker_pollinations = sum(d.pollination_count for d in abc_sim.drones if d.type == WORKER)
-final_scout_pollinations = sum(d.pollination_count for d in abc_sim.drones if d.type == SCOUT)
-final_avg_battery = np.mean([d.battery for d in abc_sim.drones])
-
-final_info = (f'RESUMEN FINAL - POLINIZACIÓN CON DRONES\n\n'
-              f'Pasos totales: {steps_history[-1] if steps_history else 0}\n'
-              f'Flores polinizadas: {len(pollinated_flowers)}/{len(abc_sim.flowers)}\n'
-              f'Porcentaje de polinización: {final_pollinated_percentage:.1f}%\n'
-              f'Polinizaciones por obreras: {final_worker_pollinations}\n'
-              f'Polinizaciones por exploradoras: {final_scout_pollinations}\n'
-              f'Energía total consumida: {energy_history[-1]:.1f}\n'
-              f'Batería promedio final: {final_avg_battery:.1f}%')
-
-final_fig.text(0.02, 0.95, final_info, transform=final_fig.transFigure, 
-               verticalalignment='top', fontsize=12, fontweight='bold',
-               bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.9))
-
-# Leyenda en la imagen final
-final_fig.legend(handles=legend_elements, loc='center right', 
-                 bbox_to_anchor=(0.98, 0.5), fontsize=11, 
-                 title="LEYENDA", title_fontsize=12)
-
-plt.tight_layout()
-plt.subplots_adjust(right=0.85)
-plt.savefig('bee_drone_pollination_final.png', dpi=150, bbox_inches='tight')
-plt.close()
-print("Imagen final guardada: bee_drone_pollination_final.png")
-
-# Mostrar métricas finales
-if steps_history:
-    print(f"\n--- MÉTRICAS FINALES DE POLINIZACIÓN ---")
-    print(f"Flores polinizadas: {sum(1 for f in abc_sim.flowers if f.state == FLOWER_POLLINATED)}/{len(abc_sim.flowers)}")
-    print(f"Porcentaje de polinización: {final_pollinated_percentage:.2f}%")
-    print(f"Energía total consumida: {energy_history[-1]:.2f}")
-    print(f"Polinizaciones por obreras: {worker_pollination_history[-1]}")
-    print(f"Polinizaciones por exploradoras: {scout_pollination_history[-1]}")
-    print(f"Total de polinizaciones: {worker_pollination_history[-1] + scout_pollination_history[-1]}")
-    print(f"Batería promedio final: {np.mean([d.battery for d in abc_sim.drones]):.1f}%")
\ No newline at end of file
+
+    # Crear animación
+    ani = FuncAnimation(fig, update_animation, frames=MAX_STEPS,
+                        init_func=init_animation, blit=False, interval=100, repeat=False)
+
+    # Ajustar el layout para dar espacio a la leyenda
+    plt.tight_layout()
+    plt.subplots_adjust(right=0.88)  # Dejar espacio a la derecha para la leyenda
+
+    # Guardar GIF de la animación
+    print("Guardando animación como GIF...")
+    writer = PillowWriter(fps=10, bitrate=1800)
+    ani.save('bee_drone_pollination.gif', writer=writer)
+    print("GIF guardado: bee_drone_pollination.gif")
+
+    # Mostrar la animación
+    plt.show()
+
+    # Guardar imagen PNG final
+    print("Guardando imagen final PNG...")
+    final_fig = plt.figure(figsize=(20, 12))
+    final_gs = final_fig.add_gridspec(2, 3, width_ratios=[1.5, 1, 1], height_ratios=[1, 1])
+
+    # Subplots para la imagen final
+    final_ax1 = final_fig.add_subplot(final_gs[:, 0])
+    final_ax2 = final_fig.add_subplot(final_gs[0, 1])
+    final_ax3 = final_fig.add_subplot(final_gs[1, 1])
+    final_ax4 = final_fig.add_subplot(final_gs[0, 2])
+    final_ax5 = final_fig.add_subplot(final_gs[1, 2])
+
+    # Crear visualización del estado final
+    final_ax1.set_xlim(0, abc_sim.greenhouse_size)
+    final_ax1.set_ylim(0, abc_sim.greenhouse_size)
+    final_ax1.set_aspect('equal')
+    final_ax1.set_title('ESTADO FINAL - SISTEMA DE POLINIZACIÓN CON DRONES', 
+                        fontsize=16, fontweight='bold', pad=20)
+
+    # Dibujar división de áreas en la imagen final
+    for x in x_edges:
+        final_ax1.axvline(x=x, color='gray', linestyle='--', alpha=0.5, linewidth=2)
+    for y in y_edges:
+        final_ax1.axhline(y=y, color='gray', linestyle='--', alpha=0.5, linewidth=2)
+
+    # Etiquetar áreas en imagen final
+    for area in abc_sim.areas:
+        x_min, x_max, y_min, y_max = area.bounds
+        final_ax1.text((x_min + x_max) / 2, (y_min + y_max) / 2, f'ÁREA {area.area_id}', ha='center', va='center', 
+                       fontweight='bold', fontsize=11, alpha=0.7)
+
+    # Obstáculos
+    for x, y_min, y_max in abc_sim.planner.blocked_runs():
+        final_ax1.add_patch(mpatches.Rectangle((x - 0.5, y_min - 0.5), 1, y_max - y_min + 1,
+                                               color='dimgray', alpha=0.6, linewidth=0))
+
+    # Pads de recarga
+    for pad in abc_sim.charging_pads:
+        final_base_circle = plt.Circle(pad, 2.0, color='gray', alpha=0.7)
+        final_ax1.add_patch(final_base_circle)
+        final_ax1.text(pad[0], pad[1], 'BASE', ha='center', va='center', 
+                       fontweight='bold', color='white', fontsize=10)
+
+    # Dibujar flores y drones en la imagen final con el mismo renderizador
+    final_renderer = PollinationRenderer(
+        abc_sim,
+        {FLOWER_IMMATURE: final_ax1.scatter([], [], marker='H', alpha=0.8, edgecolors='darkred', linewidths=1.5),
+         FLOWER_READY: final_ax1.scatter([], [], marker='^', alpha=0.8, edgecolors='darkorange', linewidths=1.5),
+         FLOWER_POLLINATED: final_ax1.scatter([], [], marker='D', alpha=0.8, edgecolors='darkgreen', linewidths=1.5)},
+        final_ax1.scatter([], [], alpha=1.0, edgecolors='black', linewidths=2, marker='o'))
+    final_renderer.rebuild()
+
+    # Conteo final de flores por estado
+    final_immature_count = len(abc_sim.flowers_by_state[FLOWER_IMMATURE])
+    final_ready_count = len(abc_sim.flowers_by_state[FLOWER_READY])
+    final_pollinated_count = len(abc_sim.flowers_by_state[FLOWER_POLLINATED])
+
+    # Gráficos de métricas finales
+    total_cells = GREENHOUSE_SIZE ** 2
+    covered_percentage = [100 * x / total_cells for x in maturity_history]
+
+    final_ax2.plot(steps_history, maturity_history, 'g-', linewidth=3)
+    final_ax2.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
+    final_ax2.set_ylim(0, 100)
+    final_ax2.set_xlabel('Pasos', fontsize=11)
+    final_ax2.set_ylabel('Polinización (%)', fontsize=11)
+    final_ax2.set_title('PROGRESO DE POLINIZACIÓN', fontsize=13, fontweight='bold')
+    final_ax2.grid(True, alpha=0.3)
+
+    final_ax3.plot(steps_history, energy_history, 'r-', linewidth=3)
+    final_ax3.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
+    final_ax3.set_ylim(0, max(energy_history) + 50 if energy_history else 1000)
+    final_ax3.set_xlabel('Pasos', fontsize=11)
+    final_ax3.set_ylabel('Energía Consumida', fontsize=11)
+    final_ax3.set_title('ENERGÍA TOTAL CONSUMIDA', fontsize=13, fontweight='bold')
+    final_ax3.grid(True, alpha=0.3)
+
+    final_ax4.plot(steps_history, worker_pollination_history, 'b-', label='Obreras', linewidth=3)
+    final_ax4.plot(steps_history, scout_pollination_history, 'm-', label='Exploradoras', linewidth=3)
+    final_ax4.set_xlim(0, max(steps_history) + 10 if steps_history else MAX_STEPS)
+    max_poll = max(max(worker_pollination_history) if worker_pollination_history else 0,
+                  max(scout_pollination_history) if scout_pollination_history else 0)
+    final_ax4.set_ylim(0, max_poll + 5)
+    final_ax4.set_xlabel('Pasos', fontsize=11)
+    final_ax4.set_ylabel('Polinizaciones', fontsize=11)
+    final_ax4.set_title('EFICIENCIA POR TIPO DE DRON', fontsize=13, fontweight='bold')
+    final_ax4.legend()
+    final_ax4.grid(True, alpha=0.3)
+
+    # Gráfico de estado de flores final
+    final_flower_counts = [final_immature_count, final_ready_count, final_pollinated_count]
+    final_flower_bars = final_ax5.bar([0, 1, 2], final_flower_counts,
+                                    color=[FLOWER_COLORS[FLOWER_IMMATURE], 
+                                           FLOWER_COLORS[FLOWER_READY], 
+                                           FLOWER_COLORS[FLOWER_POLLINATED]],
+                                    width=0.6)
+    final_ax5.set_ylim(0, NUM_FLOWERS)
+    final_ax5.set_xlabel('Estado de Flores', fontsize=11)
+    final_ax5.set_ylabel('Cantidad', fontsize=11)
+    final_ax5.set_title('DISTRIBUCIÓN FINAL DE FLORES', fontsize=13, fontweight='bold')
+    final_ax5.set_xticks([0, 1, 2])
+    final_ax5.set_xticklabels(['Inmaduras', 'Listas', 'Polinizadas'], fontsize=10)
+
+    # Añadir valores en las barras
+    for i, v in enumerate(final_flower_counts):
+        final_ax5.text(i, v + 0.5, str(v), ha='center', va='bottom', fontweight='bold')
+
+    # Texto informativo final
+    final_pollinated_percentage = (final_pollinated_count / len(abc_sim.flowers)) * 100
+    final_worker_pollinations = sum(d.pollination_count for d in abc_sim.drones if d.type == WORKER)
+    final_scout_pollinations = sum(d.pollination_count for d in abc_sim.drones if d.type == SCOUT)
+    final_avg_battery = np.mean([d.battery for d in abc_sim.drones])
+
+    final_info = (f'RESUMEN FINAL - POLINIZACIÓN CON DRONES\n\n'
+                  f'Pasos totales: {steps_history[-1] if steps_history else 0}\n'
+                  f'Flores polinizadas: {final_pollinated_count}/{len(abc_sim.flowers)}\n'
+                  f'Porcentaje de polinización: {final_pollinated_percentage:.1f}%\n'
+                  f'Polinizaciones por obreras: {final_worker_pollinations}\n'
+                  f'Polinizaciones por exploradoras: {final_scout_pollinations}\n'
+                  f'Energía total consumida: {energy_history[-1]:.1f}\n'
+                  f'Batería promedio final: {final_avg_battery:.1f}%')
+
+    final_fig.text(0.02, 0.95, final_info, transform=final_fig.transFigure, 
+                   verticalalignment='top', fontsize=12, fontweight='bold',
+                   bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.9))
+
+    # Leyenda en la imagen final
+    final_fig.legend(handles=legend_elements, loc='center right', 
+                     bbox_to_anchor=(0.98, 0.5), fontsize=11, 
+                     title="LEYENDA", title_fontsize=12)
+
+    plt.tight_layout()
+    plt.subplots_adjust(right=0.85)
+    plt.savefig('bee_drone_pollination_final.png', dpi=150, bbox_inches='tight')
+    plt.close()
+    print("Imagen final guardada: bee_drone_pollination_final.png")
+
+    # Mostrar métricas finales
+    if steps_history:
+        print(f"\n--- MÉTRICAS FINALES DE POLINIZACIÓN ---")
+        print(f"Flores polinizadas: {sum(1 for f in abc_sim.flowers if f.state == FLOWER_POLLINATED)}/{len(abc_sim.flowers)}")
+        print(f"Porcentaje de polinización: {final_pollinated_percentage:.2f}%")
+        print(f"Energía total consumida: {energy_history[-1]:.2f}")
+        print(f"Polinizaciones por obreras: {worker_pollination_history[-1]}")
+        print(f"Polinizaciones por exploradoras: {scout_pollination_history[-1]}")
+        print(f"Total de polinizaciones: {worker_pollination_history[-1] + scout_pollination_history[-1]}")
+        print(f"Batería promedio final: {np.mean([d.battery for d in abc_sim.drones]):.1f}%")
+        airspace = abc_sim.airspace
+        if airspace.capacity is not None:
+            print(f"Movimientos rechazados por celda ocupada: {airspace.denied}/{airspace.requests}")
\ No newline at end of file
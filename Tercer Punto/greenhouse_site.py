@@ -0,0 +1,292 @@
+import os
+import random
+import time
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from Punto3_Lab_4 import (GREENHOUSE_SIZE, NUM_FLOWERS, NUM_WORKER_DRONES, NUM_OBSERVER_DRONES,
+                          NUM_SCOUT_DRONES, MAX_STEPS, WORKER, FLOWER_POLLINATED, ABCPollination)
+
+# Simulación de un sitio con varios invernaderos que comparten un depósito de
+# drones. Cada invernadero (fragmento) es una instancia de ABCPollination y
+# pertenece a un proceso; los procesos avanzan en ventanas de WINDOW_STEPS pasos
+# y se sincronizan con una barrera al final de cada una. Entre ventanas las
+# obreras sobrantes pasan por el depósito al invernadero con más demanda: cada
+# proceso escribe las que salen en su buzón de memoria compartida (una cola por
+# proceso y destino) y el dueño del destino las lee tras la siguiente barrera.
+# Las métricas de cada ventana se escriben en su sitio en memoria compartida.
+
+NUM_GREENHOUSES = 8
+WINDOW_STEPS = 10            # Pasos por ventana (1 = avance en paso cerrado)
+MIGRATIONS_PER_WINDOW = 4    # Obreras que pueden salir de (o llegar a) un invernadero por ventana
+BARRIER_TIMEOUT = 300        # Segundos que un proceso espera a los demás en una barrera
+JOIN_TIMEOUT = 10            # Segundos para que los procesos salgan tras un fallo antes de terminarlos
+
+# Columnas de la tabla de estado de los invernaderos
+S_DEMAND = 0
+S_WORKERS = 1
+S_SPARE = 2
+S_DONE = 3
+S_STEP = 4
+S_FLOWERS = 5
+S_FIELDS = 6
+
+# Columnas del historial de métricas por ventana e invernadero
+H_POLLINATED = 0
+H_ENERGY = 1
+H_POLLINATIONS = 2
+H_WORKERS = 3
+H_FIELDS = 4
+
+# Columnas de un dron en el buzón
+M_ID = 0
+M_BATTERY = 1
+M_DRAIN = 2
+M_ENERGY = 3
+M_POLLINATIONS = 4
+M_FIELDS = 5
+
+# Índices del bloque de control (a partir de C_MIGRATIONS, un contador por proceso)
+C_WINDOWS = 0
+C_MIGRATIONS = 1
+
+
+def _shared_layout(num_greenhouses, num_windows, num_workers):
+    # Forma y tipo de cada arreglo que se coloca en memoria compartida
+    return {
+        'status': ((num_greenhouses, S_FIELDS), np.float64),
+        'history': ((num_windows, num_greenhouses, H_FIELDS), np.float64),
+        'mailbox': ((num_workers, num_greenhouses, MIGRATIONS_PER_WINDOW, M_FIELDS), np.float64),
+        'mail_count': ((num_workers, num_greenhouses), np.int64),
+        'control': ((C_MIGRATIONS + num_workers,), np.int64),
+    }
+
+
+def _attach(names, layout):
+    # Abre los bloques compartidos por nombre y devuelve vistas NumPy sobre ellos
+    blocks = {key: shared_memory.SharedMemory(name=names[key]) for key in layout}
+    arrays = {key: np.ndarray(layout[key][0], dtype=layout[key][1], buffer=blocks[key].buf)
+              for key in layout}
+    return blocks, arrays
+
+
+def plan_migrations(status, limit=MIGRATIONS_PER_WINDOW):
+    """Traslados (origen, destino) de obreras para la próxima ventana.
+
+    Las obreras del sitio se reparten en proporción a la demanda de cada
+    invernadero (cuota entera más restos mayores, como rebalance_workers); solo
+    salen obreras libres y como mucho `limit` salen de o llegan a cada
+    invernadero, que es lo que cabe en cada cola del buzón. Todos los
+    procesos calculan el mismo plan a partir de la tabla de estado compartida.
+    """
+    demand = status[:, S_DEMAND]
+    workers = status[:, S_WORKERS].astype(int)
+    total_demand = demand.sum()
+    total_workers = workers.sum()
+    if total_demand == 0 or total_workers == 0:
+        return []
+    quota = total_workers * demand / total_demand
+    desired = np.floor(quota).astype(int)
+    leftover = total_workers - desired.sum()
+    if leftover:
+        desired[np.argsort(desired - quota, kind='stable')[:leftover]] += 1
+
+    surplus = np.minimum(np.maximum(workers - desired, 0), status[:, S_SPARE].astype(int))
+    surplus = np.minimum(surplus, limit)
+    deficit = np.minimum(np.maximum(desired - workers, 0), limit)
+    sources = [g for g in np.argsort(-surplus, kind='stable') for _ in range(surplus[g])]
+    moves = []
+    for g in np.argsort(-deficit, kind='stable'):
+        for _ in range(deficit[g]):
+            if not sources:
+                return moves
+            moves.append((int(sources.pop(0)), int(g)))
+    return moves
+
+
+def _write_status(status, history, window, g, sim, done):
+    # Estado para el plan de traslados y métricas de la ventana, en su sitio
+    fleet = sim.fleet
+    workers = np.count_nonzero(fleet.type[:fleet.count] == WORKER)
+    status[g] = (0 if done else sum(area.demand() for area in sim.areas), workers,
+                 len(sim.spare_workers()), done, sim.step_count, len(sim.flowers))
+    history[window, g] = (len(sim.flowers_by_state[FLOWER_POLLINATED]), sim.energy_consumed,
+                          sum(sim.pollinations_by_type.values()), workers)
+
+
+def _worker(worker_id, names, layout, owners, config, seed, window_steps, max_steps, barrier):
+    blocks, arrays = _attach(names, layout)
+    status, history = arrays['status'], arrays['history']
+    mailbox, mail_count, control = arrays['mailbox'], arrays['mail_count'], arrays['control']
+    num_workers = mail_count.shape[0]
+
+    try:
+        # Cada invernadero tiene su propio estado de `random`, así el resultado
+        # no depende de cuántos procesos haya ni de cómo se repartan
+        sims, rng_states = {}, {}
+        for g in np.flatnonzero(owners == worker_id):
+            random.seed(f"{seed}:{g}")
+            sims[g] = ABCPollination(*config)
+            rng_states[g] = random.getstate()
+
+        window = 0
+        while True:
+            end = min(max_steps, (window + 1) * window_steps)
+            for g, sim in sims.items():
+                done = bool(status[g, S_DONE])
+                if not done:
+                    random.setstate(rng_states[g])
+                    done = sim.run(end)
+                    rng_states[g] = random.getstate()
+                _write_status(status, history, window, g, sim, done)
+            if worker_id == 0:
+                control[C_WINDOWS] = window + 1
+            barrier.wait(BARRIER_TIMEOUT)
+
+            if status[:, S_DONE].all() or end >= max_steps:
+                break
+
+            # Salidas al depósito: cada proceso solo escribe en su fila del buzón
+            moves = plan_migrations(status)
+            mail_count[worker_id] = 0
+            for source, dest in moves:
+                if owners[source] != worker_id:
+                    continue
+                sim = sims[source]
+                drone = sim.drones[sim.spare_workers()[0]]
+                mailbox[worker_id, dest, mail_count[worker_id, dest]] = (
+                    drone.id, drone.battery, drone.battery_drain_rate, drone.energy_used,
+                    drone.pollination_count)
+                mail_count[worker_id, dest] += 1
+                sim.remove_drone(drone)
+                control[C_MIGRATIONS + worker_id] += 1
+            barrier.wait(BARRIER_TIMEOUT)
+
+            # Llegadas, en el orden del plan para que no dependa del reparto
+            cursor = np.zeros((num_workers, len(owners)), dtype=int)
+            for source, dest in moves:
+                if owners[dest] != worker_id:
+                    continue
+                w = owners[source]
+                record = mailbox[w, dest, cursor[w, dest]]
+                cursor[w, dest] += 1
+                sims[dest].add_drone(int(record[M_ID]), WORKER, record[M_BATTERY], record[M_DRAIN],
+                                     record[M_ENERGY], int(record[M_POLLINATIONS]))
+            window += 1
+    except threading.BrokenBarrierError:
+        # Otro proceso falló o no llegó a tiempo: salir con error en lugar de esperar
+        raise SystemExit(1)
+    except BaseException:
+        barrier.abort()
+        raise
+    finally:
+        del status, history, mailbox, mail_count, control, arrays
+        for block in blocks.values():
+            block.close()
+
+
+def _join_all(processes, barrier, timeout=JOIN_TIMEOUT):
+    # Espera a todos los procesos. Si uno termina con error se rompe la barrera
+    # para que los demás salgan, y los que no lo hagan en `timeout` segundos se
+    # terminan. Devuelve si todos terminaron bien.
+    pending = list(processes)
+    while pending:
+        pending[0].join(0.1)
+        pending = [process for process in pending if process.is_alive()]
+        if any(process.exitcode not in (None, 0) for process in processes):
+            barrier.abort()
+            for process in pending:
+                process.join(timeout)
+            for process in pending:
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            break
+    return all(process.exitcode == 0 for process in processes)
+
+
+def run_site_simulation(num_workers=None, seed=None, num_greenhouses=NUM_GREENHOUSES,
+                        window_steps=WINDOW_STEPS, max_steps=MAX_STEPS,
+                        greenhouse_size=GREENHOUSE_SIZE, num_flowers=NUM_FLOWERS,
+                        num_worker_drones=NUM_WORKER_DRONES, num_observers=NUM_OBSERVER_DRONES,
+                        num_scouts=NUM_SCOUT_DRONES):
+    """Simula un sitio de varios invernaderos repartidos entre procesos.
+
+    Devuelve un diccionario con el historial de métricas por ventana e
+    invernadero, el paso final de cada invernadero y el número de traslados.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if seed is None:
+        seed = random.randrange(2**31)
+    num_workers = max(1, min(num_workers, num_greenhouses))
+    num_windows = -(-max_steps // window_steps)
+    owners = np.arange(num_greenhouses) % num_workers
+    config = (greenhouse_size, num_flowers, num_worker_drones, num_observers, num_scouts)
+
+    layout = _shared_layout(num_greenhouses, num_windows, num_workers)
+    blocks = {}
+    try:
+        for key, (shape, dtype) in layout.items():
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            blocks[key] = shared_memory.SharedMemory(create=True, size=nbytes)
+        names = {key: block.name for key, block in blocks.items()}
+        arrays = {key: np.ndarray(layout[key][0], dtype=layout[key][1], buffer=blocks[key].buf)
+                  for key in layout}
+        for array in arrays.values():
+            array[:] = 0
+
+        barrier = mp.Barrier(num_workers)
+        processes = [mp.Process(target=_worker,
+                                args=(w, names, layout, owners, config, seed, window_steps,
+                                      max_steps, barrier))
+                     for w in range(num_workers)]
+        for process in processes:
+            process.start()
+        if not _join_all(processes, barrier):
+            raise RuntimeError("Un proceso de la simulación del sitio terminó con error")
+
+        windows = int(arrays['control'][C_WINDOWS])
+        history = arrays['history'][:windows].copy()
+        status = arrays['status']
+        result = {
+            'windows': windows,
+            'steps': status[:, S_STEP].astype(int),
+            'done': status[:, S_DONE].astype(bool),
+            'flowers': status[:, S_FLOWERS].astype(int),
+            'pollinated': history[:, :, H_POLLINATED].astype(int),
+            'energy': history[:, :, H_ENERGY],
+            'pollinations': history[:, :, H_POLLINATIONS].astype(int),
+            'workers': history[:, :, H_WORKERS].astype(int),
+            'migrations': int(arrays['control'][C_MIGRATIONS:].sum()),
+        }
+        del arrays, status
+        return result
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
+
+
+if __name__ == "__main__":
+    # Comparar un solo proceso con todos los núcleos: el resultado debe coincidir
+    seed = 7
+    timings = {}
+    results = {}
+    for workers in (1, max(2, os.cpu_count() or 1)):
+        start = time.perf_counter()
+        results[workers] = run_site_simulation(num_workers=workers, seed=seed)
+        timings[workers] = time.perf_counter() - start
+
+    print(f"\n--- SITIO DE {NUM_GREENHOUSES} INVERNADEROS ---")
+    for workers, res in results.items():
+        print(f"{workers} proceso(s): {timings[workers]:.2f} s, "
+              f"{res['pollinated'][-1].sum()}/{res['flowers'].sum()} flores polinizadas, "
+              f"energía {res['energy'][-1].sum():.1f}, traslados {res['migrations']}, "
+              f"pasos por invernadero {res['steps'].tolist()}")
+    first, last = results.values()
+    print("Resultados idénticos:", np.array_equal(first['pollinated'], last['pollinated']) and
+          np.allclose(first['energy'], last['energy']))